@@ -0,0 +1,336 @@
+"""
+Historical valuation backtest: rebuild point-in-time DCF inputs from the
+stored financials, metrics and price history, value every ticker at every
+month-end, and score the UNDERVALUED / OVERVALUED labels against the
+forward returns that followed.
+
+Points are persisted per ticker (backtest_points) together with the data
+stamps they were computed from, so a re-run only values what changed: nothing
+for untouched tickers, the newest month-ends after a price update, and the
+full history when fundamentals change.
+"""
+import hashlib
+import json
+import re
+from dataclasses import asdict
+from typing import Optional
+
+import numpy as np
+
+import db_manager as db
+import finance_calc as fc
+import metrics_frame as mf
+import scenarios as sc
+
+DEFAULT_HORIZONS = (1, 3, 6, 12)    # months
+REPORTING_LAG_DAYS = 90             # a period's figures are public this long after it ends
+UNDERVALUED = fc.valuation_label(100.0)
+OVERVALUED = fc.valuation_label(-100.0)
+# Inputs no statement provides: fixed neutral values unless run_backtest(snapshot=True)
+# takes them from today's metrics — look-ahead, since every past date then sees
+# current beta / growth (and current shares / cash where a period lacks them).
+NEUTRAL_INPUTS = {"shares": 0.0, "cash": 0.0, "beta": 1.0, "rev_growth_5y": 0.08}
+SNAPSHOT_INPUTS = tuple(NEUTRAL_INPUTS)
+
+
+# ── Point-in-time inputs ───────────────────────────────────────────────────────
+
+def _period_end(period: str) -> np.datetime64:
+    """'2023', '2023-09-30', '2023Q3' / '2023-Q3' / 'Q3 2023' → period end date."""
+    p = str(period).strip()
+    if re.fullmatch(r"\d{4}", p):
+        return np.datetime64(f"{p}-12-31")
+    m = re.fullmatch(r"(\d{4})-?Q([1-4])|Q([1-4])\s*(\d{4})", p, re.IGNORECASE)
+    if m:
+        year, q = (m.group(1), m.group(2)) if m.group(1) else (m.group(4), m.group(3))
+        month_after = np.datetime64(f"{year}-01") + np.timedelta64(3 * int(q), "M")
+        return month_after.astype("datetime64[D]") - np.timedelta64(1, "D")
+    try:
+        return np.datetime64(p[:10], "D")
+    except ValueError:
+        return np.datetime64("NaT")
+
+
+def point_in_time_columns(
+    asof: np.ndarray,
+    closes: np.ndarray,
+    fin_rows: list[dict],
+    snapshot: Optional[dict] = None,
+    lag_days: int = REPORTING_LAG_DAYS,
+) -> dict:
+    """
+    DCF input columns (scenarios._fin_columns() keys) for one ticker at each
+    `asof` date, using only the latest financials period published by then
+    (period end + lag_days).  Market cap is price × shares at `asof`; shares
+    and cash come from that period.  Beta is 1.0 and the growth fallback
+    (fewer than a year of revenue history) NEUTRAL_INPUTS["rev_growth_5y"].
+    snapshot: SNAPSHOT_INPUTS from today's metrics (one row of
+    metrics_frame.normalize_metrics()) to use instead of the neutral beta and
+    growth and where a period has no shares / cash — this is look-ahead.
+    Returns {"cols", "price", "period", "valid"}; rows with no published
+    period yet, or no share count, are not valid.
+    """
+    fallback = NEUTRAL_INPUTS if snapshot is None else snapshot
+    ends = np.array([_period_end(r["period"]) for r in fin_rows], dtype="datetime64[D]")
+    keep = ~np.isnat(ends)
+    rows = [r for r, k in zip(fin_rows, keep) if k]
+    ends = ends[keep]
+    order = np.argsort(ends, kind="stable")
+    rows, ends = [rows[i] for i in order], ends[order]
+
+    def fcol(key):
+        return np.array([r.get(key) or 0 for r in rows], dtype=float)
+
+    m = len(asof)
+    if not rows:
+        j = np.full(m, -1)
+    else:
+        published = ends + np.timedelta64(lag_days, "D")
+        j = np.searchsorted(published, asof, side="right") - 1
+    valid = j >= 0
+    jj = np.maximum(j, 0)
+
+    if rows:
+        fcf, ebitda = fcol("free_cash_flow")[jj], fcol("ebitda")[jj]
+        shares_hist, debt = fcol("shares_out")[jj], fcol("total_debt")[jj]
+        cash_hist = fcol("cash")[jj]
+        interest, revenue = fcol("interest_exp")[jj], fcol("revenue")
+        # Revenue CAGR over up to five years of periods published by then
+        k = np.searchsorted(ends, ends[jj] - np.timedelta64(5 * 365, "D"))
+        k = np.minimum(k, jj)
+        span = (ends[jj] - ends[k]).astype(float) / 365.25
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cagr = (revenue[jj] / revenue[k]) ** (1 / span) - 1
+        has_cagr = (span >= 1) & (revenue[k] > 0) & (revenue[jj] > 0)
+    else:
+        fcf = ebitda = shares_hist = debt = interest = cash_hist = np.zeros(m)
+        cagr, has_cagr = np.zeros(m), np.zeros(m, dtype=bool)
+
+    fcf = np.where(fcf != 0, fcf, ebitda * 0.6)        # EBITDA-margin fallback
+    shares = np.where(shares_hist > 0, shares_hist, fallback["shares"])
+    cash = np.where(cash_hist > 0, cash_hist, fallback["cash"])
+    valid &= shares > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cost_of_debt = np.where((debt > 0) & (interest > 0), interest / debt, 0.04)
+    rev_growth = np.where(has_cagr, cagr, fallback["rev_growth_5y"])
+
+    cols = {
+        "beta":         np.full(m, max(fallback["beta"], 0.1)),
+        "cost_of_debt": np.clip(cost_of_debt, 0.01, 0.15),
+        "total_equity": closes * shares,
+        "total_debt":   debt,
+        "base_fcf":     fcf,
+        "rev_growth":   np.where(rev_growth == 0, 0.08, rev_growth),
+        "shares":       shares,
+        "net_debt":     np.maximum(debt - cash, 0),
+        "cash":         cash,
+    }
+    period = np.array([rows[i]["period"] if v else None for i, v in zip(jj, valid)], dtype=object)
+    return {"cols": cols, "price": closes, "period": period, "valid": valid}
+
+
+def params_key(scenario: sc.Scenario, lag_days: int, snapshot: bool = False) -> str:
+    """Stable key for one backtest parameter set (stored points are per key)."""
+    blob = json.dumps({"scenario": asdict(scenario), "lag_days": lag_days, "snapshot": snapshot},
+                      sort_keys=True)
+    return hashlib.sha256(blob.encode()).hexdigest()[:16]
+
+
+# ── Backtest run ───────────────────────────────────────────────────────────────
+
+def run_backtest(
+    tickers: Optional[list[str]] = None,
+    years: Optional[int] = 5,
+    scenario: sc.Scenario = sc.Scenario("base"),
+    lag_days: int = REPORTING_LAG_DAYS,
+    horizons: tuple = DEFAULT_HORIZONS,
+    relative: bool = False,
+    incremental: bool = True,
+    persist: bool = True,
+    snapshot: bool = False,
+) -> dict:
+    """
+    Month-end DCF backtest over `tickers` (default: every company DB).
+    `scenario` sets the run_full_valuation() parameters (base = its defaults).
+    All points that need (re)computing, across every ticker, are valued in a
+    single scenarios.evaluate_columns() call.  Only the last `years` of
+    month-ends are scored.
+    snapshot=True fills SNAPSHOT_INPUTS from today's metrics (look-ahead; see
+    point_in_time_columns()); by default they are point-in-time or neutral.
+    Returns {"points": columns, "report": hit_rates(), "evaluated", "reused",
+    "look_ahead": SNAPSHOT_INPUTS taken from today's metrics (empty by default),
+    "no_points": tickers with no valued month-end — usually no stored statements}.
+    """
+    tickers = db.list_companies() if tickers is None else [t.upper() for t in tickers]
+    key = params_key(scenario, lag_days, snapshot)
+
+    stored, todo = {}, {}
+    for t in tickers:
+        stamps = db.get_data_stamps(t)
+        state, rows = db.get_backtest_points(t, key) if incremental else (None, [])
+        if state == stamps:
+            stored[t] = rows
+            continue
+        since = None
+        if state and rows and state["fundamentals"] == stamps["fundamentals"]:
+            since = np.datetime64(rows[-1]["asof"], "D")     # only prices moved
+            rows = [r for r in rows if np.datetime64(r["asof"], "D") < since]
+        stored[t] = rows if since is not None else []
+        todo[t] = {"stamps": stamps, "since": since}
+
+    # Build point-in-time inputs for everything that needs valuing
+    current = mf.financials_frame(list(todo)) if todo and snapshot else None
+    snap_index = {t: i for i, t in enumerate(current["ticker"])} if current else {}
+    blocks = []
+    for t in todo:
+        dates, closes = db.get_month_end_closes(t)
+        since = todo[t]["since"]
+        if since is not None:
+            keep = dates >= since
+            dates, closes = dates[keep], closes[keep]
+        snap = None
+        if snapshot:
+            row = snap_index.get(t)
+            snap = {c: float(current[c][row]) if row is not None else NEUTRAL_INPUTS[c]
+                    for c in SNAPSHOT_INPUTS}
+        pit = point_in_time_columns(dates, closes, db.get_financials_history(t), snap, lag_days)
+        v = pit["valid"]
+        blocks.append((t, dates[v], pit["period"][v], closes[v],
+                       {c: a[v] for c, a in pit["cols"].items()}))
+
+    evaluated = sum(len(b[1]) for b in blocks)
+    if evaluated:
+        cols = {c: np.concatenate([b[4][c] for b in blocks]) for c in blocks[0][4]}
+        price = np.concatenate([b[3] for b in blocks])
+        res = sc.evaluate_columns(cols, price, sc.ScenarioSet("backtest", (scenario,)))
+        intrinsic, upside = res["intrinsic_value"][0], res["upside_pct"][0]
+
+    offset = 0
+    for t, dates, periods, closes, _ in blocks:
+        n = len(dates)
+        new = [
+            {"asof": d.item(), "period": p, "price": float(c),
+             "intrinsic_value": float(iv), "upside_pct": float(u)}
+            for d, p, c, iv, u in zip(dates, periods, closes,
+                                      intrinsic[offset:offset + n], upside[offset:offset + n])
+        ] if n else []
+        offset += n
+        if persist:
+            db.save_backtest_points(
+                t, key, todo[t]["stamps"],
+                [tuple(r.values()) for r in new],
+                since=None if todo[t]["since"] is None else todo[t]["since"].item(),
+            )
+        stored[t] = stored[t] + new
+
+    points = _points_columns(stored)
+    reused = len(points["ticker"]) - evaluated
+    if years is not None and len(points["asof"]):
+        start = points["asof"].max().astype("datetime64[M]") - np.timedelta64(12 * years, "M")
+        scored = points["asof"] >= start.astype("datetime64[D]")
+    else:
+        scored = np.ones(len(points["asof"]), dtype=bool)
+    return {
+        "params_key": key,
+        "points":     points,
+        "report":     hit_rates(points, horizons, relative, mask=scored),
+        "evaluated":  evaluated,
+        "reused":     reused,
+        "look_ahead": SNAPSHOT_INPUTS if snapshot else (),
+        "no_points":  [t for t in tickers if not stored[t]],
+    }
+
+
+def _points_columns(per_ticker: dict) -> dict:
+    tickers, asof, period, price, intrinsic, upside = [], [], [], [], [], []
+    for t in sorted(per_ticker):
+        for r in per_ticker[t]:
+            tickers.append(t)
+            asof.append(r["asof"])
+            period.append(r["period"])
+            price.append(r["price"])
+            intrinsic.append(r["intrinsic_value"])
+            upside.append(r["upside_pct"])
+    upside = np.array(upside, dtype=float)
+    return {
+        "ticker":          np.array(tickers, dtype=object),
+        "asof":            np.array(asof, dtype="datetime64[D]"),
+        "period":          np.array(period, dtype=object),
+        "price":           np.array(price, dtype=float),
+        "intrinsic_value": np.array(intrinsic, dtype=float),
+        "upside_pct":      upside,
+        "valuation_label": np.array([fc.valuation_label(u) for u in upside], dtype=object),
+    }
+
+
+# ── Scoring ────────────────────────────────────────────────────────────────────
+
+def forward_returns(points: dict, months: int) -> np.ndarray:
+    """
+    Return from each point's month-end to the same ticker's month-end
+    `months` later (NaN when that month is not in the data).  Matched by
+    ticker and calendar month, so points may be in any order and a ticker's
+    months need not be contiguous.
+    """
+    n = len(points["ticker"])
+    out = np.full(n, np.nan)
+    if not n:
+        return out
+    _, code = np.unique(points["ticker"], return_inverse=True)
+    month = points["asof"].astype("datetime64[M]").astype(np.int64)
+    span = month.max() - month.min() + months + 1
+    key = code * span + (month - month.min())
+    order = np.argsort(key, kind="stable")
+    sorted_key = key[order]
+    pos = np.searchsorted(sorted_key, key + months)
+    pos = np.minimum(pos, n - 1)
+    b = order[pos]
+    price = points["price"]
+    ok = (sorted_key[pos] == key + months) & (price > 0)
+    out[ok] = price[b[ok]] / price[ok] - 1
+    return out
+
+
+def hit_rates(
+    points: dict,
+    horizons: tuple = DEFAULT_HORIZONS,
+    relative: bool = False,
+    mask: Optional[np.ndarray] = None,
+) -> dict:
+    """
+    Per horizon (months): how often UNDERVALUED points went on to rise and
+    OVERVALUED points to fall.  relative=True measures returns against the
+    cross-sectional mean of the same month (a market-neutral hit rate).
+    """
+    labels = points["valuation_label"]
+    mask = np.ones(len(labels), dtype=bool) if mask is None else mask
+    month = points["asof"].astype("datetime64[M]").astype(int)
+    report = {}
+    for h in horizons:
+        fwd = forward_returns(points, h)
+        have = mask & ~np.isnan(fwd)
+        if relative and have.any():
+            months, inv = np.unique(month[have], return_inverse=True)
+            means = np.bincount(inv, weights=fwd[have]) / np.bincount(inv)
+            fwd = fwd.copy()
+            fwd[have] -= means[inv]
+
+        def stats(sel, hit=None):
+            n = int(sel.sum())
+            out = {"n": n, "mean_return": float(fwd[sel].mean()) if n else None}
+            if hit is not None:
+                out["hit_rate"] = float(hit[sel].mean()) if n else None
+            return out
+
+        under = have & (labels == UNDERVALUED)
+        over = have & (labels == OVERVALUED)
+        called = under | over
+        hits = np.where(under, fwd > 0, fwd < 0)
+        report[h] = {
+            "n":             int(have.sum()),
+            "undervalued":   stats(under, hits),
+            "overvalued":    stats(over, hits),
+            "fairly_valued": stats(have & ~called),
+            "hit_rate":      float(hits[called].mean()) if called.any() else None,
+        }
+    return report
@@ -4,7 +4,8 @@ Data Fetcher: Alpaca (price/market data) + Finnhub (financials)
 import os
 import time
 import requests
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -49,22 +50,71 @@ def get_latest_quote(symbol: str) -> dict:
     return {"price": 0, "size": 0, "time": ""}
 
 
-def get_historical_bars(symbol: str, days: int = 365) -> list:
-    """Daily OHLCV bars for past N days."""
-    end   = datetime.utcnow()
-    start = end - timedelta(days=days)
-    url   = f"{ALPACA_BASE}/stocks/{symbol}/bars"
+BARS_PAGE_LIMIT = 10000     # Alpaca's maximum bars per page
+
+
+def _alpaca_ts(when) -> str:
+    """Dates and "YYYY-MM-DD" strings → midnight UTC; datetimes keep their time (UTC)."""
+    if isinstance(when, str):
+        when = datetime.fromisoformat(when[:10])
+    if isinstance(when, datetime):
+        return when.strftime("%Y-%m-%dT%H:%M:%SZ")
+    return when.strftime("%Y-%m-%dT00:00:00Z")
+
+
+def get_bars_range(symbol: str, start, end=None) -> list:
+    """
+    Daily OHLCV bars from `start` up to `end` (default: now, so today's
+    bar so far is included), following Alpaca's next_page_token so long
+    ranges are not truncated.  start / end: date, UTC datetime or "YYYY-MM-DD".
+    Raises requests.HTTPError if any page fails — a partial range is never
+    returned, since callers resume from the last stored date.
+    """
+    url = f"{ALPACA_BASE}/stocks/{symbol}/bars"
     params = {
         "timeframe": "1Day",
-        "start":     start.strftime("%Y-%m-%dT00:00:00Z"),
-        "end":       end.strftime("%Y-%m-%dT00:00:00Z"),
-        "limit":     1000,
+        "start":     _alpaca_ts(start),
+        "end":       _alpaca_ts(end or datetime.now(timezone.utc)),
+        "limit":     BARS_PAGE_LIMIT,
         "feed":      "iex",
     }
-    r = requests.get(url, headers=_alpaca_headers(), params=params, timeout=15)
-    if r.status_code == 200:
-        return r.json().get("bars", [])
-    return []
+    bars = []
+    while True:
+        r = requests.get(url, headers=_alpaca_headers(), params=params, timeout=15)
+        r.raise_for_status()
+        data = r.json()
+        bars.extend(data.get("bars") or [])
+        token = data.get("next_page_token")
+        if not token:
+            return bars
+        params["page_token"] = token
+
+
+def get_historical_bars(symbol: str, days: int = 365) -> list:
+    """Daily OHLCV bars for past N days ([] if the request fails)."""
+    end = datetime.now(timezone.utc)
+    try:
+        return get_bars_range(symbol, end - timedelta(days=days), end)
+    except requests.RequestException:
+        return []
+
+
+def backfill_bars(symbol: str, years: int = 5, chunk_days: int = 365,
+                  max_workers: int = 4) -> list:
+    """
+    Multi-year history for a new ticker, up to now: the range is split into
+    chunk_days windows fetched in parallel, then merged oldest first.  If
+    any window fails the whole backfill raises, so nothing partial is stored.
+    """
+    end = datetime.now(timezone.utc)
+    start = end - timedelta(days=int(years * 365.25))
+    edges = []
+    while start < end:
+        edges.append((start, min(start + timedelta(days=chunk_days), end)))
+        start += timedelta(days=chunk_days)
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        chunks = list(ex.map(lambda e: get_bars_range(symbol, *e), edges))
+    return [b for chunk in chunks for b in chunk]
 
 
 def get_asset_info(symbol: str) -> dict:
@@ -102,6 +152,85 @@ def get_income_statement(symbol: str) -> dict:
         return {}
 
 
+# financials column → XBRL concepts (us-gaap_ / ifrs-full_ prefix dropped), first present wins
+REPORTED_CONCEPTS = {
+    "revenue":          ("Revenues", "RevenueFromContractWithCustomerExcludingAssessedTax",
+                         "SalesRevenueNet", "Revenue"),
+    "net_income":       ("NetIncomeLoss", "ProfitLoss", "ProfitLossAttributableToOwnersOfParent"),
+    "operating_income": ("OperatingIncomeLoss", "ProfitLossFromOperatingActivities"),
+    "depreciation":     ("DepreciationDepletionAndAmortization", "DepreciationAndAmortization",
+                         "DepreciationAmortizationAndAccretionNet", "Depreciation"),
+    "op_cash_flow":     ("NetCashProvidedByUsedInOperatingActivities",
+                         "NetCashProvidedByUsedInOperatingActivitiesContinuingOperations",
+                         "CashFlowsFromUsedInOperatingActivities"),
+    "capex":            ("PaymentsToAcquirePropertyPlantAndEquipment", "PaymentsToAcquireProductiveAssets",
+                         "PurchaseOfPropertyPlantAndEquipmentClassifiedAsInvestingActivities"),
+    "long_term_debt":   ("LongTermDebtNoncurrent", "LongTermBorrowings"),
+    "current_debt":     ("LongTermDebtCurrent", "DebtCurrent", "CurrentPortionOfLongtermBorrowings"),
+    "short_term_debt":  ("ShortTermBorrowings", "CommercialPaper"),
+    "total_equity":     ("StockholdersEquity", "Equity",
+                         "StockholdersEquityIncludingPortionAttributableToNoncontrollingInterest"),
+    "interest_exp":     ("InterestExpense", "InterestExpenseDebt", "InterestPaidNet", "FinanceCosts"),
+    "cash":             ("CashAndCashEquivalentsAtCarryingValue", "CashAndCashEquivalents"),
+    "shares_out":       ("WeightedAverageNumberOfDilutedSharesOutstanding",
+                         "WeightedAverageNumberOfSharesOutstandingBasic",
+                         "EntityCommonStockSharesOutstanding"),
+}
+
+
+def _reported_values(report: dict) -> dict:
+    """{concept without prefix: value} over every statement of one filing."""
+    values = {}
+    for section in (report or {}).values():
+        items = section.items() if isinstance(section, dict) else \
+                ((i.get("concept", ""), i.get("value")) for i in section or [])
+        for concept, value in items:
+            if isinstance(value, (int, float)):
+                values.setdefault(concept.split("_", 1)[-1], float(value))
+    return values
+
+
+def financials_from_reported(reported: dict) -> list[dict]:
+    """
+    get_income_statement() (Finnhub financials-reported, annual) → rows for
+    db_manager.upsert_financials(), one per fiscal year, keyed by the period
+    end date.  Amounts stay in the filing's units (dollars, shares); a
+    figure the filing does not report is 0.
+    """
+    rows = []
+    for filing in (reported or {}).get("data") or []:
+        end = str(filing.get("endDate") or "")[:10]
+        if not end or filing.get("quarter", 0) not in (0, None):
+            continue
+        values = _reported_values(filing.get("report"))
+
+        def first(column):
+            return next((values[c] for c in REPORTED_CONCEPTS[column] if c in values), 0.0)
+
+        op_cash_flow, capex = first("op_cash_flow"), abs(first("capex"))
+        operating_income = first("operating_income")
+        if "LongTermDebt" in values:        # already includes the current portion
+            debt = values["LongTermDebt"]
+        else:
+            debt = first("long_term_debt") + first("current_debt")
+        debt += first("short_term_debt")
+        rows.append({
+            "period":         end,
+            "revenue":        first("revenue"),
+            "net_income":     first("net_income"),
+            "ebitda":         operating_income + first("depreciation") if operating_income else 0.0,
+            "free_cash_flow": op_cash_flow - capex if op_cash_flow else 0.0,
+            "total_debt":     debt,
+            "total_equity":   first("total_equity"),
+            "interest_exp":   abs(first("interest_exp")),
+            "capex":          capex,
+            "op_cash_flow":   op_cash_flow,
+            "shares_out":     first("shares_out"),
+            "cash":           first("cash"),
+        })
+    return sorted(rows, key=lambda r: r["period"])
+
+
 def get_earnings(symbol: str) -> dict:
     try:
         return _fh("stock/earnings", {"symbol": symbol, "limit": 8})
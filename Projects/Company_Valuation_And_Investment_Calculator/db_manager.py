@@ -1,30 +1,305 @@
 """
-DuckDB manager — one database file per company ticker.
+DuckDB manager — one database file per company ticker, or (DB_STORAGE=
+consolidated) every company in one market database keyed by a ticker column.
 """
+import atexit
+import copy
 import os
 import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 import duckdb
+import numpy as np
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+log = logging.getLogger(__name__)
 
 DB_DIR = Path(os.path.dirname(__file__)) / "databases"
 DB_DIR.mkdir(exist_ok=True)
 
+# Seconds an unused database stays open; 0 closes it as soon as it is released
+POOL_IDLE_SECONDS = float(os.getenv("DB_POOL_IDLE_SECONDS", "30"))
+
+# "per_ticker": databases/<TICKER>.duckdb   "consolidated": one MARKET_DB_PATH
+STORAGE_MODES = ("per_ticker", "consolidated")
+STORAGE_MODE = os.getenv("DB_STORAGE", "per_ticker")
+MARKET_DB_PATH = Path(os.getenv("MARKET_DB_PATH", str(DB_DIR / "market.duckdb")))
+if STORAGE_MODE not in STORAGE_MODES:
+    raise ValueError(f"DB_STORAGE must be one of {STORAGE_MODES}, got {STORAGE_MODE!r}")
+
 
 def _db_path(ticker: str) -> Path:
     return DB_DIR / f"{ticker.upper()}.duckdb"
 
 
-def get_connection(ticker: str) -> duckdb.DuckDBPyConnection:
-    return duckdb.connect(str(_db_path(ticker)))
+def _consolidated() -> bool:
+    return STORAGE_MODE == "consolidated"
 
 
-def init_company_db(ticker: str) -> None:
-    """Create all tables for a company database."""
-    con = get_connection(ticker)
-    con.execute("""
-        CREATE TABLE IF NOT EXISTS company_profile (
-            ticker          VARCHAR PRIMARY KEY,
+def _scope(ticker: str) -> tuple[str, list]:
+    """
+    (SQL predicate, params) selecting one company's rows: the ticker column
+    in the consolidated database, every row of a per-ticker file.
+    """
+    if _consolidated():
+        return "ticker = ?", [ticker.upper()]
+    return "TRUE", []
+
+
+def _owner(ticker: str) -> dict:
+    """Extra {column: value} written with each row in the consolidated database."""
+    return {"ticker": ticker.upper()} if _consolidated() else {}
+
+
+# ── Connection pool ────────────────────────────────────────────────────────────
+
+class PooledConnection:
+    """
+    A cursor on a pooled database connection.  Behaves like a
+    DuckDBPyConnection; close() closes the cursor and hands the database back
+    to the pool instead of closing the file.
+    """
+
+    def __init__(self, pool: "ConnectionPool", path: str, cursor: duckdb.DuckDBPyConnection):
+        self._pool = pool
+        self._path = path
+        self._cursor = cursor
+        self._closed = False
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._cursor.close()
+            self._pool._release(self._path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    One open DuckDB connection per database file, shared by every caller.
+    Each connect() gets its own cursor (DuckDB's per-thread handle), so
+    threads can use the same database concurrently.  A database is closed
+    once it has had no users for idle_seconds, by a single daemon timer.
+    """
+
+    def __init__(self, idle_seconds: float = POOL_IDLE_SECONDS):
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] = {}
+        self._timer = None
+        self.opened = 0
+        self.reused = 0
+
+    def connect(self, path: str) -> PooledConnection:
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                entry = {"con": duckdb.connect(path), "users": 0, "last_used": time.monotonic()}
+                self._entries[path] = entry
+                self.opened += 1
+            else:
+                self.reused += 1
+            entry["users"] += 1
+            cursor = entry["con"].cursor()
+        return PooledConnection(self, path, cursor)
+
+    def _release(self, path: str) -> None:
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                return
+            entry["users"] -= 1
+            entry["last_used"] = time.monotonic()
+            if entry["users"] == 0 and self.idle_seconds <= 0:
+                self._close_entry(path)
+            elif self._timer is None:
+                self._arm(self.idle_seconds)
+
+    def _arm(self, delay: float) -> None:
+        self._timer = threading.Timer(delay, self._reap)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _reap(self) -> None:
+        """Timer callback: close databases idle for idle_seconds, re-arm for the rest."""
+        with self._lock:
+            self._timer = None
+            now = time.monotonic()
+            for path, entry in list(self._entries.items()):
+                if entry["users"] == 0 and now - entry["last_used"] >= self.idle_seconds:
+                    self._close_entry(path)
+            if self._entries:
+                next_due = min(e["last_used"] for e in self._entries.values()) + self.idle_seconds
+                self._arm(max(next_due - now, 0.05))
+
+    def _close_entry(self, path: str) -> None:
+        entry = self._entries.pop(path)
+        try:
+            entry["con"].close()
+        except duckdb.Error:
+            pass
+
+    def close_idle(self) -> None:
+        """Close every database with no active users (e.g. before ATTACHing the files)."""
+        with self._lock:
+            for path, entry in list(self._entries.items()):
+                if entry["users"] == 0:
+                    self._close_entry(path)
+
+    def close_all(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            for path in list(self._entries):
+                self._close_entry(path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "open":         len(self._entries),
+                "in_use":       sum(1 for e in self._entries.values() if e["users"]),
+                "opened":       self.opened,
+                "reused":       self.reused,
+                "idle_seconds": self.idle_seconds,
+            }
+
+
+pool = ConnectionPool()
+atexit.register(pool.close_all)
+
+
+def get_connection(ticker: str) -> PooledConnection:
+    if _consolidated():
+        return market_connection()
+    return pool.connect(str(_db_path(ticker)))
+
+
+def market_connection() -> PooledConnection:
+    """Pooled connection to the consolidated market database."""
+    return pool.connect(str(MARKET_DB_PATH))
+
+
+# ── Read cache ─────────────────────────────────────────────────────────────────
+
+# Seconds a cached read stays fresh, per table; writes through db_manager
+# invalidate sooner.  0 disables caching for that table.
+READ_CACHE_TTL = {
+    "company_profile": 3600.0,
+    "metrics":         900.0,
+    "valuation":       300.0,
+    "peers":           86400.0,
+}
+READ_CACHE_SIZE = int(os.getenv("DB_READ_CACHE_SIZE", "1024"))
+
+
+class ReadCache:
+    """
+    Thread-safe read-through cache of per-company reads: LRU-bounded,
+    entries expire after READ_CACHE_TTL[table] seconds and are dropped by
+    the matching writes.  Keys include the database path, so per-ticker
+    and consolidated storage never share entries.  Cached values are
+    shared (callers get a shallow copy) — treat nested values as read-only.
+    """
+
+    def __init__(self, maxsize: int = READ_CACHE_SIZE, ttl: dict = None):
+        self.maxsize = maxsize
+        self.ttl = dict(READ_CACHE_TTL if ttl is None else ttl)
+        self._entries: OrderedDict[tuple, tuple] = OrderedDict()
+        self._lock = threading.Lock()
+        self._epoch = 0                 # bumped by every invalidation
+        self.hits: dict[str, int] = {}
+        self.misses: dict[str, int] = {}
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(table: str, ticker: str) -> tuple:
+        path = str(MARKET_DB_PATH) if _consolidated() else str(_db_path(ticker))
+        return table, path, ticker.upper()
+
+    def get(self, table: str, ticker: str, load):
+        """Cached value of load(ticker), loading (and caching) it on a miss or expiry."""
+        ttl = self.ttl.get(table, 0)
+        if ttl <= 0 or self.maxsize <= 0:
+            return load(ticker)
+        key = self._key(table, ticker)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits[table] = self.hits.get(table, 0) + 1
+                return copy.copy(entry[1])
+            self.misses[table] = self.misses.get(table, 0) + 1
+            epoch = self._epoch
+        value = load(ticker)
+        with self._lock:
+            if epoch == self._epoch:    # no write landed while loading
+                self._entries[key] = (now + ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return copy.copy(value)
+
+    def invalidate(self, table: str, ticker: str = None) -> None:
+        """Drop `table`'s entry for `ticker` (every ticker when None)."""
+        with self._lock:
+            self._epoch += 1
+            self.invalidations += 1
+            if ticker is not None:
+                self._entries.pop(self._key(table, ticker), None)
+            else:
+                for key in [k for k in self._entries if k[0] == table]:
+                    del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            tables = sorted(set(self.hits) | set(self.misses))
+            return {
+                "size":          len(self._entries),
+                "maxsize":       self.maxsize,
+                "hits":          sum(self.hits.values()),
+                "misses":        sum(self.misses.values()),
+                "evictions":     self.evictions,
+                "invalidations": self.invalidations,
+                "by_table":      {t: {"hits": self.hits.get(t, 0), "misses": self.misses.get(t, 0)}
+                                  for t in tables},
+            }
+
+
+read_cache = ReadCache()
+
+
+# ── Schema ─────────────────────────────────────────────────────────────────────
+# table → (column definitions, primary key).  In the consolidated database
+# every table gets a leading `ticker` column that also leads its primary key
+# (company_profile is keyed by ticker already).
+
+_TABLES = {
+    "company_profile": ("""
+            ticker          VARCHAR,
             name            VARCHAR,
             exchange        VARCHAR,
             currency        VARCHAR,
@@ -35,23 +310,16 @@ def init_company_db(ticker: str) -> None:
             sector          VARCHAR,
             industry        VARCHAR,
             logo            VARCHAR,
-            fetched_at      TIMESTAMP DEFAULT current_timestamp
-        )
-    """)
-    con.execute("""
-        CREATE TABLE IF NOT EXISTS price_history (
+            fetched_at      TIMESTAMP DEFAULT current_timestamp""", ("ticker",)),
+    "price_history": ("""
             date            DATE,
             open            DOUBLE,
             high            DOUBLE,
             low             DOUBLE,
             close           DOUBLE,
-            volume          BIGINT,
-            PRIMARY KEY (date)
-        )
-    """)
-    con.execute("""
-        CREATE TABLE IF NOT EXISTS financials (
-            period          VARCHAR PRIMARY KEY,
+            volume          BIGINT""", ("date",)),
+    "financials": ("""
+            period          VARCHAR,
             revenue         DOUBLE,
             net_income      DOUBLE,
             ebitda          DOUBLE,
@@ -62,169 +330,500 @@ def init_company_db(ticker: str) -> None:
             capex           DOUBLE,
             op_cash_flow    DOUBLE,
             shares_out      DOUBLE,
-            fetched_at      TIMESTAMP DEFAULT current_timestamp
-        )
-    """)
-    con.execute("""
-        CREATE TABLE IF NOT EXISTS metrics (
-            key             VARCHAR PRIMARY KEY,
+            fetched_at      TIMESTAMP DEFAULT current_timestamp""", ("period",)),
+    "metrics": ("""
+            key             VARCHAR,
             value           DOUBLE,
-            fetched_at      TIMESTAMP DEFAULT current_timestamp
-        )
-    """)
-    con.execute("""
-        CREATE TABLE IF NOT EXISTS valuation (
-            run_id          VARCHAR PRIMARY KEY,
+            fetched_at      TIMESTAMP DEFAULT current_timestamp""", ("key",)),
+    "valuation": ("""
+            run_id          VARCHAR,
             wacc            DOUBLE,
             intrinsic_value DOUBLE,
             market_price    DOUBLE,
             npv_project     DOUBLE,
             irr_project     DOUBLE,
-            dcf_details     VARCHAR,  -- JSON blob
-            computed_at     TIMESTAMP DEFAULT current_timestamp
-        )
-    """)
-    con.execute("""
-        CREATE TABLE IF NOT EXISTS dividends (
+            dcf_details     VARCHAR,  -- JSON blob (runs saved before valuation_years)
+            computed_at     TIMESTAMP DEFAULT current_timestamp""", ("run_id",)),
+    "valuation_years": ("""
+            run_id          VARCHAR,
+            year            INTEGER,
+            fcf             DOUBLE,
+            pv              DOUBLE""", ("run_id", "year")),
+    "scenario_results": ("""
+            run_id          VARCHAR,
+            scenario_set    VARCHAR,
+            scenario        VARCHAR,
+            wacc            DOUBLE,
+            terminal_growth DOUBLE,
+            intrinsic_value DOUBLE,
+            market_price    DOUBLE,
+            upside_pct      DOUBLE,
+            computed_at     TIMESTAMP DEFAULT current_timestamp""", ("run_id", "scenario")),
+    "backtest_points": ("""
+            params_key      VARCHAR,
+            asof_date       DATE,
+            period          VARCHAR,
+            price           DOUBLE,
+            intrinsic_value DOUBLE,
+            upside_pct      DOUBLE""", ("params_key", "asof_date")),
+    "backtest_state": ("""
+            params_key      VARCHAR,
+            prices_stamp    VARCHAR,
+            fundamentals_stamp VARCHAR,
+            computed_at     TIMESTAMP DEFAULT current_timestamp""", ("params_key",)),
+    "dividends": ("""
             ex_date         DATE,
             amount          DOUBLE,
-            currency        VARCHAR,
-            PRIMARY KEY (ex_date)
-        )
-    """)
+            currency        VARCHAR""", ("ex_date",)),
+    "peers": ("""
+            peer_ticker     VARCHAR,
+            fetched_at      TIMESTAMP DEFAULT current_timestamp""", ("peer_ticker",)),
+}
+
+# Consolidated database only: the company registry and cross-company lookups
+_MARKET_DDL = (
+    """CREATE TABLE IF NOT EXISTS companies (
+            ticker          VARCHAR PRIMARY KEY,
+            added_at        TIMESTAMP DEFAULT current_timestamp
+        )""",
+    "CREATE INDEX IF NOT EXISTS metrics_key_idx ON metrics (key)",
+    "CREATE INDEX IF NOT EXISTS price_history_date_idx ON price_history (date)",
+    "CREATE INDEX IF NOT EXISTS valuation_computed_idx ON valuation (computed_at)",
+)
+
+
+def _create_tables(con, consolidated: bool) -> None:
+    for table, (columns, key) in _TABLES.items():
+        if consolidated and "ticker" not in key:
+            columns = "\n            ticker          VARCHAR NOT NULL," + columns
+            key = ("ticker", *key)
+        con.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns},\n"
+                    f"            PRIMARY KEY ({', '.join(key)}))")
+    if consolidated:
+        for ddl in _MARKET_DDL:
+            con.execute(ddl)
+
+
+def _valuation_run_columns(con, consolidated: bool) -> None:
+    for column in ("upside_pct", "terminal_value", "pv_terminal_value", "sum_pv_fcfs",
+                   "enterprise_value", "equity_value", "shares", "net_debt"):
+        con.execute(f"ALTER TABLE valuation ADD COLUMN IF NOT EXISTS {column} DOUBLE")
+
+
+def _financials_cash_column(con, consolidated: bool) -> None:
+    con.execute("ALTER TABLE financials ADD COLUMN IF NOT EXISTS cash DOUBLE")
+
+
+# ── Schema versions ────────────────────────────────────────────────────────────
+# Forward-only migrations: (version, description, fn(con, consolidated)).
+# Each runs once per database, in its own transaction, and is recorded in
+# schema_version.  Append new steps; never edit one that has shipped.
+# Version 1 uses IF NOT EXISTS throughout so files that predate versioning
+# (already holding some of the tables) upgrade cleanly.  Writers go through
+# init_company_db(); readers of a table or column added by a migration call
+# ensure_schema() first, so an old file is upgraded before it is queried.
+
+MIGRATIONS = (
+    (1, "base tables",                         _create_tables),
+    (2, "typed valuation run-log columns",     _valuation_run_columns),
+    (3, "cash on the financials statements",   _financials_cash_column),
+)
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+_schema_lock = threading.Lock()
+_schema_locks: dict[str, threading.Lock] = {}
+_schema_versions: dict[str, int] = {}   # database path → version known to be applied
+_registered: set[str] = set()           # consolidated: tickers known to be in `companies`
+
+
+def _current_version(con) -> int:
+    try:
+        return con.execute("SELECT coalesce(max(version), 0) FROM schema_version").fetchone()[0]
+    except duckdb.CatalogException:
+        return 0
+
+
+def _apply_migrations(con, consolidated: bool) -> tuple[int, int]:
+    """Run every pending migration on `con`; returns (version before, version after)."""
     con.execute("""
-        CREATE TABLE IF NOT EXISTS peers (
-            peer_ticker     VARCHAR PRIMARY KEY,
-            fetched_at      TIMESTAMP DEFAULT current_timestamp
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version         INTEGER PRIMARY KEY,
+            description     VARCHAR,
+            applied_at      TIMESTAMP DEFAULT current_timestamp
         )
     """)
-    con.close()
+    before = version = _current_version(con)
+    for step, description, migrate in MIGRATIONS:
+        if step <= version:
+            continue
+        con.execute("BEGIN TRANSACTION")
+        try:
+            migrate(con, consolidated)
+            con.execute("INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                        [step, description])
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+        version = step
+    return before, version
 
 
-def upsert_profile(ticker: str, profile: dict) -> None:
-    con = get_connection(ticker)
-    con.execute("""
-        INSERT OR REPLACE INTO company_profile
-            (ticker, name, exchange, currency, country, ipo_date,
-             market_cap, shares_out, sector, industry, logo, fetched_at)
-        VALUES (?,?,?,?,?,?,?,?,?,?,?,current_timestamp)
-    """, [
-        ticker.upper(),
-        profile.get("name", ""),
-        profile.get("exchange", ""),
-        profile.get("currency", "USD"),
-        profile.get("country", ""),
-        profile.get("ipo", ""),
-        profile.get("marketCapitalization", 0) * 1e6,
-        profile.get("shareOutstanding", 0) * 1e6,
-        profile.get("finnhubIndustry", ""),
-        profile.get("finnhubIndustry", ""),
-        profile.get("logo", ""),
-    ])
-    con.close()
-
-
-def upsert_price_history(ticker: str, bars: list) -> None:
-    if not bars:
-        return
-    con = get_connection(ticker)
-    for b in bars:
-        t = b.get("t", "")[:10]
-        con.execute("""
-            INSERT OR REPLACE INTO price_history (date, open, high, low, close, volume)
-            VALUES (?,?,?,?,?,?)
-        """, [t, b.get("o",0), b.get("h",0), b.get("l",0),
-              b.get("c",0), b.get("v",0)])
-    con.close()
+def ensure_schema(ticker: str) -> tuple[int, int]:
+    """
+    Bring the ticker's database (the market database when consolidated) to
+    SCHEMA_VERSION.  After the first call per process this is a dict lookup.
+    Returns (version before, version after).
+    """
+    path = str(MARKET_DB_PATH) if _consolidated() else str(_db_path(ticker))
+    known = _schema_versions.get(path, 0)
+    if known >= SCHEMA_VERSION:
+        return known, known
+    with _schema_lock:
+        lock = _schema_locks.setdefault(path, threading.Lock())
+    with lock:
+        known = _schema_versions.get(path, 0)
+        if known >= SCHEMA_VERSION:
+            return known, known
+        con = get_connection(ticker)
+        try:
+            versions = _apply_migrations(con, _consolidated())
+        finally:
+            con.close()
+        _schema_versions[path] = versions[1]
+    return versions
 
 
-def upsert_metrics(ticker: str, metrics_dict: dict) -> None:
-    con = get_connection(ticker)
-    for k, v in metrics_dict.items():
-        if isinstance(v, (int, float)):
-            con.execute("""
-                INSERT OR REPLACE INTO metrics (key, value, fetched_at)
-                VALUES (?,?,current_timestamp)
-            """, [k, float(v)])
-    con.close()
+def init_company_db(ticker: str) -> None:
+    """Make sure the company's database is at SCHEMA_VERSION (and registered when consolidated)."""
+    ensure_schema(ticker)
+    if _consolidated() and ticker.upper() not in _registered:
+        con = get_connection(ticker)
+        try:
+            con.execute("INSERT OR IGNORE INTO companies (ticker) VALUES (?)", [ticker.upper()])
+        finally:
+            con.close()
+        _registered.add(ticker.upper())
 
 
-def upsert_financials(ticker: str, rows: list[dict]) -> None:
-    """rows: list of dicts with standardised keys."""
-    con = get_connection(ticker)
-    for r in rows:
+def upgrade_all(tickers: list[str] = None, max_workers: int = 4) -> dict:
+    """
+    Apply pending migrations to every per-ticker file (or just `tickers`),
+    `max_workers` files at a time — or to the market database when
+    consolidated.  Returns {ticker: (version before, version after)}.
+    """
+    if _consolidated():
+        return {"*": ensure_schema("")}
+    tickers = list_companies() if tickers is None else [t.upper() for t in tickers]
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        return dict(zip(tickers, ex.map(ensure_schema, tickers)))
+
+
+def upsert_profile(ticker: str, profile: dict, con=None) -> None:
+    """con: write inside the caller's open transaction instead of a connection of its own."""
+    own = con is None
+    con = get_connection(ticker) if own else con
+    try:
         con.execute("""
-            INSERT OR REPLACE INTO financials
-                (period, revenue, net_income, ebitda, free_cash_flow,
-                 total_debt, total_equity, interest_exp, capex, op_cash_flow,
-                 shares_out, fetched_at)
+            INSERT OR REPLACE INTO company_profile
+                (ticker, name, exchange, currency, country, ipo_date,
+                 market_cap, shares_out, sector, industry, logo, fetched_at)
             VALUES (?,?,?,?,?,?,?,?,?,?,?,current_timestamp)
         """, [
-            r.get("period",""),
-            r.get("revenue", 0),
-            r.get("net_income", 0),
-            r.get("ebitda", 0),
-            r.get("free_cash_flow", 0),
-            r.get("total_debt", 0),
-            r.get("total_equity", 0),
-            r.get("interest_exp", 0),
-            r.get("capex", 0),
-            r.get("op_cash_flow", 0),
-            r.get("shares_out", 0),
+            ticker.upper(),
+            profile.get("name", ""),
+            profile.get("exchange", ""),
+            profile.get("currency", "USD"),
+            profile.get("country", ""),
+            profile.get("ipo", ""),
+            profile.get("marketCapitalization", 0) * 1e6,
+            profile.get("shareOutstanding", 0) * 1e6,
+            profile.get("finnhubIndustry", ""),
+            profile.get("finnhubIndustry", ""),
+            profile.get("logo", ""),
         ])
-    con.close()
+    finally:
+        if own:
+            con.close()
+    read_cache.invalidate("company_profile", ticker)
+
 
+# ── Bulk writers ───────────────────────────────────────────────────────────────
+# Rows are staged as columns and merged with one set-based INSERT OR REPLACE:
+# each column binds as a single typed list parameter and the lists are
+# unnested side by side, so N rows cost one statement, not N.
 
-def upsert_dividends(ticker: str, divs: list) -> None:
+def _last_per_key(keys: list) -> list[int]:
+    """Row indices keeping the last occurrence of each key (what a row loop would leave)."""
+    return sorted({k: i for i, k in enumerate(keys)}.values())
+
+
+def _bulk_upsert(ticker: str, table: str, columns: dict, types: dict,
+                 constants: dict = None, replace_all: bool = False, con=None) -> int:
+    """
+    INSERT OR REPLACE `columns` ({name: list}) into `table` in one statement
+    inside one transaction.  constants: {name: SQL expression} applied to
+    every row (e.g. fetched_at).  replace_all: delete the company's existing
+    rows first.  con: run inside the caller's open transaction on `con`
+    (see write_behind) rather than a transaction of its own.
+    """
+    n = len(next(iter(columns.values()), []))
+    owner = _owner(ticker)
+    names = list(owner) + list(columns) + list(constants or {})
+    select = (["?"] * len(owner) + [f"unnest(?::{types[c]}[])" for c in columns]
+              + list((constants or {}).values()))
+    where, params = _scope(ticker)
+
+    def write(c):
+        if replace_all:
+            c.execute(f"DELETE FROM {table} WHERE {where}", params)
+        if n:
+            c.execute(
+                f"INSERT OR REPLACE INTO {table} ({', '.join(names)}) SELECT {', '.join(select)}",
+                list(owner.values()) + list(columns.values()),
+            )
+
+    if con is not None:
+        write(con)
+        read_cache.invalidate(table, ticker)    # the caller invalidates again after COMMIT
+        return n
     con = get_connection(ticker)
+    try:
+        con.execute("BEGIN TRANSACTION")
+        write(con)
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+    finally:
+        con.close()
+    read_cache.invalidate(table, ticker)
+    return n
+
+
+def upsert_price_history(ticker: str, bars: list, con=None) -> int:
+    if not bars:
+        return 0
+    dates = [b.get("t", "")[:10] for b in bars]
+    keep = _last_per_key(dates)
+    return _bulk_upsert(ticker, "price_history", {
+        "date":   [dates[i] for i in keep],
+        "open":   [bars[i].get("o", 0) for i in keep],
+        "high":   [bars[i].get("h", 0) for i in keep],
+        "low":    [bars[i].get("l", 0) for i in keep],
+        "close":  [bars[i].get("c", 0) for i in keep],
+        "volume": [bars[i].get("v", 0) for i in keep],
+    }, {"date": "DATE", "open": "DOUBLE", "high": "DOUBLE", "low": "DOUBLE",
+        "close": "DOUBLE", "volume": "BIGINT"}, con=con)
+
+
+def upsert_metrics(ticker: str, metrics_dict: dict, con=None) -> int:
+    numeric = {k: float(v) for k, v in metrics_dict.items() if isinstance(v, (int, float))}
+    return _bulk_upsert(ticker, "metrics",
+                        {"key": list(numeric), "value": list(numeric.values())},
+                        {"key": "VARCHAR", "value": "DOUBLE"},
+                        constants={"fetched_at": "current_timestamp"}, con=con)
+
+
+FINANCIALS_COLUMNS = ("revenue", "net_income", "ebitda", "free_cash_flow", "total_debt",
+                      "total_equity", "interest_exp", "capex", "op_cash_flow", "shares_out",
+                      "cash")
+
+
+def upsert_financials(ticker: str, rows: list[dict], con=None) -> int:
+    """rows: list of dicts with standardised keys."""
+    periods = [r.get("period", "") for r in rows]
+    keep = _last_per_key(periods)
+    columns = {"period": [periods[i] for i in keep]}
+    columns.update({c: [rows[i].get(c, 0) for i in keep] for c in FINANCIALS_COLUMNS})
+    return _bulk_upsert(ticker, "financials", columns,
+                        {"period": "VARCHAR", **{c: "DOUBLE" for c in FINANCIALS_COLUMNS}},
+                        constants={"fetched_at": "current_timestamp"}, con=con)
+
+
+def validate_dividends(divs: list) -> tuple[list[tuple], list[dict]]:
+    """
+    Split Finnhub dividend records into valid (ex_date, amount, currency)
+    rows and rejected records.  A valid record has an ISO exDate and a
+    finite numeric amount.
+    """
+    valid, rejected = [], []
     for d in divs:
         try:
-            con.execute("""
-                INSERT OR REPLACE INTO dividends (ex_date, amount, currency)
-                VALUES (?,?,?)
-            """, [d.get("exDate",""), d.get("amount",0), d.get("currency","USD")])
-        except Exception:
-            pass
-    con.close()
+            ex_date = datetime.strptime(str(d.get("exDate", ""))[:10], "%Y-%m-%d").date()
+        except ValueError:
+            rejected.append(d)
+            continue
+        amount = d.get("amount", 0)
+        if isinstance(amount, bool) or not isinstance(amount, (int, float)) or not np.isfinite(amount):
+            rejected.append(d)
+            continue
+        valid.append((ex_date, float(amount), str(d.get("currency") or "USD")))
+    return valid, rejected
+
+
+def upsert_dividends(ticker: str, divs: list, con=None) -> int:
+    """
+    Write the valid records (see validate_dividends()); returns rows written.
+    Rejected records are logged as a warning (count and the first of them).
+    """
+    valid, rejected = validate_dividends(divs)
+    if rejected:
+        log.warning("%s: skipped %d of %d dividend records, first: %r",
+                    ticker.upper(), len(rejected), len(divs), rejected[0])
+    keep = _last_per_key([v[0] for v in valid])
+    return _bulk_upsert(ticker, "dividends", {
+        "ex_date":  [valid[i][0] for i in keep],
+        "amount":   [valid[i][1] for i in keep],
+        "currency": [valid[i][2] for i in keep],
+    }, {"ex_date": "DATE", "amount": "DOUBLE", "currency": "VARCHAR"}, con=con)
+
+
+def upsert_peers(ticker: str, peers: list, con=None) -> int:
+    names = list(dict.fromkeys(p for p in peers if p and p != ticker.upper()))
+    return _bulk_upsert(ticker, "peers", {"peer_ticker": names}, {"peer_ticker": "VARCHAR"},
+                        constants={"fetched_at": "current_timestamp"}, replace_all=True, con=con)
 
 
-def upsert_peers(ticker: str, peers: list) -> None:
+# Headline valuation outputs stored as typed columns of the run log
+VALUATION_COLUMNS = (
+    "wacc", "intrinsic_value", "market_price", "upside_pct", "npv_project", "irr_project",
+    "terminal_value", "pv_terminal_value", "sum_pv_fcfs", "enterprise_value",
+    "equity_value", "shares", "net_debt",
+)
+
+
+def new_run_id() -> str:
+    """Sortable, collision-free run id: UTC timestamp to the microsecond + random suffix."""
+    return f"{datetime.now(timezone.utc):%Y%m%d_%H%M%S_%f}_{uuid.uuid4().hex[:8]}"
+
+
+def _upside(intrinsic, price) -> float:
+    return (intrinsic - price) / price * 100 if price and price > 0 and intrinsic and intrinsic > 0 else 0.0
+
+
+def save_valuation(ticker: str, result: dict) -> str:
+    """
+    Append one run to the valuation log and return its run_id.  Headline
+    numbers go to typed columns; dcf_details["projected_fcfs"] rows go to
+    valuation_years — one transaction, no JSON.
+    """
+    dcf = result.get("dcf_details") or {}
+    price, intrinsic = result.get("market_price", 0), result.get("intrinsic_value", 0)
+    upside = result.get("upside_pct")
+    if upside is None:
+        upside = _upside(intrinsic, price)
+    values = {
+        "wacc":              result.get("wacc", 0),
+        "intrinsic_value":   intrinsic,
+        "market_price":      price,
+        "upside_pct":        upside,
+        "npv_project":       result.get("npv_project", 0),
+        "irr_project":       result.get("irr_project", 0),
+        "terminal_value":    dcf.get("terminal_value"),
+        "pv_terminal_value": dcf.get("pv_terminal_value"),
+        "sum_pv_fcfs":       dcf.get("sum_pv_fcfs"),
+        "enterprise_value":  dcf.get("enterprise_value"),
+        "equity_value":      dcf.get("equity_value"),
+        "shares":            dcf.get("shares"),
+        "net_debt":          dcf.get("net_debt"),
+    }
+    years = dcf.get("projected_fcfs") or []
+    init_company_db(ticker)             # older files gain the typed columns / child table
+    run_id = new_run_id()
+    owner = _owner(ticker)
+    names = [*owner, "run_id", *VALUATION_COLUMNS]
     con = get_connection(ticker)
-    con.execute("DELETE FROM peers")
-    for p in peers:
-        if p and p != ticker.upper():
-            con.execute("INSERT OR REPLACE INTO peers (peer_ticker, fetched_at) VALUES (?,current_timestamp)", [p])
-    con.close()
+    try:
+        con.execute("BEGIN TRANSACTION")
+        con.execute(f"""
+            INSERT INTO valuation ({", ".join(names)}, computed_at)
+            VALUES ({"?, " * len(names)}current_timestamp)
+        """, [*owner.values(), run_id,
+              *(None if values[c] is None else float(values[c]) for c in VALUATION_COLUMNS)])
+        if years:
+            con.execute(f"""
+                INSERT INTO valuation_years ({"".join(c + ", " for c in owner)}run_id, year, fcf, pv)
+                SELECT {"?, " * len(owner)}?, unnest(?::INTEGER[]), unnest(?::DOUBLE[]), unnest(?::DOUBLE[])
+            """, [*owner.values(), run_id,
+                  [int(y["year"]) for y in years],
+                  [float(y["fcf"]) for y in years],
+                  [float(y["pv"]) for y in years]])
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+    finally:
+        con.close()
+    read_cache.invalidate("valuation", ticker)
+    return run_id
 
 
-def save_valuation(ticker: str, result: dict) -> None:
+def save_scenario_results(ticker: str, run_id: str, scenario_set: str, cols: dict) -> None:
+    """cols: equal-length columns scenario, wacc, terminal_growth,
+    intrinsic_value, market_price, upside_pct (one row per scenario)."""
+    init_company_db(ticker)
+    owner = _owner(ticker)
+    owner_cols, owner_marks = "".join(c + ", " for c in owner), "?," * len(owner)
     con = get_connection(ticker)
-    run_id = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    con.execute("""
-        INSERT OR REPLACE INTO valuation
-            (run_id, wacc, intrinsic_value, market_price, npv_project,
-             irr_project, dcf_details, computed_at)
-        VALUES (?,?,?,?,?,?,?,current_timestamp)
-    """, [
-        run_id,
-        result.get("wacc", 0),
-        result.get("intrinsic_value", 0),
-        result.get("market_price", 0),
-        result.get("npv_project", 0),
-        result.get("irr_project", 0),
-        json.dumps(result.get("dcf_details", {})),
-    ])
-    con.close()
+    try:
+        con.execute("BEGIN TRANSACTION")
+        con.executemany(f"""
+            INSERT OR REPLACE INTO scenario_results
+                ({owner_cols}run_id, scenario_set, scenario, wacc, terminal_growth,
+                 intrinsic_value, market_price, upside_pct, computed_at)
+            VALUES ({owner_marks}?,?,?,?,?,?,?,?,current_timestamp)
+        """, [
+            [*owner.values(), run_id, scenario_set, str(sc), float(w), float(tg), float(iv),
+             float(px), float(up)]
+            for sc, w, tg, iv, px, up in zip(
+                cols["scenario"], cols["wacc"], cols["terminal_growth"],
+                cols["intrinsic_value"], cols["market_price"], cols["upside_pct"],
+            )
+        ])
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+    finally:
+        con.close()
+
+
+def get_scenario_results(ticker: str, run_id: str = None) -> list[dict]:
+    """Scenario rows of `run_id`, or of the most recent run."""
+    ensure_schema(ticker)
+    where, params = _scope(ticker)
+    con = get_connection(ticker)
+    try:
+        if run_id is None:
+            row = con.execute(
+                f"SELECT run_id FROM scenario_results WHERE {where} ORDER BY computed_at DESC LIMIT 1",
+                params,
+            ).fetchone()
+            if not row:
+                return []
+            run_id = row[0]
+        rows = con.execute(f"""
+            SELECT run_id, scenario_set, scenario, wacc, terminal_growth,
+                   intrinsic_value, market_price, upside_pct, computed_at
+            FROM scenario_results WHERE {where} AND run_id=? ORDER BY scenario
+        """, [*params, run_id]).fetchall()
+        cols = ["run_id", "scenario_set", "scenario", "wacc", "terminal_growth",
+                "intrinsic_value", "market_price", "upside_pct", "computed_at"]
+        return [dict(zip(cols, r)) for r in rows]
+    finally:
+        con.close()
 
 
 def get_latest_financials(ticker: str) -> list[dict]:
+    where, params = _scope(ticker)
     con = get_connection(ticker)
     try:
-        rows = con.execute("""
+        rows = con.execute(f"""
             SELECT period, revenue, net_income, ebitda, free_cash_flow,
                    total_debt, total_equity, interest_exp, capex, op_cash_flow, shares_out
-            FROM financials ORDER BY period DESC LIMIT 5
-        """).fetchall()
+            FROM financials WHERE {where} ORDER BY period DESC LIMIT 5
+        """, params).fetchall()
         cols = ["period","revenue","net_income","ebitda","free_cash_flow",
                 "total_debt","total_equity","interest_exp","capex","op_cash_flow","shares_out"]
         return [dict(zip(cols, r)) for r in rows]
@@ -232,39 +831,243 @@ def get_latest_financials(ticker: str) -> list[dict]:
         con.close()
 
 
-def get_price_history(ticker: str, limit: int = 252) -> list[dict]:
+PRICE_COLUMNS = ("date", "open", "high", "low", "close", "volume")
+
+
+def _price_query(ticker: str, start, end, limit, columns) -> tuple[str, list]:
+    """
+    (SQL, params) for price bars with start <= date <= end (either bound
+    optional), keeping the latest `limit` rows when given — oldest first.
+    """
+    unknown = set(columns) - set(PRICE_COLUMNS)
+    if unknown:
+        raise ValueError(f"unknown price columns {sorted(unknown)}; choose from {PRICE_COLUMNS}")
+    where, params = _scope(ticker)
+    if start is not None:
+        where += " AND date >= ?"
+        params.append(start)
+    if end is not None:
+        where += " AND date <= ?"
+        params.append(end)
+    select = ", ".join(dict.fromkeys(("date", *columns)))
+    sql = f"SELECT {select} FROM price_history WHERE {where} ORDER BY date DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    return f"SELECT {', '.join(columns)} FROM ({sql}) ORDER BY date", params
+
+
+def get_price_history(ticker: str, limit: int = 252, start=None, end=None) -> list[dict]:
+    """Bars as {"date": "YYYY-MM-DD", open, high, low, close, volume} dicts, oldest first."""
+    sql, params = _price_query(ticker, start, end, limit, PRICE_COLUMNS)
     con = get_connection(ticker)
     try:
-        rows = con.execute(f"""
-            SELECT date, open, high, low, close, volume
-            FROM price_history ORDER BY date DESC LIMIT {limit}
-        """).fetchall()
+        rows = con.execute(sql, params).fetchall()
         return [{"date": str(r[0]), "open": r[1], "high": r[2],
                  "low": r[3], "close": r[4], "volume": r[5]}
-                for r in reversed(rows)]
+                for r in rows]
+    finally:
+        con.close()
+
+
+def get_price_arrays(ticker: str, start=None, end=None, limit: int = None,
+                     columns: tuple = PRICE_COLUMNS) -> dict:
+    """
+    Columnar bars through DuckDB's NumPy fetch, oldest first: "date" as
+    datetime64[D], prices float64 (NaN for NULL), "volume" int64 (0 for NULL).
+    start / end: inclusive date bounds (date, datetime or ISO string).
+    """
+    sql, params = _price_query(ticker, start, end, limit, columns)
+    con = get_connection(ticker)
+    try:
+        raw = con.execute(sql, params).fetchnumpy()
+    finally:
+        con.close()
+    out = {}
+    for c in columns:
+        if c == "date":
+            out[c] = np.asarray(raw[c]).astype("datetime64[D]")
+        elif c == "volume":
+            out[c] = np.ma.filled(np.ma.asarray(raw[c], dtype=np.int64), 0)
+        else:
+            out[c] = np.ma.filled(np.ma.asarray(raw[c], dtype=float), np.nan)
+    return out
+
+
+def get_price_arrow(ticker: str, start=None, end=None, limit: int = None,
+                    columns: tuple = PRICE_COLUMNS):
+    """get_price_arrays() as a pyarrow Table (requires `pyarrow`)."""
+    sql, params = _price_query(ticker, start, end, limit, columns)
+    con = get_connection(ticker)
+    try:
+        return con.execute(sql, params).fetch_arrow_table()
+    finally:
+        con.close()
+
+
+def get_price_frame(ticker: str, start=None, end=None, limit: int = None,
+                    columns: tuple = PRICE_COLUMNS):
+    """get_price_arrays() as a pandas DataFrame indexed by date (requires `pandas`)."""
+    sql, params = _price_query(ticker, start, end, limit, columns)
+    con = get_connection(ticker)
+    try:
+        frame = con.execute(sql, params).df()
+    finally:
+        con.close()
+    return frame.set_index("date") if "date" in frame else frame
+
+
+def get_last_price_date(ticker: str):
+    """Date of the newest stored bar, or None when there is no price history."""
+    where, params = _scope(ticker)
+    con = get_connection(ticker)
+    try:
+        return con.execute(f"SELECT max(date) FROM price_history WHERE {where}", params).fetchone()[0]
+    except duckdb.CatalogException:     # tables not created yet
+        return None
+    finally:
+        con.close()
+
+
+def get_financials_history(ticker: str) -> list[dict]:
+    """Every stored financials period, oldest first."""
+    ensure_schema(ticker)               # cash column (migration 3)
+    where, params = _scope(ticker)
+    con = get_connection(ticker)
+    try:
+        rows = con.execute(f"""
+            SELECT period, {", ".join(FINANCIALS_COLUMNS)}
+            FROM financials WHERE {where} ORDER BY period
+        """, params).fetchall()
+        return [dict(zip(("period", *FINANCIALS_COLUMNS), r)) for r in rows]
+    finally:
+        con.close()
+
+
+def get_month_end_closes(ticker: str) -> tuple:
+    """(dates datetime64[D], closes float64) — last trading day of each month."""
+    where, params = _scope(ticker)
+    con = get_connection(ticker)
+    try:
+        rows = con.execute(f"""
+            SELECT max(date) AS d, arg_max(close, date) AS c
+            FROM price_history WHERE {where}
+            GROUP BY year(date), month(date) ORDER BY d
+        """, params).fetchall()
+    finally:
+        con.close()
+    dates = np.array([r[0] for r in rows], dtype="datetime64[D]")
+    return dates, np.array([r[1] for r in rows], dtype=float)
+
+
+def get_data_stamps(ticker: str) -> dict:
+    """Change markers for incremental jobs: latest price date, latest fundamentals fetch."""
+    where, params = _scope(ticker)
+    con = get_connection(ticker)
+    try:
+        row = con.execute(f"""
+            SELECT (SELECT max(date) FROM price_history WHERE {where}),
+                   (SELECT count(*) FROM price_history WHERE {where}),
+                   (SELECT max(fetched_at) FROM financials WHERE {where}),
+                   (SELECT max(fetched_at) FROM metrics WHERE {where}),
+                   (SELECT count(*) FROM financials WHERE {where})
+        """, params * 5).fetchone()
+    finally:
+        con.close()
+    return {"prices": f"{row[0]}|{row[1]}", "fundamentals": f"{row[2]}|{row[3]}|{row[4]}"}
+
+
+def get_backtest_points(ticker: str, params_key: str) -> tuple:
+    """(state dict or None, rows oldest first) for one backtest parameter set."""
+    ensure_schema(ticker)
+    where, params = _scope(ticker)
+    con = get_connection(ticker)
+    try:
+        state = con.execute(
+            f"SELECT prices_stamp, fundamentals_stamp FROM backtest_state "
+            f"WHERE {where} AND params_key=?",
+            [*params, params_key],
+        ).fetchone()
+        rows = con.execute(f"""
+            SELECT asof_date, period, price, intrinsic_value, upside_pct
+            FROM backtest_points WHERE {where} AND params_key=? ORDER BY asof_date
+        """, [*params, params_key]).fetchall()
+    finally:
+        con.close()
+    cols = ["asof", "period", "price", "intrinsic_value", "upside_pct"]
+    state = {"prices": state[0], "fundamentals": state[1]} if state else None
+    return state, [dict(zip(cols, r)) for r in rows]
+
+
+def save_backtest_points(ticker: str, params_key: str, stamps: dict,
+                         rows: list[tuple], since=None) -> None:
+    """
+    Replace the points dated >= `since` (all points if None) with `rows`
+    of (asof, period, price, intrinsic_value, upside_pct), and record the
+    data stamps they were computed from — in one transaction.
+    """
+    init_company_db(ticker)
+    where, params = _scope(ticker)
+    owner = _owner(ticker)
+    owner_cols, owner_marks = "".join(c + ", " for c in owner), "?," * len(owner)
+    con = get_connection(ticker)
+    try:
+        con.execute("BEGIN TRANSACTION")
+        if since is None:
+            con.execute(f"DELETE FROM backtest_points WHERE {where} AND params_key=?",
+                        [*params, params_key])
+        else:
+            con.execute(f"DELETE FROM backtest_points WHERE {where} AND params_key=? "
+                        f"AND asof_date >= ?", [*params, params_key, since])
+        if rows:
+            con.executemany(f"""
+                INSERT INTO backtest_points
+                    ({owner_cols}params_key, asof_date, period, price, intrinsic_value, upside_pct)
+                VALUES ({owner_marks}?,?,?,?,?,?)
+            """, [[*owner.values(), params_key, *r] for r in rows])
+        con.execute(f"""
+            INSERT OR REPLACE INTO backtest_state
+                ({owner_cols}params_key, prices_stamp, fundamentals_stamp, computed_at)
+            VALUES ({owner_marks}?,?,?,current_timestamp)
+        """, [*owner.values(), params_key, stamps["prices"], stamps["fundamentals"]])
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
     finally:
         con.close()
 
 
 def get_metric(ticker: str, key: str) -> float:
+    where, params = _scope(ticker)
     con = get_connection(ticker)
     try:
-        row = con.execute("SELECT value FROM metrics WHERE key=?", [key]).fetchone()
+        row = con.execute(f"SELECT value FROM metrics WHERE {where} AND key=?",
+                          [*params, key]).fetchone()
         return row[0] if row else 0.0
     finally:
         con.close()
 
 
 def get_all_metrics(ticker: str) -> dict:
+    return read_cache.get("metrics", ticker, _read_all_metrics)
+
+
+def _read_all_metrics(ticker: str) -> dict:
+    where, params = _scope(ticker)
     con = get_connection(ticker)
     try:
-        rows = con.execute("SELECT key, value FROM metrics").fetchall()
+        rows = con.execute(f"SELECT key, value FROM metrics WHERE {where}", params).fetchall()
         return {r[0]: r[1] for r in rows}
     finally:
         con.close()
 
 
 def get_profile(ticker: str) -> dict:
+    return read_cache.get("company_profile", ticker, _read_profile)
+
+
+def _read_profile(ticker: str) -> dict:
     con = get_connection(ticker)
     try:
         row = con.execute("SELECT * FROM company_profile WHERE ticker=?", [ticker.upper()]).fetchone()
@@ -278,42 +1081,302 @@ def get_profile(ticker: str) -> dict:
 
 
 def get_dividends_history(ticker: str) -> list[dict]:
+    where, params = _scope(ticker)
     con = get_connection(ticker)
     try:
-        rows = con.execute("SELECT ex_date, amount, currency FROM dividends ORDER BY ex_date DESC LIMIT 20").fetchall()
+        rows = con.execute(f"""
+            SELECT ex_date, amount, currency FROM dividends WHERE {where}
+            ORDER BY ex_date DESC LIMIT 20
+        """, params).fetchall()
         return [{"ex_date": str(r[0]), "amount": r[1], "currency": r[2]} for r in rows]
     finally:
         con.close()
 
 
 def get_peers_list(ticker: str) -> list:
+    return read_cache.get("peers", ticker, _read_peers_list)
+
+
+def _read_peers_list(ticker: str) -> list:
+    where, params = _scope(ticker)
     con = get_connection(ticker)
     try:
-        rows = con.execute("SELECT peer_ticker FROM peers").fetchall()
+        rows = con.execute(f"SELECT peer_ticker FROM peers WHERE {where}", params).fetchall()
         return [r[0] for r in rows]
     finally:
         con.close()
 
 
 def get_latest_valuation(ticker: str) -> dict:
+    """
+    The newest run: headline columns, plus dcf_details in the shape of
+    ValuationResult.dcf rebuilt from the typed columns and valuation_years.
+    (Runs logged before the typed columns existed fall back to their JSON.)
+    """
+    return read_cache.get("valuation", ticker, _read_latest_valuation)
+
+
+def _read_latest_valuation(ticker: str) -> dict:
+    ensure_schema(ticker)               # typed run-log columns (migration 2)
+    where, params = _scope(ticker)
     con = get_connection(ticker)
     try:
-        row = con.execute("""
-            SELECT wacc, intrinsic_value, market_price, npv_project, irr_project, dcf_details, computed_at
-            FROM valuation ORDER BY computed_at DESC LIMIT 1
-        """).fetchone()
-        if row:
-            return {
-                "wacc": row[0], "intrinsic_value": row[1], "market_price": row[2],
-                "npv_project": row[3], "irr_project": row[4],
-                "dcf_details": json.loads(row[5] or "{}"),
-                "computed_at": str(row[6]),
-            }
-        return {}
+        row = con.execute(f"""
+            SELECT run_id, {", ".join(VALUATION_COLUMNS)}, dcf_details, computed_at
+            FROM valuation WHERE {where} ORDER BY computed_at DESC, run_id DESC LIMIT 1
+        """, params).fetchone()
+        if not row:
+            return {}
+        run_id, *values, details, computed_at = row
+        out = dict(zip(VALUATION_COLUMNS, values))
+        years = con.execute(f"""
+            SELECT year, fcf, pv FROM valuation_years
+            WHERE {where} AND run_id=? ORDER BY year
+        """, [*params, run_id]).fetchall()
+    finally:
+        con.close()
+    if years or out["enterprise_value"] is not None:
+        dcf_details = {
+            "projected_fcfs":      [{"year": y, "fcf": f, "pv": pv} for y, f, pv in years],
+            "terminal_value":      out["terminal_value"],
+            "pv_terminal_value":   out["pv_terminal_value"],
+            "sum_pv_fcfs":         out["sum_pv_fcfs"],
+            "enterprise_value":    out["enterprise_value"],
+            "equity_value":        out["equity_value"],
+            "intrinsic_per_share": out["intrinsic_value"],
+            "shares":              out["shares"],
+            "net_debt":            out["net_debt"],
+        }
+    else:                               # logged before the typed columns existed
+        dcf_details = json.loads(details or "{}")
+        if out["upside_pct"] is None:
+            out["upside_pct"] = _upside(out["intrinsic_value"], out["market_price"])
+    return {
+        "run_id": run_id, "wacc": out["wacc"], "intrinsic_value": out["intrinsic_value"],
+        "market_price": out["market_price"], "upside_pct": out["upside_pct"],
+        "npv_project": out["npv_project"], "irr_project": out["irr_project"],
+        "dcf_details": dcf_details,
+        "computed_at": str(computed_at),
+    }
+
+
+def get_valuation_history(ticker: str, start=None, end=None,
+                          columns: tuple = ("intrinsic_value", "market_price", "upside_pct", "wacc")) -> dict:
+    """
+    Every logged run between start and end (inclusive timestamps, optional),
+    oldest first, as NumPy columns: "run_id", "computed_at" (datetime64[us])
+    and `columns` (float64, NaN for NULL) — e.g. intrinsic-value drift.
+    """
+    unknown = set(columns) - set(VALUATION_COLUMNS)
+    if unknown:
+        raise ValueError(f"unknown valuation columns {sorted(unknown)}; choose from {VALUATION_COLUMNS}")
+    ensure_schema(ticker)
+    where, params = _scope(ticker)
+    if start is not None:
+        where += " AND computed_at >= ?"
+        params.append(start)
+    if end is not None:
+        where += " AND computed_at <= ?"
+        params.append(end)
+    con = get_connection(ticker)
+    try:
+        raw = con.execute(f"""
+            SELECT run_id, computed_at, {", ".join(columns)}
+            FROM valuation WHERE {where} ORDER BY computed_at, run_id
+        """, params).fetchnumpy()
     finally:
         con.close()
+    out = {"run_id": np.asarray(raw["run_id"], dtype=object),
+           "computed_at": np.asarray(raw["computed_at"]).astype("datetime64[us]")}
+    for c in columns:
+        out[c] = np.ma.filled(np.ma.asarray(raw[c], dtype=float), np.nan)
+    return out
 
 
 def list_companies() -> list[str]:
-    """Return all tickers that have a database file."""
-    return [f.stem for f in sorted(DB_DIR.glob("*.duckdb"))]
+    """Return all tickers that have a database file (or a row in the market registry)."""
+    if not _consolidated():
+        return [f.stem for f in sorted(DB_DIR.glob("*.duckdb")) if f != MARKET_DB_PATH]
+    if not MARKET_DB_PATH.exists():
+        return []
+    con = market_connection()
+    try:
+        return [r[0] for r in con.execute("SELECT ticker FROM companies ORDER BY ticker").fetchall()]
+    except duckdb.CatalogException:     # market database not initialised yet
+        return []
+    finally:
+        con.close()
+
+
+# ── Cross-company reads ────────────────────────────────────────────────────────
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+class TableRead(NamedTuple):
+    """
+    What company_tables() reads of one table for every company: `columns`,
+    only rows matching `where` (SQL predicate), and with `latest` (an ORDER
+    BY list, newest first) only each company's newest such row.
+    """
+    columns: tuple
+    where: str = ""
+    latest: str = ""
+
+
+def _table_read_sql(table: str, read: TableRead, tickers: list[str] = None) -> str:
+    """SELECT for one TableRead: of a per-ticker file, or (tickers given) of the market database."""
+    where = [read.where] if read.where else []
+    if tickers is not None:
+        where.append(f"ticker IN ({', '.join(_quote(t) for t in tickers)})")
+    sql = f"SELECT {'ticker, ' if tickers is not None else ''}{', '.join(read.columns)} FROM {table}"
+    if where:
+        sql += " WHERE " + " AND ".join(f"({w})" for w in where)
+    if read.latest:
+        partition = "PARTITION BY ticker " if tickers is not None else ""
+        sql += f" QUALIFY row_number() OVER ({partition}ORDER BY {read.latest}) = 1"
+    return sql
+
+
+def _company_rows(ticker: str, tables: dict) -> dict:
+    """One per-ticker file's share of company_tables(): {table: Arrow table}, read through the pool."""
+    ensure_schema(ticker)
+    con = get_connection(ticker)
+    try:
+        return {table: con.execute(_table_read_sql(table, read)).fetch_arrow_table()
+                for table, read in tables.items()}
+    finally:
+        con.close()
+
+
+@contextmanager
+def company_tables(tickers: list[str], tables: dict, max_workers: int = 8):
+    """
+    One connection for a query across companies.  tables: {table: TableRead}.
+    Yields (con, names, sources, skipped): sources maps each table to a SQL
+    subquery of `ticker` plus the TableRead's columns for every company in
+    names — the market database's own table when consolidated.  Otherwise
+    each per-ticker file runs its reads (projection, filter and latest row
+    pushed down) through the connection pool, max_workers files at a time,
+    so concurrent readers and writers of those files are unaffected; the
+    results are concatenated into one in-memory table per source (requires
+    `pyarrow`).  names are the tickers that could be read, in
+    order; skipped maps each of the rest to the reason (missing file, read
+    error).
+    """
+    tickers = [t.upper() for t in tickers]
+    if _consolidated():
+        known = set(list_companies())
+        if known:
+            ensure_schema("")
+        names = [t for t in tickers if t in known]
+        con = market_connection()
+        try:
+            yield (con, names,
+                   {table: _table_read_sql(table, read, names) for table, read in tables.items()},
+                   {t: "not in the market database" for t in tickers if t not in known})
+        finally:
+            con.close()
+        return
+
+    import pyarrow as pa
+
+    present = [t for t in tickers if _db_path(t).exists()]
+    skipped = {t: "no database file" for t in tickers if t not in present}
+    rows = {}
+    if present:
+        with ThreadPoolExecutor(max_workers=max_workers) as ex:
+            futures = {t: ex.submit(_company_rows, t, tables) for t in present}
+        for t, future in futures.items():
+            try:
+                rows[t] = future.result()
+            except duckdb.Error as e:
+                skipped[t] = str(e)
+    names = [t for t in present if t in rows]
+    con = duckdb.connect()
+    try:
+        sources = {}
+        for table, read in tables.items():
+            parts = []
+            for t in names:
+                part = rows[t][table]
+                parts.append(part.add_column(0, "ticker", pa.array([t] * part.num_rows, pa.string())))
+            if parts:
+                con.register(f"all_{table}", pa.concat_tables(parts, promote_options="default"))
+                sources[table] = f"SELECT * FROM all_{table}"
+            else:                       # no company read: an empty source of the same columns
+                sources[table] = "SELECT " + ", ".join(f"NULL AS {c}" for c in ("ticker", *read.columns)) \
+                                 + " LIMIT 0"
+        yield con, names, sources, skipped
+    finally:
+        con.close()
+
+
+# ── Migration ──────────────────────────────────────────────────────────────────
+
+def migrate_to_consolidated(tickers: list[str] = None, target: Path = None) -> dict:
+    """
+    Import per-ticker files (all of them by default) into the consolidated
+    market database at `target` (MARKET_DB_PATH).  Each file is ATTACHed
+    read-only and every table copied with one INSERT OR REPLACE … SELECT,
+    so re-running the migration refreshes rather than duplicates.  Tables a
+    file predates are skipped.  The per-ticker files are left untouched.
+    Returns {"migrated": [tickers], "skipped": [tickers], "rows": {table: n}}.
+    """
+    target = Path(target or MARKET_DB_PATH)
+    if tickers is None:
+        tickers = [f.stem for f in sorted(DB_DIR.glob("*.duckdb")) if f.resolve() != target.resolve()]
+    pool.close_idle()                   # a file open in the pool cannot also be ATTACHed
+    migrated, skipped, counts = [], [], {t: 0 for t in _TABLES}
+    con = pool.connect(str(target))
+    try:
+        _apply_migrations(con, consolidated=True)
+        for ticker in (t.upper() for t in tickers):
+            try:
+                con.execute(f"ATTACH {_quote(str(_db_path(ticker)))} AS src (READ_ONLY)")
+            except duckdb.Error:
+                skipped.append(ticker)
+                continue
+            try:
+                con.execute("BEGIN TRANSACTION")
+                present = {r[0] for r in con.execute(
+                    "SELECT table_name FROM duckdb_tables() WHERE database_name = 'src'"
+                ).fetchall()}
+                for table in _TABLES:
+                    if table not in present:
+                        continue
+                    source = "*" if table == "company_profile" else "? AS ticker, *"
+                    params = [] if table == "company_profile" else [ticker]
+                    counts[table] += con.execute(
+                        f"INSERT OR REPLACE INTO {table} BY NAME SELECT {source} FROM src.{table}",
+                        params,
+                    ).fetchone()[0]
+                con.execute("INSERT OR IGNORE INTO companies (ticker) VALUES (?)", [ticker])
+                con.execute("COMMIT")
+                migrated.append(ticker)
+            except Exception:
+                con.execute("ROLLBACK")
+                raise
+            finally:
+                con.execute("DETACH src")
+    finally:
+        con.close()
+    return {"migrated": migrated, "skipped": skipped, "rows": counts}
+
+
+if __name__ == "__main__":
+    import sys
+
+    command = sys.argv[1:2]
+    if command == ["upgrade"]:
+        for name, (before, after) in upgrade_all(sys.argv[2:] or None).items():
+            print(f"  {name:<10} v{before} → v{after}")
+        sys.exit(0)
+    if command != ["migrate"]:
+        sys.exit("usage: python db_manager.py migrate|upgrade [TICKER ...]")
+    report = migrate_to_consolidated(sys.argv[2:] or None)
+    print(f"Migrated {len(report['migrated'])} companies into {MARKET_DB_PATH}"
+          + (f"; skipped {', '.join(report['skipped'])}" if report["skipped"] else ""))
+    for table, n in report["rows"].items():
+        print(f"  {table:<18} {n:>10,} rows")
@@ -4,11 +4,108 @@ Financial Calculations: TVM, WACC, DCF, NPV, IRR — all manual formulas.
 import math
 from typing import Optional
 
+import numpy as np
+
+
+# ── Discount Curve ─────────────────────────────────────────────────────────────
+
+class DiscountCurve:
+    """
+    Discount factors from a flat rate or a zero curve (annual compounding):
+        DF(t) = 1 / (1 + z(t))^t
+    z(t) is linearly interpolated between tenors and held flat outside them.
+    Compounding factors are cached per tenor, so a valuation run computes each
+    (1 + z)^t once no matter how many functions discount with the curve.
+    """
+
+    def __init__(self, tenors: list[float], zero_rates: list[float]):
+        tenors = np.asarray(tenors, dtype=float)
+        zero_rates = np.asarray(zero_rates, dtype=float)
+        if tenors.ndim != 1 or tenors.shape != zero_rates.shape or tenors.size == 0:
+            raise ValueError("tenors and zero_rates must be equal-length, non-empty 1-D sequences")
+        order = np.argsort(tenors)
+        self.tenors = tenors[order]
+        self.zero_rates = zero_rates[order]
+        self._compound: dict[float, float] = {}
+
+    @classmethod
+    def flat(cls, rate: float) -> "DiscountCurve":
+        """Single-rate curve — equivalent to discounting at `rate` everywhere."""
+        return cls([1.0], [rate])
+
+    @property
+    def is_flat(self) -> bool:
+        return bool(np.all(self.zero_rates == self.zero_rates[0]))
+
+    def zero_rate(self, t: float) -> float:
+        if self.zero_rates.size == 1:
+            return float(self.zero_rates[0])
+        return float(np.interp(t, self.tenors, self.zero_rates))
+
+    def compound_factor(self, t: float) -> float:
+        """(1 + z(t))^t, cached; inf when z(t) <= -1 so that PV → 0."""
+        cf = self._compound.get(t)
+        if cf is None:
+            z = self.zero_rate(t)
+            cf = math.inf if z <= -1 else (1 + z) ** t
+            self._compound[t] = cf
+        return cf
+
+    def df(self, t: float) -> float:
+        """Discount factor DF(t)."""
+        return 1 / self.compound_factor(t)
+
+    def __repr__(self) -> str:
+        if self.is_flat:
+            return f"DiscountCurve.flat({self.zero_rates[0]:.4%})"
+        return f"DiscountCurve({len(self.tenors)} tenors, {self.tenors[0]:g}y–{self.tenors[-1]:g}y)"
+
 
 # ── Time Value of Money ────────────────────────────────────────────────────────
+# `rate` may be a float or a DiscountCurve.  Amounts, rates and periods may also
+# be NumPy arrays: they broadcast against each other and the scalar edge cases
+# (rate <= -1, rate == 0) apply elementwise.  All-scalar calls return floats
+# exactly as before.
+
+_NUMBER = (float, int)      # np.float64 is a float
+
+
+def _is_array(*values) -> bool:
+    # Plain numbers skip np.ndim: scalar callers should not pay for the
+    # broadcasting path.  The TVM functions below also test _NUMBER inline
+    # first, since they run once per projected year.
+    for v in values:
+        if isinstance(v, _NUMBER):
+            continue
+        if isinstance(v, np.ndarray):
+            if v.ndim:
+                return True
+        elif np.ndim(v):
+            return True
+    return False
+
+
+def _arrays(*values) -> list[np.ndarray]:
+    return np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in values))
+
+
+def _on_curve(fn, amount, curve: DiscountCurve, n) -> np.ndarray:
+    """Elementwise fn(amount, curve, n) for array amounts / periods."""
+    return np.vectorize(lambda a, t: fn(a, curve, t), otypes=[float])(amount, n)
+
 
 def present_value(fv: float, rate: float, n: int) -> float:
     """PV = FV / (1 + r)^n"""
+    if isinstance(rate, _NUMBER) and isinstance(fv, _NUMBER) and isinstance(n, _NUMBER):
+        return 0.0 if rate <= -1 else fv / ((1 + rate) ** n)
+    if isinstance(rate, DiscountCurve):
+        if _is_array(fv, n):
+            return _on_curve(present_value, fv, rate, n)
+        return fv / rate.compound_factor(n)
+    if _is_array(fv, rate, n):
+        fv, rate, n = _arrays(fv, rate, n)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            return np.where(rate <= -1, 0.0, fv / ((1 + rate) ** n))
     if rate <= -1:
         return 0.0
     return fv / ((1 + rate) ** n)
@@ -16,11 +113,31 @@ def present_value(fv: float, rate: float, n: int) -> float:
 
 def future_value(pv: float, rate: float, n: int) -> float:
     """FV = PV * (1 + r)^n"""
+    if isinstance(rate, _NUMBER) and isinstance(pv, _NUMBER) and isinstance(n, _NUMBER):
+        return pv * ((1 + rate) ** n)
+    if isinstance(rate, DiscountCurve):
+        if _is_array(pv, n):
+            return _on_curve(future_value, pv, rate, n)
+        return pv * rate.compound_factor(n)
+    if _is_array(pv, rate, n):
+        pv, rate, n = _arrays(pv, rate, n)
+        with np.errstate(invalid="ignore", over="ignore"):
+            return pv * ((1 + rate) ** n)
     return pv * ((1 + rate) ** n)
 
 
 def pv_annuity(pmt: float, rate: float, n: int) -> float:
     """PV of ordinary annuity."""
+    if isinstance(rate, _NUMBER) and isinstance(pmt, _NUMBER) and isinstance(n, _NUMBER):
+        return pmt * n if rate == 0 else pmt * (1 - (1 + rate) ** (-n)) / rate
+    if isinstance(rate, DiscountCurve):
+        if _is_array(pmt, n):
+            return _on_curve(pv_annuity, pmt, rate, np.asarray(n, dtype=int))
+        return pmt * sum(rate.df(t) for t in range(1, n + 1))
+    if _is_array(pmt, rate, n):
+        pmt, rate, n = _arrays(pmt, rate, n)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            return np.where(rate == 0, pmt * n, pmt * (1 - (1 + rate) ** (-n)) / rate)
     if rate == 0:
         return pmt * n
     return pmt * (1 - (1 + rate) ** (-n)) / rate
@@ -28,6 +145,17 @@ def pv_annuity(pmt: float, rate: float, n: int) -> float:
 
 def fv_annuity(pmt: float, rate: float, n: int) -> float:
     """FV of ordinary annuity."""
+    if isinstance(rate, _NUMBER) and isinstance(pmt, _NUMBER) and isinstance(n, _NUMBER):
+        return pmt * n if rate == 0 else pmt * ((1 + rate) ** n - 1) / rate
+    if isinstance(rate, DiscountCurve):
+        if _is_array(pmt, n):
+            return _on_curve(fv_annuity, pmt, rate, np.asarray(n, dtype=int))
+        horizon = rate.compound_factor(n)
+        return pmt * sum(horizon / rate.compound_factor(t) for t in range(1, n + 1))
+    if _is_array(pmt, rate, n):
+        pmt, rate, n = _arrays(pmt, rate, n)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            return np.where(rate == 0, pmt * n, pmt * ((1 + rate) ** n - 1) / rate)
     if rate == 0:
         return pmt * n
     return pmt * ((1 + rate) ** n - 1) / rate
@@ -40,7 +168,9 @@ def capm_cost_of_equity(
     beta: float,
     market_risk_premium: float = 0.055,
 ) -> float:
-    """Ke = Rf + β × (Rm - Rf)"""
+    """Ke = Rf + β × (Rm - Rf)  (inputs broadcast if any is an array)"""
+    if _is_array(risk_free_rate, beta, market_risk_premium):
+        risk_free_rate, beta, market_risk_premium = _arrays(risk_free_rate, beta, market_risk_premium)
     return risk_free_rate + beta * market_risk_premium
 
 
@@ -56,7 +186,11 @@ def compute_wacc(
     """
     WACC = (E/V)*Ke + (D/V)*Kd*(1-t)
     Returns dict with wacc and component weights.
+    With array inputs every value in the dict is a broadcast array, and
+    zero-capital elements get the scalar fallback (wacc 10%, all equity).
     """
+    if _is_array(cost_of_equity, cost_of_debt, equity_value, debt_value, tax_rate):
+        return _compute_wacc_arrays(cost_of_equity, cost_of_debt, equity_value, debt_value, tax_rate)
     total = equity_value + debt_value
     if total == 0:
         return {"wacc": 0.10, "we": 1.0, "wd": 0.0, "ke": cost_of_equity, "kd": cost_of_debt}
@@ -75,6 +209,26 @@ def compute_wacc(
     }
 
 
+def _compute_wacc_arrays(ke, kd, equity_value, debt_value, tax_rate) -> dict:
+    ke, kd, equity_value, debt_value, tax_rate = _arrays(ke, kd, equity_value, debt_value, tax_rate)
+    total = equity_value + debt_value
+    empty = total == 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        we = np.where(empty, 1.0, equity_value / total)
+        wd = np.where(empty, 0.0, debt_value / total)
+    kd_after_tax = kd * (1 - tax_rate)
+    return {
+        "wacc":           np.where(empty, 0.10, we * ke + wd * kd * (1 - tax_rate)),
+        "we":             we,
+        "wd":             wd,
+        "ke":             ke,
+        "kd_after_tax":   kd_after_tax,
+        "equity_value":   equity_value,
+        "debt_value":     debt_value,
+        "tax_rate":       tax_rate,
+    }
+
+
 # ── Free Cash Flow Projection ──────────────────────────────────────────────────
 
 def project_fcfs(
@@ -90,6 +244,28 @@ def project_fcfs(
     return fcfs
 
 
+GROWTH_BOUNDS = (0.03, 0.30)    # starting growth rate is clamped to this range
+WACC_BOUNDS = (0.05, 0.25)      # sanity clamp on the WACC used for a valuation
+
+
+def growth_schedule(
+    rev_growth,
+    project_years: int = 5,
+    bounds: Optional[tuple[float, float]] = GROWTH_BOUNDS,
+):
+    """
+    Declining growth schedule: start at rev_growth (clamped to `bounds`),
+    fade 10 pts of it per year down to a floor of half the starting rate.
+    Scalar rev_growth → list; array rev_growth → (..., project_years) array.
+    """
+    g = np.asarray(rev_growth, dtype=float)
+    if bounds is not None:
+        g = np.clip(g, *bounds)
+    fade = np.maximum(1 - np.arange(project_years) * 0.1, 0.5)
+    schedule = g[..., None] * fade
+    return schedule.tolist() if g.ndim == 0 else schedule
+
+
 # ── Terminal Value ─────────────────────────────────────────────────────────────
 
 def terminal_value_gordon(
@@ -113,33 +289,40 @@ def dcf_valuation(
     net_debt: float = 0.0,
     shares_outstanding: float = 1.0,
     cash: float = 0.0,
+    greeks: bool = False,
 ) -> dict:
     """
-    Full DCF:
+    Full DCF (wacc may be a DiscountCurve):
       1. Project FCFs
       2. Discount each FCF at WACC
       3. Terminal value discounted back
       4. Enterprise value = sum PV(FCFs) + PV(TV)
       5. Equity value = EV - Net Debt
       6. Intrinsic value per share
+    greeks=True adds dcf_greeks() under "greeks".
     """
     projected = project_fcfs(base_fcf, growth_rates)
     n = len(projected)
 
+    # A plain rate is discounted inline — present_value()'s type dispatch
+    # would otherwise run once per projected year
+    flat = isinstance(wacc, _NUMBER) and wacc > -1
     pv_fcfs = []
     for i, fcf in enumerate(projected):
-        pv = present_value(fcf, wacc, i + 1)
+        pv = fcf / (1 + wacc) ** (i + 1) if flat else present_value(fcf, wacc, i + 1)
         pv_fcfs.append({"year": i + 1, "fcf": fcf, "pv": pv})
 
-    tv = terminal_value_gordon(projected[-1], wacc, terminal_growth)
-    pv_tv = present_value(tv, wacc, n)
+    # A curve's zero rate at the horizon stands in for WACC in the Gordon TV
+    tv_rate = wacc.zero_rate(n) if isinstance(wacc, DiscountCurve) else wacc
+    tv = terminal_value_gordon(projected[-1], tv_rate, terminal_growth)
+    pv_tv = tv / (1 + wacc) ** n if flat else present_value(tv, wacc, n)
 
     sum_pv_fcfs = sum(x["pv"] for x in pv_fcfs)
     enterprise_value = sum_pv_fcfs + pv_tv
     equity_value = enterprise_value - net_debt + cash
     intrinsic_per_share = equity_value / max(shares_outstanding, 1)
 
-    return {
+    result = {
         "projected_fcfs":      pv_fcfs,
         "terminal_value":      tv,
         "pv_terminal_value":   pv_tv,
@@ -150,6 +333,169 @@ def dcf_valuation(
         "shares":              shares_outstanding,
         "net_debt":            net_debt,
     }
+    if greeks:
+        result["greeks"] = {
+            k: v.tolist() for k, v in dcf_greeks(
+                base_fcf, wacc, growth_rates, terminal_growth,
+                net_debt, shares_outstanding, cash,
+            ).items()
+        }
+    return result
+
+
+# ── Valuation Greeks ───────────────────────────────────────────────────────────
+
+def dcf_greeks(
+    base_fcf,
+    wacc,
+    growth_rates,
+    terminal_growth=0.025,
+    net_debt=0.0,
+    shares_outstanding=1.0,
+    cash=0.0,
+) -> dict:
+    """
+    Closed-form ∂(intrinsic per share)/∂x for every DCF input, in one pass.
+    With F_t = B·Π(1+g_k), D_t = (1+r)^-t and TV = F_n(1+c)/(r-c):
+      ∂EV/∂B   = Σ (F_t/B)·D_t + (TV/B)·D_n
+      ∂EV/∂r   = -Σ t·F_t·D_t/(1+r) - n·TV·D_n/(1+r) - F_n(1+c)·D_n/(r-c)²
+      ∂EV/∂c   = F_n(1+r)·D_n/(r-c)²
+      ∂EV/∂g_j = (Σ_{t≥j} F_t·D_t + TV·D_n)/(1+g_j)
+    then ∂P/∂x = ∂EV/∂x / S, ∂P/∂ND = -1/S, ∂P/∂cash = 1/S, ∂P/∂S = -E/S².
+    Broadcasts like batch_dcf_valuation(); "growth" carries the year axis.
+    For a DiscountCurve, "wacc" is a parallel shift of the zero curve.
+    """
+    g = np.asarray(growth_rates, dtype=float)
+    n = g.shape[-1]
+    years = np.arange(1, n + 1)
+    if isinstance(wacc, DiscountCurve):
+        r = np.array([wacc.zero_rate(t) for t in years])
+    else:
+        r = np.asarray(wacc, dtype=float)[..., None] + np.zeros(n)
+    c = np.asarray(terminal_growth, dtype=float)
+    shares = np.asarray(shares_outstanding, dtype=float)
+    s_eff = np.maximum(shares, 1)
+
+    growth_factor = np.cumprod(1 + g, axis=-1)                  # F_t / B
+    fcf = np.asarray(base_fcf, dtype=float)[..., None] * growth_factor
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        live = r > -1
+        disc = np.where(live, (1 + r) ** -years, 0.0)
+        d_disc = np.where(live, -years * disc / (1 + r), 0.0)   # ∂D_t/∂r_t
+
+        r_n, d_n = r[..., -1], disc[..., -1]
+        has_tv = r_n > c
+        spread = np.where(has_tv, r_n - c, 1.0)
+        tv = np.where(has_tv, fcf[..., -1] * (1 + c) / spread, 0.0)
+
+        pv = fcf * disc
+        ev = pv.sum(axis=-1) + tv * d_n
+        d_base = (growth_factor * disc).sum(axis=-1) \
+            + np.where(has_tv, growth_factor[..., -1] * (1 + c) / spread * d_n, 0.0)
+        d_rate = (fcf * d_disc).sum(axis=-1) + tv * d_disc[..., -1] \
+            - np.where(has_tv, fcf[..., -1] * (1 + c) / spread ** 2 * d_n, 0.0)
+        d_tg = np.where(has_tv, fcf[..., -1] * (1 + r_n) / spread ** 2 * d_n, 0.0)
+        tail = np.cumsum(pv[..., ::-1], axis=-1)[..., ::-1]     # Σ_{t≥j} F_t·D_t
+        d_growth = (tail + (tv * d_n)[..., None]) / (1 + g)
+
+    equity = ev - np.asarray(net_debt, dtype=float) + np.asarray(cash, dtype=float)
+    per_share = 1 / s_eff
+    return {
+        "wacc":            d_rate * per_share,
+        "growth":          d_growth * per_share[..., None],
+        "terminal_growth": d_tg * per_share,
+        "base_fcf":        d_base * per_share,
+        "net_debt":        -per_share + np.zeros_like(equity),
+        "cash":            per_share + np.zeros_like(equity),
+        "shares":          np.where(shares > 1, -equity / shares ** 2, 0.0),
+    }
+
+
+# ── Batch DCF (vectorised) ─────────────────────────────────────────────────────
+
+def _dcf_arrays(
+    base_fcf,
+    wacc,
+    growth_rates,
+    terminal_growth=0.025,
+    net_debt=0.0,
+    shares_outstanding=1.0,
+    cash=0.0,
+) -> dict:
+    """
+    Broadcasted DCF kernel behind batch_dcf_valuation().
+    growth_rates carries the projection years on its last axis; every other
+    input broadcasts against growth_rates[..., 0].  Discount factors are only
+    expanded over the shape of `wacc`, so a WACC grid reuses one projection.
+    """
+    g = np.asarray(growth_rates, dtype=float)
+    if g.ndim == 0 or g.shape[-1] == 0:
+        raise ValueError("growth_rates needs at least one projection year")
+    n = g.shape[-1]
+
+    # 1. Project FCFs — same multiplication order as project_fcfs()
+    base = np.asarray(base_fcf, dtype=float)
+    lead = np.broadcast_shapes(base.shape, g.shape[:-1])
+    chain = np.concatenate(
+        [np.broadcast_to(base, lead)[..., None], np.broadcast_to(1 + g, lead + (n,))],
+        axis=-1,
+    )
+    projected = np.multiply.accumulate(chain, axis=-1)[..., 1:]
+
+    # 2–3. Discount FCFs and the Gordon terminal value
+    w  = np.asarray(wacc, dtype=float)
+    tg = np.asarray(terminal_growth, dtype=float)
+    years = np.arange(1, n + 1)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        compounding = (1 + w[..., None]) ** years
+        pv_fcfs = np.where(w[..., None] <= -1, 0.0, projected / compounding)
+        tv = np.where(w <= tg, 0.0, projected[..., -1] * (1 + tg) / (w - tg))
+        pv_tv = np.where(w <= -1, 0.0, tv / compounding[..., -1])
+
+    # 4–6. EV → equity → per share
+    sum_pv_fcfs = pv_fcfs.sum(axis=-1)
+    enterprise_value = sum_pv_fcfs + pv_tv
+    equity_value = enterprise_value - np.asarray(net_debt, dtype=float) + np.asarray(cash, dtype=float)
+    intrinsic_per_share = equity_value / np.maximum(np.asarray(shares_outstanding, dtype=float), 1)
+
+    return {
+        "projected_fcfs":      projected,
+        "pv_fcfs":             pv_fcfs,
+        "terminal_value":      tv,
+        "pv_terminal_value":   pv_tv,
+        "sum_pv_fcfs":         sum_pv_fcfs,
+        "enterprise_value":    enterprise_value,
+        "equity_value":        equity_value,
+        "intrinsic_per_share": intrinsic_per_share,
+    }
+
+
+def batch_dcf_valuation(
+    base_fcf,
+    wacc,
+    growth_rates,
+    terminal_growth=0.025,
+    net_debt=0.0,
+    shares_outstanding=1.0,
+    cash=0.0,
+) -> np.ndarray:
+    """
+    Vectorised dcf_valuation(): intrinsic value per share for every
+    broadcasted combination of inputs, in one NumPy pass.
+
+    growth_rates: (..., n_years) — one schedule, or one per ticker/scenario.
+    Other inputs are scalars or arrays broadcastable to growth_rates[..., 0],
+    e.g. 300 tickers × 11 WACCs:
+        batch_dcf_valuation(fcf[None, :], waccs[:, None], growth[None, :, :],
+                            tg, net_debt[None, :], shares[None, :], cash[None, :])
+    Matches dcf_valuation() to floating-point tolerance, including the
+    WACC <= g (TV = 0) and rate <= -1 (PV = 0) edge cases.
+    """
+    return _dcf_arrays(
+        base_fcf, wacc, growth_rates, terminal_growth,
+        net_debt, shares_outstanding, cash,
+    )["intrinsic_per_share"]
 
 
 # ── NPV ───────────────────────────────────────────────────────────────────────
@@ -159,8 +505,12 @@ def compute_npv(
     cash_flows: list[float],
     rate: float,
 ) -> float:
-    """NPV = -C0 + Σ CF_t / (1+r)^t"""
+    """NPV = -C0 + Σ CF_t / (1+r)^t   (rate may be a DiscountCurve)"""
     npv = -initial_investment
+    if isinstance(rate, DiscountCurve):
+        for t, cf in enumerate(cash_flows, start=1):
+            npv += cf / rate.compound_factor(t)
+        return npv
     for t, cf in enumerate(cash_flows, start=1):
         npv += cf / ((1 + rate) ** t)
     return npv
@@ -168,47 +518,183 @@ def compute_npv(
 
 # ── IRR ───────────────────────────────────────────────────────────────────────
 
+_IRR_LO, _IRR_HI = -0.999, 10.0   # default bracket: -99.9% … 1000%
+
+
+def _npv_and_slope(flows: list[float], r: float) -> tuple[float, float]:
+    """NPV(r) and dNPV/dr for flows indexed from t = 0 (Horner in x = 1/(1+r))."""
+    x = 1.0 / (1.0 + r)
+    p = dp = 0.0
+    for cf in reversed(flows):
+        dp = dp * x + p
+        p = p * x + cf
+    return p, -dp * x * x
+
+
+def irr_roots(
+    initial_investment: float,
+    cash_flows: list[float],
+) -> list[float]:
+    """
+    Every real IRR (> -100%) of a cash-flow stream, ascending.
+    NPV is a polynomial in x = 1/(1+r), so IRRs are its positive real roots.
+    Descartes' rule: at most one IRR per sign change in the flows.
+    """
+    flows = [-initial_investment] + list(cash_flows)
+    signs = [cf > 0 for cf in flows if cf != 0]
+    if sum(a != b for a, b in zip(signs, signs[1:])) == 0:
+        return []
+
+    roots = np.roots(np.asarray(flows[::-1], dtype=float))
+    real = roots.real[(np.abs(roots.imag) <= 1e-9 * np.maximum(np.abs(roots.real), 1)) & (roots.real > 0)]
+
+    rates = []
+    for x in sorted(real, reverse=True):          # ascending in r
+        r = 1.0 / float(x) - 1.0
+        for _ in range(3):                        # polish with Newton
+            f, df = _npv_and_slope(flows, r)
+            if df == 0:
+                break
+            r -= f / df
+        if not rates or abs(r - rates[-1]) > 1e-9 * (1 + abs(r)):
+            rates.append(r)
+    return rates
+
+
 def compute_irr(
     initial_investment: float,
     cash_flows: list[float],
     guess: float = 0.10,
-    max_iter: int = 1000,
-    tol: float = 1e-7,
+    max_iter: int = 100,
+    tol: float = 1e-10,
 ) -> Optional[float]:
     """
-    Find IRR via Newton-Raphson bisection.
-    IRR is the rate that makes NPV = 0.
+    IRR — the rate that makes NPV = 0 — via safeguarded Newton-Raphson.
+    Newton steps start at `guess` and use the analytic derivative; a step that
+    leaves the bracket or stalls becomes a bisection step instead.  Endpoint
+    NPVs are cached, so each iteration costs one NPV + derivative evaluation.
+    Converges when |ΔIRR| <= tol·(1+|IRR|).
+
+    If [-99.9%, 1000%] has no sign change, falls back to irr_roots() and
+    returns the root closest to `guess`; None when no real IRR exists.
     """
-    all_flows = [-initial_investment] + list(cash_flows)
-
-    def npv_fn(r):
-        return sum(cf / ((1 + r) ** t) for t, cf in enumerate(all_flows))
-
-    def npv_deriv(r):
-        return sum(-t * cf / ((1 + r) ** (t + 1)) for t, cf in enumerate(all_flows) if t > 0)
-
-    # Try bracketing
-    lo, hi = -0.999, 10.0
-    if npv_fn(lo) * npv_fn(hi) > 0:
-        # Scan for sign change
-        for test in [x / 100 for x in range(-99, 1000)]:
-            if npv_fn(lo) * npv_fn(test) <= 0:
-                hi = test
-                break
-        else:
-            return None
-
-    # Bisection
+    flows = [-initial_investment] + list(cash_flows)
+
+    lo, hi = _IRR_LO, _IRR_HI
+    f_lo, _ = _npv_and_slope(flows, lo)
+    f_hi, _ = _npv_and_slope(flows, hi)
+    if f_lo == 0:
+        return lo
+    if f_hi == 0:
+        return hi
+    if f_lo * f_hi > 0:
+        roots = irr_roots(initial_investment, cash_flows)
+        return min(roots, key=lambda x: abs(x - guess)) if roots else None
+
+    r = guess if lo < guess < hi else (lo + hi) / 2
+    dx_old = hi - lo
     for _ in range(max_iter):
-        mid = (lo + hi) / 2
-        val = npv_fn(mid)
-        if abs(val) < tol:
-            return mid
-        if npv_fn(lo) * val < 0:
-            hi = mid
+        f, df = _npv_and_slope(flows, r)
+        if f == 0:
+            return r
+        if (f < 0) == (f_lo < 0):
+            lo, f_lo = r, f
         else:
-            lo = mid
-    return (lo + hi) / 2
+            hi, f_hi = r, f
+
+        # Newton step, unless it leaves the bracket or isn't halving fast enough
+        step = f / df if df else math.inf
+        r_new = r - step
+        if not (lo < r_new < hi) or abs(2 * f) > abs(dx_old * df):
+            r_new = (lo + hi) / 2
+        dx_old = r_new - r
+
+        if abs(r_new - r) <= tol * (1 + abs(r)):
+            return r_new
+        r = r_new
+    return r
+
+
+def batch_irr(
+    initial_investment,
+    cash_flows,
+    guess=0.10,
+    max_iter: int = 100,
+    tol: float = 1e-10,
+) -> np.ndarray:
+    """
+    Vectorised compute_irr() over many cash-flow vectors at once.
+
+    cash_flows: (..., n) flows for t = 1..n; initial_investment broadcasts
+    to cash_flows[..., 0].  Every row runs the same safeguarded Newton /
+    bisection iteration, advanced together and retired as it converges.
+    Rows without a sign change in the default bracket fall back to
+    irr_roots().  NaN where no real IRR exists.
+    """
+    cfs = np.asarray(cash_flows, dtype=float)
+    c0 = -np.broadcast_to(np.asarray(initial_investment, dtype=float), cfs.shape[:-1])
+    flows = np.concatenate([c0[..., None], cfs], axis=-1)
+    shape = flows.shape[:-1]
+    flows = flows.reshape(-1, flows.shape[-1])
+    t = np.arange(flows.shape[-1])
+
+    def npv_and_slope(rows, r):
+        x = 1.0 / (1.0 + r)
+        disc = x[:, None] ** t
+        weighted = flows[rows] * disc
+        return weighted.sum(axis=1), -(weighted * t).sum(axis=1) * x
+
+    m = flows.shape[0]
+    every = np.arange(m)
+    lo = np.full(m, _IRR_LO)
+    hi = np.full(m, _IRR_HI)
+    f_lo, _ = npv_and_slope(every, lo)
+    f_hi, _ = npv_and_slope(every, hi)
+
+    out = np.full(m, np.nan)
+    out[f_lo == 0] = _IRR_LO
+    out[(f_hi == 0) & (f_lo != 0)] = _IRR_HI
+    bracketed = (f_lo * f_hi < 0)
+
+    g = np.broadcast_to(np.asarray(guess, dtype=float), shape).reshape(-1)
+    r = np.where((lo < g) & (g < hi), g, (lo + hi) / 2)
+    dx_old = hi - lo
+    active = np.nonzero(bracketed)[0]
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for _ in range(max_iter):
+            if active.size == 0:
+                break
+            ri = r[active]
+            f, df = npv_and_slope(active, ri)
+
+            same = np.signbit(f) == np.signbit(f_lo[active])
+            lo[active] = np.where(same, ri, lo[active])
+            f_lo[active] = np.where(same, f, f_lo[active])
+            hi[active] = np.where(same, hi[active], ri)
+
+            r_new = ri - f / df
+            bisect = (
+                ~np.isfinite(r_new)
+                | (r_new <= lo[active]) | (r_new >= hi[active])
+                | (np.abs(2 * f) > np.abs(dx_old[active] * df))
+            )
+            r_new = np.where(bisect, (lo[active] + hi[active]) / 2, r_new)
+            dx_old[active] = r_new - ri
+
+            exact = f == 0
+            done = exact | (np.abs(r_new - ri) <= tol * (1 + np.abs(ri)))
+            r[active] = np.where(exact, ri, r_new)
+            out[active[done]] = r[active[done]]
+            active = active[~done]
+
+    out[active] = r[active]   # max_iter reached: best estimate, like compute_irr
+
+    for i in np.nonzero(~bracketed & np.isnan(out))[0]:
+        roots = irr_roots(-flows[i, 0], flows[i, 1:].tolist())
+        if roots:
+            out[i] = min(roots, key=lambda x: abs(x - g[i]))
+    return out.reshape(shape)
 
 
 # ── Sensitivity Analysis ───────────────────────────────────────────────────────
@@ -225,12 +711,71 @@ def wacc_sensitivity(
     """Return intrinsic values across a range of WACCs."""
     if wacc_range is None:
         wacc_range = [w / 100 for w in range(6, 17)]
-    results = []
-    for w in wacc_range:
-        val = dcf_valuation(base_fcf, w, growth_rates, terminal_growth,
-                            net_debt, shares, cash)
-        results.append({"wacc": w, "intrinsic": val["intrinsic_per_share"]})
-    return results
+    values = batch_dcf_valuation(base_fcf, wacc_range, growth_rates,
+                                 terminal_growth, net_debt, shares, cash)
+    return [{"wacc": w, "intrinsic": float(v)} for w, v in zip(wacc_range, values)]
+
+
+SURFACE_PARAMS = ("wacc", "terminal_growth", "growth_shift", "base_fcf")
+
+
+def _surface_axis(param: str, base: float) -> np.ndarray:
+    """Default grid for a sensitivity_surface() axis, centred on `base`."""
+    if param == "wacc":
+        return np.arange(6, 17) / 100
+    if param == "terminal_growth":
+        return np.arange(2, 9) / 200             # 1.0% … 4.0% in 0.5% steps
+    if param == "growth_shift":
+        return np.arange(-5, 6) / 100            # ±5 pts on every year
+    return base * (1 + np.arange(-3, 4) / 10)    # base_fcf ±30%
+
+
+def sensitivity_surface(
+    base_fcf: float,
+    wacc: float,
+    growth_rates: list[float],
+    terminal_growth: float,
+    net_debt: float,
+    shares: float,
+    cash: float,
+    x_param: str = "wacc",
+    x_values=None,
+    y_param: str = "terminal_growth",
+    y_values=None,
+) -> dict:
+    """
+    Intrinsic value per share over a 2-D grid of any two of SURFACE_PARAMS
+    ("growth_shift" adds a constant to every year's growth rate).
+    The grid is one batch_dcf_valuation() call: the FCF projection is built
+    once per growth value and discount factors once per WACC, so a 200×200
+    WACC × terminal-growth surface costs O(200·years + 200²).
+    Returns {"x_param", "x_values", "y_param", "y_values", "values"[x, y]}.
+    """
+    for p in (x_param, y_param):
+        if p not in SURFACE_PARAMS:
+            raise ValueError(f"Unknown surface parameter '{p}'; choose from {SURFACE_PARAMS}")
+    if x_param == y_param:
+        raise ValueError("x_param and y_param must differ")
+
+    params = {"base_fcf": base_fcf, "wacc": wacc,
+              "terminal_growth": terminal_growth, "growth_shift": 0.0}
+    x = np.asarray(_surface_axis(x_param, params[x_param]) if x_values is None else x_values, dtype=float)
+    y = np.asarray(_surface_axis(y_param, params[y_param]) if y_values is None else y_values, dtype=float)
+    params[x_param] = x[:, None]
+    params[y_param] = y[None, :]
+
+    growth = np.asarray(growth_rates, dtype=float) + np.asarray(params["growth_shift"])[..., None]
+    values = batch_dcf_valuation(
+        params["base_fcf"], params["wacc"], growth, params["terminal_growth"],
+        net_debt, shares, cash,
+    )
+    return {
+        "x_param":  x_param,
+        "x_values": x,
+        "y_param":  y_param,
+        "y_values": y,
+        "values":   np.broadcast_to(values, (x.size, y.size)),
+    }
 
 
 # ── Helper: derive financials from Finnhub metrics ────────────────────────────
@@ -331,18 +876,16 @@ def derive_financials_from_metrics(metrics: dict, profile: dict) -> dict:
     }
 
 
-def run_full_valuation(
+def valuation_inputs(
     fin: dict,
-    market_price: float,
     risk_free_rate: float = 0.045,
     market_risk_premium: float = 0.055,
-    terminal_growth: float = 0.025,
     project_years: int = 5,
     tax_rate: float = 0.25,
 ) -> dict:
     """
-    One-shot full valuation pipeline.
-    fin: dict from derive_financials_from_metrics()
+    Deterministic DCF inputs shared by run_full_valuation() and the
+    Monte Carlo engine: CAPM Ke, clamped WACC and the growth schedule.
     """
     # 1. Cost of equity (CAPM)
     beta = max(fin.get("beta", 1.0) or 1.0, 0.1)
@@ -357,83 +900,319 @@ def run_full_valuation(
         tax_rate,
     )
     wacc = wacc_res["wacc"]
-    wacc = max(min(wacc, 0.25), 0.05)  # sanity clamp 5–25%
+    wacc = max(min(wacc, WACC_BOUNDS[1]), WACC_BOUNDS[0])  # sanity clamp 5–25%
 
-    # 3. FCF projection
-    base_fcf = fin.get("fcf_ttm", 0)
+    # 3. FCF projection — declining growth schedule
     rev_growth = fin.get("rev_growth_5y", 0.08) or 0.08
-    # Use declining growth schedule
-    growth_rates = []
-    g = min(max(rev_growth, 0.03), 0.30)
-    for i in range(project_years):
-        growth_rates.append(g * max(1 - i * 0.1, 0.5))
-
-    # 4. DCF
-    shares = fin.get("shares", 1)
-    net_debt = fin.get("net_debt", 0)
-    cash = fin.get("cash", 0)
-
-    dcf = dcf_valuation(
-        base_fcf, wacc, growth_rates, terminal_growth,
-        net_debt, shares, cash,
-    )
 
-    # 5. Hypothetical project NPV/IRR
-    # Assume a capex project = 10% of market cap, returns 12% of initial per yr for 7 yrs
-    project_cost = fin.get("market_cap", 0) * 0.05
-    if project_cost <= 0:
-        project_cost = abs(base_fcf) * 2
-    project_cfs = [project_cost * 0.15 * (1.05 ** y) for y in range(7)]
-    npv_proj = compute_npv(project_cost, project_cfs, wacc)
-    irr_proj = compute_irr(project_cost, project_cfs)
-
-    # 6. TVM examples (5-year PV/FV of FCFs)
-    tvm_table = []
-    for item in dcf["projected_fcfs"]:
-        yr = item["year"]
-        pv = present_value(item["fcf"], wacc, yr)
-        fv = future_value(item["fcf"], wacc, project_years - yr)
-        tvm_table.append({
-            "year": yr, "fcf": item["fcf"],
-            "pv": pv, "fv": fv,
-        })
-
-    # 7. Margin of safety
-    intrinsic = dcf["intrinsic_per_share"]
-    if market_price > 0 and intrinsic > 0:
-        upside_pct = (intrinsic - market_price) / market_price * 100
-    else:
-        upside_pct = 0.0
+    return {
+        "beta":         beta,
+        "ke":           ke,
+        "wacc_res":     wacc_res,
+        "wacc":         wacc,
+        "base_fcf":     fin.get("fcf_ttm", 0),
+        "growth":       min(max(rev_growth, GROWTH_BOUNDS[0]), GROWTH_BOUNDS[1]),
+        "growth_rates": growth_schedule(rev_growth, project_years),
+        "shares":       fin.get("shares", 1),
+        "net_debt":     fin.get("net_debt", 0),
+        "cash":         fin.get("cash", 0),
+    }
+
 
-    valuation_label = (
+def valuation_label(upside_pct: float) -> str:
+    """Rating from upside vs market price (±10% band = fairly valued)."""
+    return (
         "🟢 UNDERVALUED" if upside_pct > 10
         else "🔴 OVERVALUED" if upside_pct < -10
         else "🟡 FAIRLY VALUED"
     )
 
-    # Sensitivity
-    sensitivity = wacc_sensitivity(
-        base_fcf, growth_rates, terminal_growth,
-        net_debt, shares, cash,
+
+# ── Valuation Result ───────────────────────────────────────────────────────────
+
+class ValuationResult:
+    """
+    Compact result of run_full_valuation().
+
+    Headline numbers and per-year arrays (years, fcfs, pv_fcfs, growth) are
+    computed up front; the nested `dcf` dict, `tvm_table`, the sensitivity
+    tables and the hypothetical project NPV/IRR are built on first access.
+    Still reads like the old dict — result["wacc"], result.get("dcf", {}) —
+    so existing callers work unchanged.
+    """
+
+    __slots__ = (
+        "fin", "market_price", "risk_free_rate", "terminal_growth", "project_years",
+        "wacc", "ke", "beta", "wacc_details", "discount_curve",
+        "base_fcf", "net_debt", "shares", "cash",
+        "years", "growth", "fcfs", "pv_fcfs",
+        "terminal_value", "pv_terminal_value", "sum_pv_fcfs",
+        "enterprise_value", "equity_value", "intrinsic_value",
+        "upside_pct", "valuation_label",
+        "_dcf", "_tvm_table", "_sensitivity", "_surface", "_project", "_greeks",
     )
 
-    return {
-        "wacc":             wacc,
-        "ke":               ke,
-        "beta":             beta,
-        "wacc_details":     wacc_res,
-        "growth_rates":     growth_rates,
-        "dcf":              dcf,
-        "intrinsic_value":  intrinsic,
-        "market_price":     market_price,
-        "upside_pct":       upside_pct,
-        "valuation_label":  valuation_label,
-        "npv_project":      npv_proj,
-        "irr_project":      irr_proj or 0.0,
-        "project_cost":     project_cost,
-        "project_cfs":      project_cfs,
-        "tvm_table":        tvm_table,
-        "sensitivity":      sensitivity,
-        "risk_free_rate":   risk_free_rate,
-        "terminal_growth":  terminal_growth,
-    }
+    # Keys of the legacy result dict, all readable via result[key]
+    KEYS = (
+        "wacc", "ke", "beta", "wacc_details", "discount_curve", "growth_rates",
+        "dcf", "intrinsic_value", "market_price", "upside_pct", "valuation_label",
+        "npv_project", "irr_project", "project_cost", "project_cfs",
+        "tvm_table", "sensitivity", "sensitivity_surface",
+        "risk_free_rate", "terminal_growth", "greeks",
+    )
+
+    # Scalar fields of to_record() / records()
+    RECORD_FIELDS = (
+        "wacc", "ke", "beta", "market_price", "intrinsic_value", "upside_pct",
+        "terminal_value", "pv_terminal_value", "sum_pv_fcfs",
+        "enterprise_value", "equity_value", "base_fcf", "net_debt", "shares", "cash",
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    # ── Lazy sections ──────────────────────────────────────────────────────────
+
+    @property
+    def growth_rates(self) -> list[float]:
+        return self.growth.tolist()
+
+    @property
+    def dcf(self) -> dict:
+        if self._dcf is None:
+            self._dcf = {
+                "projected_fcfs": [
+                    {"year": int(y), "fcf": float(f), "pv": float(pv)}
+                    for y, f, pv in zip(self.years, self.fcfs, self.pv_fcfs)
+                ],
+                "terminal_value":      self.terminal_value,
+                "pv_terminal_value":   self.pv_terminal_value,
+                "sum_pv_fcfs":         self.sum_pv_fcfs,
+                "enterprise_value":    self.enterprise_value,
+                "equity_value":        self.equity_value,
+                "intrinsic_per_share": self.intrinsic_value,
+                "shares":              self.shares,
+                "net_debt":            self.net_debt,
+            }
+        return self._dcf
+
+    @property
+    def tvm_table(self) -> list[dict]:
+        """5-year PV/FV of FCFs; FV compounds each FCF to the horizon at the forward rate."""
+        if self._tvm_table is None:
+            curve = self.discount_curve
+            horizon = curve.compound_factor(self.project_years)
+            self._tvm_table = [
+                {"year": int(y), "fcf": float(f),
+                 "pv": present_value(float(f), curve, int(y)),
+                 "fv": float(f) * horizon / curve.compound_factor(int(y))}
+                for y, f in zip(self.years, self.fcfs)
+            ]
+        return self._tvm_table
+
+    @property
+    def sensitivity(self) -> list[dict]:
+        if self._sensitivity is None:
+            self._sensitivity = wacc_sensitivity(
+                self.base_fcf, self.growth, self.terminal_growth,
+                self.net_debt, self.shares, self.cash,
+            )
+        return self._sensitivity
+
+    @property
+    def sensitivity_surface(self) -> dict:
+        if self._surface is None:
+            self._surface = sensitivity_surface(
+                self.base_fcf, self.wacc, self.growth, self.terminal_growth,
+                self.net_debt, self.shares, self.cash,
+            )
+        return self._surface
+
+    def _compute_greeks(self) -> dict:
+        if self._greeks is None:
+            self._greeks = {
+                k: v.tolist() for k, v in dcf_greeks(
+                    self.base_fcf, self.discount_curve, self.growth,
+                    self.terminal_growth, self.net_debt, self.shares, self.cash,
+                ).items()
+            }
+        return self._greeks
+
+    @property
+    def greeks(self) -> dict:
+        """dcf_greeks() of intrinsic_value: ∂P/∂(wacc, growth[t], ...)."""
+        return self._compute_greeks()
+
+    def _project_npv_irr(self) -> dict:
+        # Hypothetical capex project = 5% of market cap, returning 15% of cost
+        # in year 1 and growing 5%/yr for 7 years
+        if self._project is None:
+            cost = self.fin.get("market_cap", 0) * 0.05
+            if cost <= 0:
+                cost = abs(self.base_fcf) * 2
+            cfs = [cost * 0.15 * (1.05 ** y) for y in range(7)]
+            self._project = {
+                "project_cost": cost,
+                "project_cfs":  cfs,
+                "npv_project":  compute_npv(cost, cfs, self.discount_curve),
+                "irr_project":  compute_irr(cost, cfs) or 0.0,
+            }
+        return self._project
+
+    @property
+    def project_cost(self) -> float:
+        return self._project_npv_irr()["project_cost"]
+
+    @property
+    def project_cfs(self) -> list[float]:
+        return self._project_npv_irr()["project_cfs"]
+
+    @property
+    def npv_project(self) -> float:
+        return self._project_npv_irr()["npv_project"]
+
+    @property
+    def irr_project(self) -> float:
+        return self._project_npv_irr()["irr_project"]
+
+    # ── Dict compatibility ─────────────────────────────────────────────────────
+
+    def __getitem__(self, key: str):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self.KEYS else default
+
+    def __contains__(self, key) -> bool:
+        return key in self.KEYS
+
+    def keys(self) -> tuple:
+        return self.KEYS
+
+    def to_dict(self) -> dict:
+        """Full legacy dict (computes every lazy section)."""
+        return {k: getattr(self, k) for k in self.KEYS}
+
+    def __repr__(self) -> str:
+        return (f"ValuationResult(intrinsic_value={self.intrinsic_value:.2f}, "
+                f"market_price={self.market_price:.2f}, wacc={self.wacc:.4f})")
+
+    # ── Compact serialisation ──────────────────────────────────────────────────
+
+    @classmethod
+    def record_dtype(cls) -> np.dtype:
+        return np.dtype([(f, "f8") for f in cls.RECORD_FIELDS])
+
+    def to_record(self) -> np.void:
+        """Headline numbers as one NumPy structured record."""
+        return np.array(tuple(float(getattr(self, f)) for f in self.RECORD_FIELDS),
+                        dtype=self.record_dtype())[()]
+
+    @classmethod
+    def records(cls, results: list["ValuationResult"]) -> np.ndarray:
+        """Structured array (one row per result) — 8 bytes per field."""
+        return np.array(
+            [tuple(float(getattr(r, f)) for f in cls.RECORD_FIELDS) for r in results],
+            dtype=cls.record_dtype(),
+        )
+
+    @classmethod
+    def to_arrow(cls, results: list["ValuationResult"], tickers: Optional[list[str]] = None):
+        """
+        pyarrow Table of headline fields plus per-year list columns.
+        Requires the optional `pyarrow` package.
+        """
+        import pyarrow as pa
+
+        columns = {}
+        if tickers is not None:
+            columns["ticker"] = pa.array(tickers, type=pa.string())
+        recs = cls.records(results)
+        for f in cls.RECORD_FIELDS:
+            columns[f] = pa.array(recs[f])
+        for f in ("growth", "fcfs", "pv_fcfs"):
+            columns[f] = pa.array([getattr(r, f) for r in results], type=pa.list_(pa.float64()))
+        return pa.table(columns)
+
+
+def run_full_valuation(
+    fin: dict,
+    market_price: float,
+    risk_free_rate: float = 0.045,
+    market_risk_premium: float = 0.055,
+    terminal_growth: float = 0.025,
+    project_years: int = 5,
+    tax_rate: float = 0.25,
+    discount_curve: Optional[DiscountCurve] = None,
+    greeks: bool = False,
+) -> ValuationResult:
+    """
+    One-shot full valuation pipeline.
+    fin: dict from derive_financials_from_metrics()
+    discount_curve: discount with a term structure instead of flat WACC —
+    the DCF, TVM table and project NPV all use the curve, and the terminal
+    value its zero rate at the horizon (WACC is still computed and reported).
+    Sensitivity, TVM, project NPV/IRR and greeks are computed lazily;
+    greeks=True computes the sensitivities up front.
+    """
+    # 1–3. CAPM, WACC and FCF growth schedule
+    inputs = valuation_inputs(fin, risk_free_rate, market_risk_premium,
+                              project_years, tax_rate)
+    wacc = inputs["wacc"]
+    base_fcf = inputs["base_fcf"]
+    growth = np.asarray(inputs["growth_rates"], dtype=float)
+
+    # 4. DCF — one curve shared by DCF, NPV and TVM so each factor is computed once
+    curve = discount_curve or DiscountCurve.flat(wacc)
+    fcfs = np.array(project_fcfs(base_fcf, inputs["growth_rates"]))
+    years = np.arange(1, fcfs.size + 1)
+    pv_fcfs = fcfs / np.array([curve.compound_factor(int(t)) for t in years])
+
+    tv_rate = curve.zero_rate(fcfs.size) if discount_curve else wacc
+    tv = terminal_value_gordon(float(fcfs[-1]), tv_rate, terminal_growth)
+    pv_tv = present_value(tv, curve, fcfs.size)
+    sum_pv_fcfs = float(pv_fcfs.sum())
+    enterprise_value = sum_pv_fcfs + pv_tv
+    equity_value = enterprise_value - inputs["net_debt"] + inputs["cash"]
+    intrinsic = equity_value / max(inputs["shares"], 1)
+
+    # 5. Margin of safety
+    if market_price > 0 and intrinsic > 0:
+        upside_pct = (intrinsic - market_price) / market_price * 100
+    else:
+        upside_pct = 0.0
+
+    result = ValuationResult(
+        fin=fin,
+        market_price=market_price,
+        risk_free_rate=risk_free_rate,
+        terminal_growth=terminal_growth,
+        project_years=project_years,
+        wacc=wacc,
+        ke=inputs["ke"],
+        beta=inputs["beta"],
+        wacc_details=inputs["wacc_res"],
+        discount_curve=curve,
+        base_fcf=base_fcf,
+        net_debt=inputs["net_debt"],
+        shares=inputs["shares"],
+        cash=inputs["cash"],
+        years=years,
+        growth=growth,
+        fcfs=fcfs,
+        pv_fcfs=pv_fcfs,
+        terminal_value=tv,
+        pv_terminal_value=pv_tv,
+        sum_pv_fcfs=sum_pv_fcfs,
+        enterprise_value=enterprise_value,
+        equity_value=equity_value,
+        intrinsic_value=intrinsic,
+        upside_pct=upside_pct,
+        valuation_label=valuation_label(upside_pct),
+    )
+    if greeks:
+        result._compute_greeks()
+    return result
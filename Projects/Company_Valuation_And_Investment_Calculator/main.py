@@ -8,6 +8,7 @@ import sys
 from datetime import datetime
 from pathlib import Path
 
+import numpy as np
 from textual.app import App, ComposeResult
 from textual.binding import Binding
 from textual.containers import Container, Horizontal, ScrollableContainer, Vertical
@@ -39,6 +40,10 @@ from rich import box
 import data_fetcher as df
 import db_manager as db
 import finance_calc as fc
+import price_sync as ps
+import screener as sc
+import valuation_cache as vc
+import write_behind as wb
 #import GitHub.Quant_Labs.Projects.Company_Valuation_And_Investment_Calculator.data_fetcher as df
 #import GitHub.Quant_Labs.Projects.Company_Valuation_And_Investment_Calculator.db_manager as db
 #import GitHub.Quant_Labs.Projects.Company_Valuation_And_Investment_Calculator.finance_calc as fc
@@ -169,8 +174,8 @@ class ChartWidget(Static):
     }
     """
 
-    def render_chart(self, prices: list[float], title: str = "Price History") -> str:
-        if not prices or len(prices) < 2:
+    def render_chart(self, prices, title: str = "Price History") -> str:
+        if len(prices) < 2:
             return f"[{DIM}]No price data available[/{DIM}]"
 
         # Sample to fit width
@@ -358,6 +363,23 @@ class DashboardScreen(Screen):
         scrollbar-gutter: stable;
     }
 
+    #screen-controls {
+        height: auto;
+        padding: 0 1;
+    }
+
+    #screen-filter {
+        width: 1fr;
+    }
+
+    #screen-sort {
+        width: 24;
+    }
+
+    #screen-table {
+        height: 1fr;
+    }
+
     #log-area {
         height: 1fr;
         border: solid $accent;
@@ -430,6 +452,15 @@ class DashboardScreen(Screen):
                         with ScrollableContainer():
                             yield Static(id="sens-panel")
 
+                    with TabPane("🧮 Screener", id="tab-screen"):
+                        with Horizontal(id="screen-controls"):
+                            yield Input(placeholder="upside_pct>10 pe_ratio<25 div_yield>1",
+                                        id="screen-filter")
+                            yield Select([(c, c) for c in sc.NUMERIC_COLUMNS], value="upside_pct",
+                                         allow_blank=False, id="screen-sort")
+                            yield Button("Run Screen", id="btn-run-screen", variant="primary")
+                        yield DataTable(id="screen-table", cursor_type="row", zebra_stripes=True)
+
                     with TabPane("📋 Log", id="tab-log"):
                         yield RichLog(id="log-area", highlight=True, markup=True)
 
@@ -490,6 +521,8 @@ class DashboardScreen(Screen):
         bid = event.button.id or ""
         if bid == "btn-add-company":
             self.action_add_company()
+        elif bid == "btn-run-screen":
+            self.action_run_screen()
         elif bid.startswith("company-"):
             ticker = bid.replace("company-", "")
             self._select_company(ticker)
@@ -525,6 +558,72 @@ class DashboardScreen(Screen):
     def action_quit_app(self) -> None:
         self.app.exit()
 
+    def on_input_submitted(self, event: Input.Submitted) -> None:
+        if event.input.id == "screen-filter":
+            self.action_run_screen()
+
+    def on_data_table_row_selected(self, event: DataTable.RowSelected) -> None:
+        ticker = event.row_key.value
+        if event.data_table.id == "screen-table" and ticker in self._companies:
+            self._select_company(ticker)
+            if ticker not in self._loaded_data:
+                self.action_refresh_data()
+
+    def action_run_screen(self) -> None:
+        try:
+            filters = sc.parse_filters(self.query_one("#screen-filter", Input).value)
+        except ValueError as e:
+            self._update_status(f"✗ {e}")
+            return
+        table = self.query_one("#screen-table", DataTable)
+        table.clear(columns=True)
+        table.add_columns("Ticker", "Name", "Sector", "Price", "Intrinsic", "Upside",
+                          "WACC", "P/E", "Div Yld", "Beta")
+        self.run_screen(filters, self.query_one("#screen-sort", Select).value)
+
+    # ── Screener (async worker) ───────────────────────────────────────────────
+
+    @work(thread=True, exclusive=True, group="screen")
+    def run_screen(self, filters: dict, sort_by: str) -> None:
+        self.app.call_from_thread(self._update_status, "⟳  Screening all companies...")
+        try:
+            shown, skipped = 0, {}
+            for batch in sc.iter_screen(filters, sort_by=sort_by, skipped=skipped):
+                rows = [self._screen_row(r) for r in batch]
+                keys = [r["ticker"] for r in batch]
+                self.app.call_from_thread(self._add_screen_rows, rows, keys)
+                shown += len(batch)
+            for ticker, reason in skipped.items():
+                self.app.call_from_thread(self._log, f"[{NEUTRAL}]⚠ Screen skipped {ticker}: {reason}[/{NEUTRAL}]")
+            note = f", {len(skipped)} skipped (see log)" if skipped else ""
+            self.app.call_from_thread(self._update_status,
+                                      f"✓ Screen: {shown} companies ranked by {sort_by}{note}")
+        except Exception as e:
+            self.app.call_from_thread(self._log, f"[{NEGATIVE}]✗ Screen failed: {e}[/{NEGATIVE}]")
+            self.app.call_from_thread(self._update_status, f"✗ Screen error: {e}")
+
+    def _add_screen_rows(self, rows: list, keys: list) -> None:
+        table = self.query_one("#screen-table", DataTable)
+        for row, key in zip(rows, keys):
+            table.add_row(*row, key=key)
+
+    @staticmethod
+    def _screen_row(r: dict) -> tuple:
+        upside, wacc = r["upside_pct"], r["wacc"]
+        return (
+            Text(r["ticker"], style=f"bold {ACCENT}"),
+            (r["name"] or "")[:24],
+            r["sector"] or "",
+            fmt_currency(r["price"]),
+            fmt_currency(r["intrinsic_value"]),
+            Text("N/A", style=DIM) if upside is None else
+            Text(f"{upside:+.1f}%", style=POSITIVE if upside >= 0 else NEGATIVE),
+            fmt_pct(None if wacc is None else wacc * 100),
+            fmt_num(r["pe_ratio"]),
+            fmt_pct(r["div_yield"]),
+            fmt_num(r["beta"]),
+        )
+
     # ── Data fetching (async worker) ──────────────────────────────────────────
 
     @work(thread=True)
@@ -536,20 +635,22 @@ class DashboardScreen(Screen):
             # Initialise DB
             db.init_company_db(ticker)
 
+            # Writes go to the write-behind queue, so disk work overlaps the
+            # next network call; one flush before the reads below.
+            writer = wb.default_writer
+
             # 1. Company profile
             self.app.call_from_thread(self._log, "  ↪ Fetching company profile...")
             profile_raw = df.get_company_profile(ticker)
             if profile_raw and profile_raw.get("name"):
-                db.upsert_profile(ticker, profile_raw)
-            profile = db.get_profile(ticker)
+                writer.submit(ticker, "company_profile", profile_raw)
 
             # 2. Metrics
             self.app.call_from_thread(self._log, "  ↪ Fetching financial metrics...")
             metrics_raw = df.get_basic_financials(ticker)
             metrics = metrics_raw.get("metric", {}) if isinstance(metrics_raw, dict) else {}
             if metrics:
-                db.upsert_metrics(ticker, metrics)
-            all_metrics = db.get_all_metrics(ticker)
+                writer.submit(ticker, "metrics", metrics)
 
             # 3. Price
             self.app.call_from_thread(self._log, "  ↪ Fetching latest price...")
@@ -558,27 +659,45 @@ class DashboardScreen(Screen):
 
             # 4. Historical bars
             self.app.call_from_thread(self._log, "  ↪ Fetching price history...")
-            bars = df.get_historical_bars(ticker, days=365)
-            if bars:
-                db.upsert_price_history(ticker, bars)
-            history = db.get_price_history(ticker)
+            sync = ps.sync_price_history(ticker, writer=writer)
+            if "error" in sync:
+                self.app.call_from_thread(
+                    self._log, f"[{NEGATIVE}]    {sync['mode']} from {sync['start']} failed "
+                               f"(will retry next refresh): {sync['error']}[/{NEGATIVE}]")
+            else:
+                self.app.call_from_thread(
+                    self._log, f"    {sync['mode']} from {sync['start']}: {sync['written']} bars")
 
             # 5. Dividends
             self.app.call_from_thread(self._log, "  ↪ Fetching dividends...")
             divs = df.get_dividends(ticker)
             if divs:
-                db.upsert_dividends(ticker, divs)
-            dividends = db.get_dividends_history(ticker)
+                writer.submit(ticker, "dividends", divs)
 
             # 6. Peers
             self.app.call_from_thread(self._log, "  ↪ Fetching peers...")
             peers = df.get_peers(ticker)
             if peers:
-                db.upsert_peers(ticker, peers)
+                writer.submit(ticker, "peers", peers)
+
+            # 7. Annual statements (point-in-time inputs for the backtest)
+            self.app.call_from_thread(self._log, "  ↪ Fetching annual statements...")
+            statements = df.financials_from_reported(df.get_income_statement(ticker))
+            if statements:
+                writer.submit(ticker, "financials", statements)
 
-            # 7. Recommendations / news
+            # 8. Recommendations / news
             recs  = df.get_recommendation_trends(ticker)
 
+            # Read back what was just written
+            if not writer.flush(ticker, timeout=wb.FLUSH_TIMEOUT):
+                raise TimeoutError(f"database writes for {ticker} not committed after "
+                                   f"{wb.FLUSH_TIMEOUT:.0f}s")
+            profile     = db.get_profile(ticker)
+            all_metrics = db.get_all_metrics(ticker)
+            history     = db.get_price_arrays(ticker, limit=252, columns=("date", "close"))
+            dividends   = db.get_dividends_history(ticker)
+
             # Consolidate
             fin = fc.derive_financials_from_metrics(
                 {"metric": all_metrics}, profile_raw or {}
@@ -617,14 +736,19 @@ class DashboardScreen(Screen):
             price = data.get("price", 0)
             if not fin or not price:
                 return
-            result = fc.run_full_valuation(fin, price)
+            result, cached = vc.default_cache.get_or_compute(fin, price, ticker=ticker)
             data["valuation"] = result
+            if cached and vc.matches_stored(db.get_latest_valuation(ticker), result, price):
+                # Inputs unchanged and this run is already the latest stored one
+                self._render_cached(ticker)
+                return
 
             # Save to DB
             db.save_valuation(ticker, {
                 "wacc":            result["wacc"],
                 "intrinsic_value": result["intrinsic_value"],
                 "market_price":    price,
+                "upside_pct":      result["upside_pct"],
                 "npv_project":     result["npv_project"],
                 "irr_project":     result["irr_project"],
                 "dcf_details":     result.get("dcf", {}),
@@ -645,7 +769,7 @@ class DashboardScreen(Screen):
         metrics   = data.get("metrics", {})
         fin       = data.get("fin", {})
         price     = data.get("price", 0)
-        history   = data.get("history", [])
+        history   = data.get("history", {})
         dividends = data.get("dividends", [])
         peers     = data.get("peers", [])
         valuation = data.get("valuation", {})
@@ -665,9 +789,10 @@ class DashboardScreen(Screen):
             op.update(op.render_overview(ticker, profile, fin, price, valuation))
 
             # Chart
-            prices = [b["close"] for b in history if b.get("close")]
+            closes = history.get("close", np.array([]))
+            prices = closes[np.nan_to_num(closes) > 0]
             chart_html = ""
-            if prices:
+            if len(prices):
                 cw = ChartWidget()
                 chart_html = cw.render_chart(prices, f"{ticker} — 1 Year Price History")
             self.query_one("#chart-area", Static).update(chart_html or f"[{DIM}]No price history available[/{DIM}]")
@@ -1043,11 +1168,30 @@ class DashboardScreen(Screen):
                     f"{bar_str}[bold yellow]{marker}[/bold yellow]"
                 )
 
+            surface = valuation.get("sensitivity_surface")
+            if surface is not None:
+                tg     = valuation.get("terminal_growth", 0.025)
+                ys     = surface["y_values"]
+                lines += [
+                    f"",
+                    f"  [bold {ACCENT}]── WACC × Terminal Growth Surface ───────────────────────────────[/bold {ACCENT}]",
+                    f"  {'WACC/g':>8}  " + "  ".join(f"[{NEUTRAL}]{fmt_pct(g*100):>9}[/{NEUTRAL}]" for g in ys),
+                    f"  {'─'*8}  " + "  ".join("─" * 9 for _ in ys),
+                ]
+                for w, row in zip(surface["x_values"], surface["values"]):
+                    cells = []
+                    for g, iv_wg in zip(ys, row):
+                        colour = POSITIVE if iv_wg > price else NEGATIVE
+                        style  = f"bold {colour} reverse" if abs(w - wacc) < 0.005 and abs(g - tg) < 0.0025 else colour
+                        cells.append(f"[{style}]{fmt_currency(iv_wg, decimals=0):>9}[/{style}]")
+                    lines.append(f"  [{NEUTRAL}]{fmt_pct(w*100):>8}[/{NEUTRAL}]  " + "  ".join(cells))
+
             lines += [
                 f"",
                 f"  [bold {ACCENT}]── Interpretation ───────────────────────────────────────────────[/bold {ACCENT}]",
                 f"  A higher WACC lowers intrinsic value (riskier discount rate).",
                 f"  Rows where IV > Market Price suggest undervaluation at that WACC.",
+                f"  Surface cells compare IV with market price; the highlighted cell is the base case.",
                 f"[bold {ACCENT}]{'═'*72}[/bold {ACCENT}]",
             ]
             self.query_one("#sens-panel", Static).update("\n".join(lines))
@@ -0,0 +1,182 @@
+"""
+Columnar Finnhub metrics for the whole universe: every company database's
+`metrics` table pivoted into one frame (dict of NumPy columns, one row per
+ticker), and derive_financials_from_metrics() applied as column operations.
+"""
+from typing import Optional
+
+import numpy as np
+
+import db_manager as db
+
+# Metric keys read by derive_financials_from_metrics()
+METRIC_KEYS = (
+    "sharesOutstanding", "beta",
+    "revenueTTM", "revenuePerShareTTM", "netIncomeTTM",
+    "freeCashFlowTTM", "freeCashFlowPerShareTTM", "ebitdaMarginTTM",
+    "totalDebt", "longTermDebt",
+    "interestExpenseAnnual", "interestExpense",
+    "cashAndEquivalentsAnnual", "cashAndCashEquivalents",
+    "dividendYieldIndicatedAnnual", "dividendYield",
+    "epsTTM", "epsBasicExclExtraItemsTTM",
+    "peBasicExclExtraTTM", "peRatio",
+    "revenueGrowth5Y", "revenueGrowthRate5Y",
+)
+
+FIN_COLUMNS = (
+    "shares", "market_cap", "price", "beta", "revenue_ttm", "net_income_ttm",
+    "fcf_ttm", "total_debt", "total_equity", "interest_exp", "cost_of_debt",
+    "cash", "net_debt", "div_yield", "eps_ttm", "pe_ratio", "rev_growth_5y",
+)
+
+
+# ── Loading ────────────────────────────────────────────────────────────────────
+
+def load_metrics_frame(
+    tickers: Optional[list[str]] = None,
+    keys: tuple = METRIC_KEYS,
+) -> dict:
+    """
+    Read `keys` from the metrics table and the profile's market cap / shares
+    of every company (or just `tickers`) in one query over
+    db.company_tables(): the key/value rows of all companies are pivoted to
+    one column per key with a single GROUP BY.
+    Returns {"ticker": object array, "market_cap", "shares_out", *keys,
+    "skipped"}; missing values are NaN.  Companies that cannot be read (no
+    database file, or a file locked by another process) are not rows of the
+    frame: "skipped" maps each of them to the reason.
+    """
+    tickers = db.list_companies() if tickers is None else tickers
+    columns = ("market_cap", "shares_out", *keys)
+    reads = {
+        "metrics":         db.TableRead(("key", "value"),
+                                        where=f"key IN ({', '.join(db._quote(k) for k in keys)})"),
+        "company_profile": db.TableRead(("market_cap", "shares_out")),
+    }
+    with db.company_tables(tickers, reads) as (con, names, src, skipped):
+        if not names:
+            frame = {"ticker": np.array([], dtype=object), **{c: np.array([]) for c in columns}}
+        else:
+            values = ", ".join(f"({i}, {db._quote(t)})" for i, t in enumerate(names))
+            pivot = ", ".join(f'max(kv.value) FILTER (WHERE kv.key = \'{k}\') AS "{k}"' for k in keys)
+            raw = con.execute(f"""
+                WITH names(pos, ticker) AS (VALUES {values}),
+                     kv   AS (SELECT ticker, key, value FROM ({src["metrics"]})),
+                     prof AS (SELECT ticker, max(market_cap) AS market_cap,
+                                     max(shares_out) AS shares_out
+                              FROM ({src["company_profile"]}) GROUP BY ticker)
+                SELECT n.ticker,
+                       CAST(p.market_cap AS DOUBLE) AS market_cap,
+                       CAST(p.shares_out AS DOUBLE) AS shares_out,
+                       {pivot}
+                FROM names n
+                LEFT JOIN prof p ON p.ticker = n.ticker
+                LEFT JOIN kv ON kv.ticker = n.ticker
+                GROUP BY n.pos, n.ticker, p.market_cap, p.shares_out
+                ORDER BY n.pos
+            """).fetchnumpy()
+            frame = {"ticker": np.asarray(raw["ticker"], dtype=object)}
+            for c in columns:
+                frame[c] = np.ma.filled(np.ma.asarray(raw[c], dtype=float), np.nan)
+    frame["skipped"] = skipped
+    return frame
+
+
+# ── Normalisation ──────────────────────────────────────────────────────────────
+
+def _first(frame: dict, *keys: str, default: float = 0.0) -> np.ndarray:
+    """Column version of `m.get(a) or m.get(b) or default` (NaN and 0 are falsy)."""
+    out = np.full(len(frame["ticker"]), default, dtype=float)
+    for k in reversed(keys):
+        col = frame.get(k)
+        if col is not None:
+            out = np.where(np.isnan(col) | (col == 0), out, col)
+    return out
+
+
+def normalize_metrics(frame: dict) -> dict:
+    """
+    derive_financials_from_metrics() over a load_metrics_frame() frame:
+    the same per-share / millions / dollars guesses and fallbacks, applied as
+    whole-column operations.  Profile columns are in dollars / shares as stored
+    in company_profile.  Returns {"ticker", *FIN_COLUMNS} as float64 arrays,
+    plus the frame's "skipped" {ticker: reason}.
+    """
+    market_cap = np.nan_to_num(frame["market_cap"])
+    shares = np.where(
+        np.isnan(frame["sharesOutstanding"]) | (frame["sharesOutstanding"] == 0),
+        np.nan_to_num(frame["shares_out"]),
+        frame["sharesOutstanding"] * 1e6,
+    )
+    price = market_cap / np.maximum(shares, 1)
+    beta = _first(frame, "beta", default=1.0)
+
+    revenue = _first(frame, "revenueTTM")
+    revenue = np.where(revenue != 0, revenue,
+                       np.nan_to_num(frame["revenuePerShareTTM"]) * shares / 1e6)
+    net_income = _first(frame, "netIncomeTTM")
+
+    # FCF: per-share or total, falling back to an EBITDA-margin estimate
+    fcf_raw = _first(frame, "freeCashFlowTTM", "freeCashFlowPerShareTTM")
+    margin = _first(frame, "ebitdaMarginTTM", default=0.15)
+    fcf = np.where(
+        (fcf_raw != 0) & (shares > 0),
+        fcf_raw * np.where(fcf_raw < 1000, shares, 1),
+        np.where(revenue != 0, revenue * margin * 0.6, 0.0),
+    )
+    per_share = (np.abs(fcf) > 0) & (np.abs(fcf) < 1000) & (shares > 1e6)
+    fcf = np.where(per_share, fcf * shares, fcf)
+
+    # Debt and cash: small values are taken to be in millions
+    def millions_to_dollars(values):
+        return np.where((values != 0) & (values < 1e6) & (shares > 1e6), values * 1e6, values)
+
+    total_debt = millions_to_dollars(_first(frame, "totalDebt", "longTermDebt"))
+    cash = millions_to_dollars(_first(frame, "cashAndEquivalentsAnnual", "cashAndCashEquivalents"))
+
+    interest = _first(frame, "interestExpenseAnnual", "interestExpense")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cost_of_debt = np.where((total_debt > 0) & (interest > 0), interest / total_debt, 0.04)
+
+    return {
+        "ticker":         frame["ticker"],
+        "shares":         shares,
+        "market_cap":     market_cap,
+        "price":          price,
+        "beta":           beta,
+        "revenue_ttm":    revenue,
+        "net_income_ttm": net_income,
+        "fcf_ttm":        fcf,
+        "total_debt":     total_debt,
+        "total_equity":   np.where(market_cap > 0, market_cap, shares * price),
+        "interest_exp":   interest,
+        "cost_of_debt":   np.clip(cost_of_debt, 0.01, 0.15),
+        "cash":           cash,
+        "net_debt":       np.maximum(total_debt - cash, 0),
+        "div_yield":      _first(frame, "dividendYieldIndicatedAnnual", "dividendYield"),
+        "eps_ttm":        _first(frame, "epsTTM", "epsBasicExclExtraItemsTTM"),
+        "pe_ratio":       _first(frame, "peBasicExclExtraTTM", "peRatio"),
+        "rev_growth_5y":  _first(frame, "revenueGrowth5Y", "revenueGrowthRate5Y", default=0.08),
+        "skipped":        frame.get("skipped", {}),
+    }
+
+
+def financials_frame(tickers: Optional[list[str]] = None) -> dict:
+    """load_metrics_frame() → normalize_metrics(): typed WACC/DCF inputs per ticker."""
+    return normalize_metrics(load_metrics_frame(tickers))
+
+
+def to_fins(fin_frame: dict) -> dict:
+    """{ticker: fin dict} for the per-ticker / universe APIs (scenarios, reverse DCF)."""
+    cols = [fin_frame[c].tolist() for c in FIN_COLUMNS]
+    return {t: dict(zip(FIN_COLUMNS, row)) for t, *row in zip(fin_frame["ticker"], *cols)}
+
+
+def to_arrow(fin_frame: dict):
+    """pyarrow Table of a normalize_metrics() frame (requires `pyarrow`)."""
+    import pyarrow as pa
+
+    return pa.table({
+        "ticker": pa.array(list(fin_frame["ticker"]), type=pa.string()),
+        **{c: pa.array(fin_frame[c], type=pa.float64()) for c in FIN_COLUMNS},
+    })
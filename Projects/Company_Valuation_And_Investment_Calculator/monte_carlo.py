@@ -0,0 +1,225 @@
+"""
+Monte Carlo DCF: sample growth / WACC / terminal-growth inputs from
+(optionally correlated) distributions and return the intrinsic-value
+distribution instead of a single point estimate.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+from scipy.special import ndtr
+
+import finance_calc as fc
+
+# Inputs that can be sampled; anything not given a distribution stays fixed
+# at its run_full_valuation() value.
+SAMPLED_INPUTS = ("growth", "wacc", "terminal_growth", "fcf_scale")
+
+DEFAULT_CHUNK_SIZE = 50_000
+DEFAULT_PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+
+
+# ── Distributions (Gaussian copula) ───────────────────────────────────────────
+#
+# Every input is driven by a standard normal z, so correlation is imposed once
+# on the z's (Cholesky) and each marginal is then a transform of its own z:
+#   ("normal",     mean, sd)
+#   ("lognormal",  mu, sigma)          exp(mu + sigma·z)
+#   ("uniform",    lo, hi)
+#   ("triangular", lo, mode, hi)
+#   ("fixed",      value)
+
+def _transform(spec: tuple, z: np.ndarray) -> np.ndarray:
+    kind, *p = spec
+    if kind == "normal":
+        return p[0] + p[1] * z
+    if kind == "lognormal":
+        return np.exp(p[0] + p[1] * z)
+    if kind == "uniform":
+        return p[0] + (p[1] - p[0]) * ndtr(z)
+    if kind == "triangular":
+        lo, mode, hi = p
+        if not lo <= mode <= hi:
+            raise ValueError(f"triangular spec needs lo <= mode <= hi, got {tuple(p)}")
+        if hi == lo:                        # degenerate: a fixed value
+            return np.full_like(z, lo)
+        u = ndtr(z)
+        c = (mode - lo) / (hi - lo)
+        return np.where(
+            u < c,
+            lo + np.sqrt(u * (hi - lo) * (mode - lo)),
+            hi - np.sqrt((1 - u) * (hi - lo) * (hi - mode)),
+        )
+    if kind == "fixed":
+        return np.full_like(z, p[0])
+    raise ValueError(f"Unknown distribution '{kind}'")
+
+
+def _cholesky(names: list[str], correlation) -> Optional[np.ndarray]:
+    """
+    correlation: None, a k×k matrix ordered like `names`, or a dict of
+    pairs {("wacc", "growth"): -0.3, ...}.
+    """
+    if correlation is None:
+        return None
+    k = len(names)
+    if isinstance(correlation, dict):
+        corr = np.eye(k)
+        for (a, b), rho in correlation.items():
+            i, j = names.index(a), names.index(b)
+            corr[i, j] = corr[j, i] = rho
+    else:
+        corr = np.asarray(correlation, dtype=float)
+        if corr.shape != (k, k):
+            raise ValueError(f"correlation must be {k}×{k} for inputs {names}")
+    try:
+        return np.linalg.cholesky(corr)
+    except np.linalg.LinAlgError:
+        raise ValueError("correlation matrix is not positive definite") from None
+
+
+# ── Simulation ─────────────────────────────────────────────────────────────────
+
+def _simulate_chunk(args: tuple) -> np.ndarray:
+    """
+    Intrinsic value per share for one chunk of paths (process-pool safe);
+    NaN for paths whose WACC is not above their terminal growth.
+    """
+    size, seed_seq, names, specs, chol, base, project_years = args
+    rng = np.random.default_rng(seed_seq)
+
+    z = rng.standard_normal((size, len(names)))
+    if chol is not None:
+        z = z @ chol.T
+    draws = {name: _transform(spec, z[:, i]) for i, (name, spec) in enumerate(zip(names, specs))}
+
+    growth = draws.get("growth", base["growth"])
+    # Clamped like the deterministic inputs, so tails can't leave GROWTH_BOUNDS
+    # / WACC_BOUNDS
+    growth_rates = fc.growth_schedule(np.broadcast_to(growth, size), project_years,
+                                      bounds=fc.GROWTH_BOUNDS)
+    wacc = np.clip(draws.get("wacc", base["wacc"]), *fc.WACC_BOUNDS)
+    terminal_growth = draws.get("terminal_growth", base["terminal_growth"])
+    values = fc.batch_dcf_valuation(
+        base["base_fcf"] * draws.get("fcf_scale", 1.0),
+        wacc,
+        growth_rates,
+        terminal_growth,
+        base["net_debt"],
+        base["shares"],
+        base["cash"],
+    )
+    # No Gordon terminal value exists there (the scalar model would drop it)
+    return np.where(np.broadcast_to(wacc > terminal_growth, values.shape), values, np.nan)
+
+
+def default_distributions(inputs: dict, terminal_growth: float) -> dict:
+    """Moderate uncertainty around the deterministic valuation_inputs()."""
+    return {
+        "growth":          ("normal", inputs["growth"], 0.03),
+        "wacc":            ("normal", inputs["wacc"], 0.01),
+        "terminal_growth": ("triangular", terminal_growth - 0.01, terminal_growth, terminal_growth + 0.005),
+    }
+
+
+def run_monte_carlo_valuation(
+    fin: dict,
+    market_price: float,
+    distributions: Optional[dict] = None,
+    correlation=None,
+    n_paths: int = 100_000,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    seed: Optional[int] = None,
+    n_workers: Optional[int] = None,
+    risk_free_rate: float = 0.045,
+    market_risk_premium: float = 0.055,
+    terminal_growth: float = 0.025,
+    project_years: int = 5,
+    tax_rate: float = 0.25,
+    bins: int = 50,
+    return_values: bool = False,
+) -> dict:
+    """
+    Monte Carlo version of run_full_valuation().
+
+    distributions: {input: spec} for inputs in SAMPLED_INPUTS ("growth" is the
+        starting rate of the declining growth schedule, clamped to
+        finance_calc.GROWTH_BOUNDS; "wacc" is clamped to
+        finance_calc.WACC_BOUNDS; "fcf_scale" multiplies base FCF).
+        Defaults to default_distributions().
+    correlation: k×k matrix in `distributions` order, or {(a, b): rho} pairs.
+
+    Paths whose sampled WACC is not above their terminal growth have no
+    terminal value; they are dropped and counted in "n_rejected", and the
+    statistics cover the remaining "n_paths".
+
+    Paths run in chunks of `chunk_size`; chunk i always draws from child i of
+    SeedSequence(seed), so results are identical for any `n_workers`
+    (None = in-process, otherwise a process pool) — but only for the same
+    (seed, chunk_size): another chunk_size splits the draws differently.
+    The result's "entropy" is the SeedSequence entropy actually used: pass
+    it back as `seed` (with the same chunk_size) to reproduce a seed=None
+    run.  Peak working memory is O(chunk_size × project_years) plus 8 bytes
+    per path for the results.
+    """
+    inputs = fc.valuation_inputs(fin, risk_free_rate, market_risk_premium,
+                                 project_years, tax_rate)
+    base = {
+        "base_fcf":        inputs["base_fcf"],
+        "growth":          inputs["growth"],
+        "wacc":            inputs["wacc"],
+        "terminal_growth": terminal_growth,
+        "net_debt":        inputs["net_debt"],
+        "shares":          inputs["shares"],
+        "cash":            inputs["cash"],
+    }
+
+    if distributions is None:
+        distributions = default_distributions(inputs, terminal_growth)
+    unknown = set(distributions) - set(SAMPLED_INPUTS)
+    if unknown:
+        raise ValueError(f"Cannot sample {sorted(unknown)}; choose from {SAMPLED_INPUTS}")
+    names = list(distributions)
+    specs = [distributions[n] for n in names]
+    chol = _cholesky(names, correlation)
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+
+    sizes = [chunk_size] * (n_paths // chunk_size)
+    if n_paths % chunk_size:
+        sizes.append(n_paths % chunk_size)
+    seed_seq = np.random.SeedSequence(seed)
+    seeds = seed_seq.spawn(len(sizes))
+    jobs = [(size, ss, names, specs, chol, base, project_years) for size, ss in zip(sizes, seeds)]
+
+    if n_workers:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            chunks = list(pool.map(_simulate_chunk, jobs))
+    else:
+        chunks = [_simulate_chunk(job) for job in jobs]
+    values = np.concatenate(chunks) if chunks else np.empty(0)
+    valid = ~np.isnan(values)
+    n_rejected = int(values.size - valid.sum())
+    values = values[valid]
+
+    # Histogram over the central 99% so a few extreme paths don't flatten it
+    lo, hi = np.percentile(values, [0.5, 99.5]) if values.size else (0.0, 0.0)
+    counts, edges = np.histogram(values, bins=bins, range=(lo, hi) if hi > lo else None)
+    pct = np.percentile(values, DEFAULT_PERCENTILES) if values.size else [0.0] * len(DEFAULT_PERCENTILES)
+
+    result = {
+        "n_paths":        int(values.size),
+        "n_rejected":     n_rejected,
+        "seed":           seed,
+        "entropy":        seed_seq.entropy,
+        "distributions":  distributions,
+        "market_price":   market_price,
+        "mean":           float(values.mean()) if values.size else 0.0,
+        "std":            float(values.std()) if values.size else 0.0,
+        "percentiles":    {p: float(v) for p, v in zip(DEFAULT_PERCENTILES, pct)},
+        "prob_upside":    float((values > market_price).mean()) if values.size and market_price > 0 else 0.0,
+        "histogram":      {"edges": edges.tolist(), "counts": counts.tolist()},
+    }
+    if return_values:
+        result["values"] = values
+    return result
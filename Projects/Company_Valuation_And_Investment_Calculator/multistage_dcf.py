@@ -0,0 +1,188 @@
+"""
+Multi-stage DCF: high-growth → linear fade → terminal stage, with optional
+mid-year discounting and a Gordon or exit-multiple terminal value.
+Every input broadcasts per ticker, including the stage lengths, so tickers
+with different horizons are valued in one vectorised call.
+"""
+from typing import Optional
+
+import numpy as np
+
+import finance_calc as fc
+
+TERMINAL_METHODS = ("gordon", "exit_multiple")
+
+
+def stage_growth_rates(high_growth, high_years, fade_years, terminal_growth) -> tuple:
+    """
+    Year-by-year growth for the explicit stages, padded to the longest horizon.
+      years 1..H1          high_growth
+      years H1+1..H1+H2    linear fade, reaching terminal_growth in year H1+H2
+    Returns (growth (..., N), horizon (...)) where N = max(horizon); years
+    past a ticker's own horizon hold terminal_growth and are never used.
+    """
+    gh, h1, h2, tg = np.broadcast_arrays(
+        np.asarray(high_growth, dtype=float),
+        np.asarray(high_years, dtype=int),
+        np.asarray(fade_years, dtype=int),
+        np.asarray(terminal_growth, dtype=float),
+    )
+    if np.any(h1 < 0) or np.any(h2 < 0):
+        raise ValueError("stage lengths must be non-negative")
+    horizon = h1 + h2
+    if horizon.size == 0 or np.any(horizon < 1):
+        raise ValueError("every ticker needs at least one explicit projection year")
+
+    t = np.arange(1, int(horizon.max()) + 1)
+    k = t - h1[..., None]                                   # years into the fade
+    fade = gh[..., None] + (tg - gh)[..., None] * k / np.maximum(h2, 1)[..., None]
+    growth = np.where(k <= 0, gh[..., None],
+                      np.where(k <= h2[..., None], fade, tg[..., None]))
+    return growth, horizon
+
+
+def multistage_dcf(
+    base_fcf,
+    wacc,
+    high_growth,
+    high_years=5,
+    fade_years=5,
+    terminal_growth=0.025,
+    net_debt=0.0,
+    shares_outstanding=1.0,
+    cash=0.0,
+    mid_year: bool = False,
+    terminal: str = "gordon",
+    exit_multiple=None,
+    exit_metric=None,
+) -> dict:
+    """
+    Broadcasted three-stage DCF.  All numeric inputs (stage lengths included)
+    broadcast to one shape — typically one entry per ticker.
+
+    mid_year=True discounts year-t cash flows at t - 0.5 (and the Gordon TV,
+    a perpetuity of mid-year flows, at H - 0.5).
+    terminal="gordon":        TV = FCF_H (1+g) / (WACC - g), 0 when WACC <= g
+    terminal="exit_multiple": TV = exit_multiple × metric_H, discounted at H;
+        metric_H is exit_metric (a base-year figure such as EBITDA) grown along
+        the FCF growth path, or FCF_H itself when exit_metric is None.
+
+    Returns arrays: growth_rates, projected_fcfs, pv_fcfs (zero past each
+    horizon), horizon, terminal_value, pv_terminal_value, sum_pv_fcfs,
+    enterprise_value, equity_value, intrinsic_per_share.
+    """
+    if terminal not in TERMINAL_METHODS:
+        raise ValueError(f"terminal must be one of {TERMINAL_METHODS}")
+    if terminal == "exit_multiple" and exit_multiple is None:
+        raise ValueError("terminal='exit_multiple' needs exit_multiple")
+
+    growth, horizon = stage_growth_rates(high_growth, high_years, fade_years, terminal_growth)
+    arrays = [base_fcf, wacc, terminal_growth, net_debt, shares_outstanding, cash]
+    if terminal == "exit_multiple":
+        arrays += [exit_multiple, 1.0 if exit_metric is None else exit_metric]
+    lead = np.broadcast_shapes(horizon.shape, *(np.shape(a) for a in arrays))
+    base, w, tg, nd, shares, csh, *exit_args = (
+        np.broadcast_to(np.asarray(a, dtype=float), lead) for a in arrays)
+    growth = np.broadcast_to(growth, lead + growth.shape[-1:])
+    horizon = np.broadcast_to(horizon, lead)
+    n = growth.shape[-1]
+
+    # Projection — same multiplication order as project_fcfs()
+    projected = np.multiply.accumulate(
+        np.concatenate([base[..., None], 1 + growth], axis=-1), axis=-1)[..., 1:]
+
+    years = np.arange(1, n + 1)
+    active = years <= horizon[..., None]
+    last = (horizon - 1)[..., None]
+    fcf_h = np.take_along_axis(projected, last, axis=-1)[..., 0]
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        timing = years - 0.5 if mid_year else years
+        pv_fcfs = np.where(active & (w[..., None] > -1),
+                           projected / (1 + w[..., None]) ** timing, 0.0)
+
+        if terminal == "gordon":
+            tv = np.where(w <= tg, 0.0, fcf_h * (1 + tg) / (w - tg))
+            tv_time = horizon - 0.5 if mid_year else horizon
+        else:
+            multiple, metric = exit_args
+            if exit_metric is None:
+                metric_h = fcf_h
+            else:
+                growth_factor = np.multiply.accumulate(1 + growth, axis=-1)
+                metric_h = metric * np.take_along_axis(growth_factor, last, axis=-1)[..., 0]
+            tv = multiple * metric_h
+            tv_time = horizon
+        pv_tv = np.where(w <= -1, 0.0, tv / (1 + w) ** tv_time)
+
+    sum_pv_fcfs = pv_fcfs.sum(axis=-1)
+    enterprise_value = sum_pv_fcfs + pv_tv
+    equity_value = enterprise_value - nd + csh
+    return {
+        "growth_rates":        growth,
+        "projected_fcfs":      projected,
+        "pv_fcfs":             pv_fcfs,
+        "horizon":             horizon,
+        "terminal_value":      tv,
+        "pv_terminal_value":   pv_tv,
+        "sum_pv_fcfs":         sum_pv_fcfs,
+        "enterprise_value":    enterprise_value,
+        "equity_value":        equity_value,
+        "intrinsic_per_share": equity_value / np.maximum(shares, 1),
+    }
+
+
+def batch_multistage_dcf_valuation(*args, **kwargs) -> np.ndarray:
+    """multistage_dcf() → intrinsic value per share only."""
+    return multistage_dcf(*args, **kwargs)["intrinsic_per_share"]
+
+
+def multistage_universe(
+    fins: dict,
+    prices: dict,
+    high_years=5,
+    fade_years=5,
+    terminal_growth: float = 0.025,
+    mid_year: bool = False,
+    terminal: str = "gordon",
+    exit_multiple=None,
+    risk_free_rate: float = 0.045,
+    market_risk_premium: float = 0.055,
+    tax_rate: float = 0.25,
+    tickers: Optional[list[str]] = None,
+) -> dict:
+    """
+    Multi-stage DCF for every ticker in `fins` (ticker → derive_financials
+    dict) in one call.  Base FCF, WACC and the high-growth rate come from
+    valuation_inputs(); high_years / fade_years / exit_multiple may be scalars
+    or {ticker: value} dicts for per-ticker horizons and multiples.
+    Returns {"tickers", "horizon", "intrinsic_value", "market_price", "upside_pct"}.
+    """
+    tickers = list(fins) if tickers is None else tickers
+    rows = [fc.valuation_inputs(fins[t], risk_free_rate, market_risk_premium,
+                                tax_rate=tax_rate) for t in tickers]
+
+    def col(key):
+        return np.array([r[key] for r in rows], dtype=float)
+
+    def per_ticker(value):
+        return np.array([value[t] for t in tickers]) if isinstance(value, dict) else value
+
+    res = multistage_dcf(
+        col("base_fcf"), col("wacc"), col("growth"),
+        per_ticker(high_years), per_ticker(fade_years), terminal_growth,
+        col("net_debt"), col("shares"), col("cash"),
+        mid_year=mid_year, terminal=terminal,
+        exit_multiple=per_ticker(exit_multiple),
+    )
+    intrinsic = res["intrinsic_per_share"]
+    price = np.array([prices.get(t, 0) or 0 for t in tickers], dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        upside = np.where((price > 0) & (intrinsic > 0), (intrinsic - price) / price * 100, 0.0)
+    return {
+        "tickers":         tickers,
+        "horizon":         res["horizon"],
+        "intrinsic_value": intrinsic,
+        "market_price":    price,
+        "upside_pct":      upside,
+    }
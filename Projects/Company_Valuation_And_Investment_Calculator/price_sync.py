@@ -0,0 +1,77 @@
+"""
+Incremental price-history ingestion: each ticker fetches only the bars after
+its last stored date; tickers with no history get a parallel multi-year
+backfill.  A watchlist refresh then moves a few bars per name, not a year.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Optional
+
+import requests
+
+import data_fetcher as df
+import db_manager as db
+
+BACKFILL_YEARS = 5
+BACKFILL_CHUNK_DAYS = 365
+
+
+def sync_price_history(
+    ticker: str,
+    backfill_years: int = BACKFILL_YEARS,
+    chunk_days: int = BACKFILL_CHUNK_DAYS,
+    max_workers: int = 4,
+    writer=None,
+) -> dict:
+    """
+    Bring one ticker's price_history up to date.
+      no stored bars → backfill `backfill_years` in parallel chunk_days windows
+      otherwise      → fetch from the last stored date onwards (that day is
+                       re-read so a bar stored mid-session is completed)
+    writer: a write_behind.WriteBehind to queue the bars on instead of
+    writing them here ("written" then counts bars queued).
+    A failed fetch stores nothing and sets "error", so the next sync retries
+    the same range instead of resuming past a hole.
+    Returns {"ticker", "mode": "backfill" | "incremental", "start", "fetched",
+    "written"[, "error"]}.
+    """
+    ticker = ticker.upper()
+    db.init_company_db(ticker)
+    last = db.get_last_price_date(ticker)
+    if last is None:
+        mode, start = "backfill", date.today() - timedelta(days=int(backfill_years * 365.25))
+    else:
+        mode, start = "incremental", last
+    try:
+        bars = (df.backfill_bars(ticker, backfill_years, chunk_days, max_workers) if last is None
+                else df.get_bars_range(ticker, last))
+    except requests.RequestException as e:
+        return {"ticker": ticker, "mode": mode, "start": str(start),
+                "fetched": 0, "written": 0, "error": str(e)}
+    if not bars:
+        written = 0
+    elif writer is not None:
+        writer.submit(ticker, "price_history", bars)
+        written = len(bars)
+    else:
+        written = db.upsert_price_history(ticker, bars)
+    return {"ticker": ticker, "mode": mode, "start": str(start),
+            "fetched": len(bars), "written": written}
+
+
+def sync_watchlist(
+    tickers: Optional[list[str]] = None,
+    max_workers: int = 8,
+    **kwargs,
+) -> list[dict]:
+    """sync_price_history() for every ticker (default: all companies), `max_workers` at a time."""
+    tickers = db.list_companies() if tickers is None else tickers
+
+    def one(t):
+        try:
+            return sync_price_history(t, **kwargs)
+        except Exception as e:
+            return {"ticker": t.upper(), "mode": "error", "error": str(e), "fetched": 0, "written": 0}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        return list(ex.map(one, tickers))
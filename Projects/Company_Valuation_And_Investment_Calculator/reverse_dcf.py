@@ -0,0 +1,168 @@
+"""
+Reverse DCF: solve for the growth, terminal growth or WACC that makes the
+DCF intrinsic value equal the market price — for many tickers at once.
+"""
+from typing import Optional
+
+import numpy as np
+
+import finance_calc as fc
+
+SOLVE_FOR = ("growth", "terminal_growth", "wacc")
+
+
+def _bisect(value_fn, target, lo, hi, tol: float, max_iter: int) -> dict:
+    """
+    Vectorised bisection of value_fn(x) = target on [lo, hi], elementwise.
+    Works for increasing or decreasing value_fn; elements whose bracket has
+    no sign change (or a non-positive target) are flagged unsolved → NaN.
+    """
+    target = np.asarray(target, dtype=float)
+    lo, hi, target = np.broadcast_arrays(
+        np.asarray(lo, dtype=float), np.asarray(hi, dtype=float), target)
+    lo, hi = lo.copy(), hi.copy()
+
+    with np.errstate(invalid="ignore", over="ignore"):
+        f_lo = value_fn(lo) - target
+        f_hi = value_fn(hi) - target
+        solved = (
+            (target > 0) & (lo < hi)
+            & np.isfinite(f_lo) & np.isfinite(f_hi)
+            & ((np.signbit(f_lo) != np.signbit(f_hi)) | (f_lo == 0) | (f_hi == 0))
+        )
+
+        for _ in range(max_iter):
+            if not np.any((hi - lo)[solved] > tol):
+                break
+            mid = 0.5 * (lo + hi)
+            f_mid = value_fn(mid) - target
+            right = np.signbit(f_mid) == np.signbit(f_lo)     # root in [mid, hi]
+            lo = np.where(right, mid, lo)
+            f_lo = np.where(right, f_mid, f_lo)
+            hi = np.where(right, hi, mid)
+
+    return {"implied": np.where(solved, 0.5 * (lo + hi), np.nan), "solved": solved}
+
+
+def implied_growth(
+    market_price,
+    base_fcf,
+    wacc,
+    terminal_growth=0.025,
+    net_debt=0.0,
+    shares=1.0,
+    cash=0.0,
+    project_years: int = 5,
+    declining: bool = True,
+    lo: float = -0.5,
+    hi: float = 1.0,
+    tol: float = 1e-10,
+    max_iter: int = 100,
+) -> dict:
+    """
+    Starting growth rate priced in by the market.
+    declining=True uses run_full_valuation()'s fading schedule (without its
+    3–30% clamp); False holds the growth rate flat over the horizon.
+    All inputs broadcast elementwise (one entry per ticker).
+    Returns {"implied": array (NaN if unsolved), "solved": bool array}.
+    """
+    fade = np.asarray(fc.growth_schedule(1.0, project_years, bounds=None)) if declining \
+        else np.ones(project_years)
+
+    def value(g):
+        return fc.batch_dcf_valuation(base_fcf, wacc, g[..., None] * fade,
+                                      terminal_growth, net_debt, shares, cash)
+
+    return _bisect(value, market_price, lo, hi, tol, max_iter)
+
+
+def implied_terminal_growth(
+    market_price,
+    base_fcf,
+    wacc,
+    growth_rates,
+    net_debt=0.0,
+    shares=1.0,
+    cash=0.0,
+    lo: float = -0.10,
+    tol: float = 1e-10,
+    max_iter: int = 100,
+) -> dict:
+    """
+    Perpetual growth rate priced in by the market, searched on
+    [lo, WACC) — the Gordon TV is only defined below WACC.
+    growth_rates: (n_years,) or (n_tickers, n_years).
+    """
+    hi = np.asarray(wacc, dtype=float) - 1e-9
+
+    def value(tg):
+        return fc.batch_dcf_valuation(base_fcf, wacc, growth_rates, tg,
+                                      net_debt, shares, cash)
+
+    return _bisect(value, market_price, lo, hi, tol, max_iter)
+
+
+def implied_wacc(
+    market_price,
+    base_fcf,
+    growth_rates,
+    terminal_growth=0.025,
+    net_debt=0.0,
+    shares=1.0,
+    cash=0.0,
+    hi: float = 1.0,
+    tol: float = 1e-10,
+    max_iter: int = 100,
+) -> dict:
+    """
+    Discount rate priced in by the market, searched on (terminal growth, hi].
+    growth_rates: (n_years,) or (n_tickers, n_years).
+    """
+    lo = np.asarray(terminal_growth, dtype=float) + 1e-9
+
+    def value(w):
+        return fc.batch_dcf_valuation(base_fcf, w, growth_rates, terminal_growth,
+                                      net_debt, shares, cash)
+
+    return _bisect(value, market_price, lo, hi, tol, max_iter)
+
+
+def reverse_dcf_universe(
+    fins: dict,
+    prices: dict,
+    solve_for: str = "wacc",
+    terminal_growth: float = 0.025,
+    project_years: int = 5,
+    risk_free_rate: float = 0.045,
+    market_risk_premium: float = 0.055,
+    tax_rate: float = 0.25,
+    tickers: Optional[list[str]] = None,
+) -> dict:
+    """
+    Reverse DCF for every ticker in `fins` (ticker → derive_financials dict)
+    in one vectorised solve.  Inputs that are not solved for come from
+    valuation_inputs(), exactly as run_full_valuation() would use them.
+    Returns {"tickers", "solve_for", "implied", "solved"}.
+    """
+    if solve_for not in SOLVE_FOR:
+        raise ValueError(f"solve_for must be one of {SOLVE_FOR}")
+    tickers = list(fins) if tickers is None else tickers
+    rows = [fc.valuation_inputs(fins[t], risk_free_rate, market_risk_premium,
+                                project_years, tax_rate) for t in tickers]
+
+    def col(key):
+        return np.array([r[key] for r in rows], dtype=float)
+
+    price = np.array([prices.get(t, 0) or 0 for t in tickers], dtype=float)
+    common = dict(net_debt=col("net_debt"), shares=col("shares"), cash=col("cash"))
+    growth_rates = np.array([r["growth_rates"] for r in rows], dtype=float).reshape(len(tickers), project_years)
+
+    if solve_for == "growth":
+        res = implied_growth(price, col("base_fcf"), col("wacc"), terminal_growth,
+                             project_years=project_years, **common)
+    elif solve_for == "terminal_growth":
+        res = implied_terminal_growth(price, col("base_fcf"), col("wacc"), growth_rates, **common)
+    else:
+        res = implied_wacc(price, col("base_fcf"), growth_rates, terminal_growth, **common)
+
+    return {"tickers": tickers, "solve_for": solve_for, **res}
@@ -13,8 +13,8 @@ fi
 
 # Install dependencies if needed
 echo "🔍 Checking dependencies..."
-pip install textual duckdb requests python-dotenv finnhub-python --break-system-packages -q 2>/dev/null || \
-pip install textual duckdb requests python-dotenv finnhub-python -q
+pip install textual duckdb numpy pyarrow scipy requests python-dotenv finnhub-python --break-system-packages -q 2>/dev/null || \
+pip install textual duckdb numpy pyarrow scipy requests python-dotenv finnhub-python -q
 
 # Check .env
 if [ ! -f .env ]; then
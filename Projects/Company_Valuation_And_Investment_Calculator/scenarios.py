@@ -0,0 +1,149 @@
+"""
+Named scenario sets (bull / base / bear, custom growth schedules …)
+evaluated for every ticker in one batched DCF pass.
+"""
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+
+import db_manager as db
+import finance_calc as fc
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """Overrides applied on top of run_full_valuation()'s defaults."""
+    name:                str
+    growth_shift:        float = 0.0            # added to every year's growth
+    growth_rates:        Optional[tuple] = None # explicit schedule (replaces the model's)
+    project_years:       int = 5
+    terminal_growth:     float = 0.025
+    tax_rate:            float = 0.25
+    market_risk_premium: float = 0.055
+    risk_free_rate:      float = 0.045
+    wacc_shift:          float = 0.0            # added after the 5–25% clamp
+
+    def horizon(self) -> int:
+        return len(self.growth_rates) if self.growth_rates else self.project_years
+
+
+@dataclass(frozen=True)
+class ScenarioSet:
+    name:      str
+    scenarios: tuple = field(default_factory=tuple)
+
+
+BULL_BASE_BEAR = ScenarioSet("bull_base_bear", (
+    Scenario("bull", growth_shift=0.03, terminal_growth=0.030, market_risk_premium=0.050),
+    Scenario("base"),
+    Scenario("bear", growth_shift=-0.03, terminal_growth=0.020, market_risk_premium=0.065),
+))
+
+
+def _fin_columns(fins: dict, tickers: list[str]) -> dict:
+    """Per-ticker DCF inputs as arrays, with the defaults of valuation_inputs()."""
+    def col(key, default, or_default=False):
+        vals = [fins[t].get(key, default) for t in tickers]
+        return np.array([(v or default) if or_default else v for v in vals], dtype=float)
+
+    return {
+        "beta":         np.maximum(col("beta", 1.0, or_default=True), 0.1),
+        "cost_of_debt": col("cost_of_debt", 0.04),
+        "total_equity": col("total_equity", 0),
+        "total_debt":   col("total_debt", 0),
+        "base_fcf":     col("fcf_ttm", 0),
+        "rev_growth":   col("rev_growth_5y", 0.08, or_default=True),
+        "shares":       col("shares", 1),
+        "net_debt":     col("net_debt", 0),
+        "cash":         col("cash", 0),
+    }
+
+
+def _scenario_wacc(cols: dict, sc: Scenario) -> np.ndarray:
+    """valuation_inputs()' CAPM + WACC + clamp, vectorised over tickers."""
+    ke = fc.capm_cost_of_equity(sc.risk_free_rate, cols["beta"], sc.market_risk_premium)
+    wacc = fc.compute_wacc(ke, cols["cost_of_debt"], cols["total_equity"],
+                           cols["total_debt"], sc.tax_rate)["wacc"]
+    return np.clip(wacc, 0.05, 0.25) + sc.wacc_shift
+
+
+def evaluate_columns(cols: dict, price: np.ndarray, scenario_set: ScenarioSet = BULL_BASE_BEAR) -> dict:
+    """
+    Vectorised valuation of column inputs (the keys of _fin_columns()) under
+    every scenario.  Scenarios that share a horizon go through a single
+    batch_dcf_valuation() call as a (scenario × row) grid.
+    Returns (scenario × row) arrays: wacc, intrinsic_value, upside_pct.
+    """
+    scenarios = list(scenario_set.scenarios)
+    n_s, n_t = len(scenarios), len(price)
+
+    wacc = np.array([_scenario_wacc(cols, sc) for sc in scenarios]).reshape(n_s, n_t)
+    tg = np.array([sc.terminal_growth for sc in scenarios])
+    intrinsic = np.empty((n_s, n_t))
+
+    for years in sorted({sc.horizon() for sc in scenarios}):
+        idx = [i for i, sc in enumerate(scenarios) if sc.horizon() == years]
+        model = fc.growth_schedule(cols["rev_growth"], years)                  # (T, n)
+        growth = np.array([
+            np.broadcast_to(scenarios[i].growth_rates, model.shape) if scenarios[i].growth_rates
+            else model + scenarios[i].growth_shift
+            for i in idx
+        ]).reshape(len(idx), n_t, years)
+        intrinsic[idx] = fc.batch_dcf_valuation(
+            cols["base_fcf"], wacc[idx], growth, tg[idx, None],
+            cols["net_debt"], cols["shares"], cols["cash"],
+        )
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        upside = np.where((price > 0) & (intrinsic > 0),
+                          (intrinsic - price) / price * 100, 0.0)
+    return {"wacc": wacc, "intrinsic_value": intrinsic, "upside_pct": upside}
+
+
+def run_scenarios(
+    fins: dict,
+    prices: dict,
+    scenario_set: ScenarioSet = BULL_BASE_BEAR,
+    tickers: Optional[list[str]] = None,
+) -> dict:
+    """
+    Evaluate every scenario for every ticker (see evaluate_columns()).
+    Returns flat, scenario-major columns:
+      ticker, scenario, wacc, terminal_growth, intrinsic_value,
+      market_price, upside_pct, valuation_label
+    """
+    tickers = list(fins) if tickers is None else tickers
+    price = np.array([prices.get(t, 0) or 0 for t in tickers], dtype=float)
+    res = evaluate_columns(_fin_columns(fins, tickers), price, scenario_set)
+    scenarios = list(scenario_set.scenarios)
+    n_s, n_t = len(scenarios), len(tickers)
+    upside = res["upside_pct"].ravel()
+
+    return {
+        "scenario_set":    scenario_set.name,
+        "ticker":          np.tile(np.array(tickers, dtype=object), n_s),
+        "scenario":        np.repeat(np.array([sc.name for sc in scenarios], dtype=object), n_t),
+        "wacc":            res["wacc"].ravel(),
+        "terminal_growth": np.repeat([sc.terminal_growth for sc in scenarios], n_t),
+        "intrinsic_value": res["intrinsic_value"].ravel(),
+        "market_price":    np.tile(price, n_s),
+        "upside_pct":      upside,
+        "valuation_label": np.array([fc.valuation_label(u) for u in upside], dtype=object),
+    }
+
+
+def save_scenario_results(results: dict, run_id: Optional[str] = None) -> str:
+    """Persist run_scenarios() output to each ticker's scenario_results table."""
+    run_id = run_id or f"{datetime.now(timezone.utc):%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:8]}"
+    tickers = results["ticker"]
+    for t in dict.fromkeys(tickers):
+        mask = tickers == t
+        db.save_scenario_results(t, run_id, results["scenario_set"], {
+            k: results[k][mask]
+            for k in ("scenario", "wacc", "terminal_growth", "intrinsic_value",
+                      "market_price", "upside_pct")
+        })
+    return run_id
@@ -0,0 +1,169 @@
+"""
+Cross-company screener: every company's profile, Finnhub ratios and latest
+stored valuation joined in one DuckDB query (per-ticker tables read through
+the connection pool, or the consolidated market database), filtered and
+ranked in SQL.
+"""
+import re
+from typing import Iterator, Optional
+
+import numpy as np
+
+import db_manager as db
+
+# Output columns, in order
+SCREEN_COLUMNS = (
+    "ticker", "name", "sector", "market_cap", "price", "intrinsic_value",
+    "upside_pct", "wacc", "pe_ratio", "div_yield", "beta", "valued_at",
+)
+NUMERIC_COLUMNS = ("market_cap", "price", "intrinsic_value", "upside_pct",
+                   "wacc", "pe_ratio", "div_yield", "beta")
+
+# Screen column → Finnhub metric keys, first non-zero wins (as in derive_financials_from_metrics)
+METRIC_SOURCES = {
+    "pe_ratio":  ("peBasicExclExtraTTM", "peRatio"),
+    "div_yield": ("dividendYieldIndicatedAnnual", "dividendYield"),
+    "beta":      ("beta",),
+}
+
+# What each company contributes to a screen: only these columns, the metric
+# keys above and the newest valuation run (filtered inside each database)
+SCREEN_READS = {
+    "company_profile": db.TableRead(("name", "sector", "market_cap")),
+    "metrics":         db.TableRead(("key", "value"), where="key IN ({})".format(
+        ", ".join(db._quote(k) for ks in METRIC_SOURCES.values() for k in ks))),
+    "valuation":       db.TableRead(("wacc", "intrinsic_value", "market_price", "computed_at"),
+                                    latest="computed_at DESC, run_id DESC"),
+}
+
+
+def _screen_sql(names: list[str], src: dict, filters: dict, sort_by: str,
+                descending: bool, limit: Optional[int]) -> tuple[str, list]:
+    """(SQL, params) for one screen over company_tables() sources."""
+    for col in (*filters, sort_by):
+        if col not in NUMERIC_COLUMNS:
+            raise ValueError(f"unknown screen column {col!r}; choose from {NUMERIC_COLUMNS}")
+
+    metric_cols = ",\n".join(
+        "coalesce(" + ", ".join(f"nullif(max(value) FILTER (WHERE key = '{k}'), 0)" for k in ks)
+        + f") AS {col}"
+        for col, ks in METRIC_SOURCES.items()
+    )
+    where, params = [], []
+    for col, bounds in filters.items():
+        lo, hi, lo_strict, hi_strict = (*bounds, False, False)[:4]
+        if lo is not None:
+            where.append(f"{col} {'>' if lo_strict else '>='} ?")
+            params.append(float(lo))
+        if hi is not None:
+            where.append(f"{col} {'<' if hi_strict else '<='} ?")
+            params.append(float(hi))
+    values = ", ".join(f"({i}, {db._quote(t)})" for i, t in enumerate(names))
+    where_sql = "WHERE " + " AND ".join(where) if where else ""
+    order = "DESC" if descending else "ASC"
+    limit_sql = f"LIMIT {int(limit)}" if limit else ""
+
+    sql = f"""
+        WITH names(pos, ticker) AS (VALUES {values}),
+             prof AS (SELECT ticker, any_value(name) AS name, any_value(sector) AS sector,
+                             max(market_cap) AS market_cap
+                      FROM ({src["company_profile"]}) GROUP BY ticker),
+             kv   AS (SELECT ticker, {metric_cols}
+                      FROM ({src["metrics"]}) GROUP BY ticker),
+             val  AS (SELECT ticker, wacc, intrinsic_value, market_price AS price,
+                             computed_at AS valued_at
+                      FROM ({src["valuation"]})),
+             screen AS (
+                SELECT n.pos, n.ticker, p.name, p.sector,
+                       CAST(p.market_cap AS DOUBLE) AS market_cap,
+                       v.price, v.intrinsic_value,
+                       CASE WHEN v.price > 0 AND v.intrinsic_value > 0
+                            THEN (v.intrinsic_value - v.price) / v.price * 100 END AS upside_pct,
+                       v.wacc, kv.pe_ratio, kv.div_yield, kv.beta,
+                       CAST(v.valued_at AS VARCHAR) AS valued_at
+                FROM names n
+                LEFT JOIN prof p ON p.ticker = n.ticker
+                LEFT JOIN kv     ON kv.ticker = n.ticker
+                LEFT JOIN val v  ON v.ticker = n.ticker)
+        SELECT {", ".join(SCREEN_COLUMNS)} FROM screen
+        {where_sql}
+        ORDER BY {sort_by} {order} NULLS LAST, pos
+        {limit_sql}
+    """
+    return sql, params
+
+
+def iter_screen(
+    filters: Optional[dict] = None,
+    sort_by: str = "upside_pct",
+    descending: bool = True,
+    limit: Optional[int] = None,
+    tickers: Optional[list[str]] = None,
+    batch_size: int = 25,
+    skipped: Optional[dict] = None,
+) -> Iterator[list[dict]]:
+    """
+    Run the screen and yield ranked rows ({SCREEN_COLUMNS} dicts) in batches
+    of `batch_size` as DuckDB produces them.
+    filters: {column: (min, max)} over NUMERIC_COLUMNS, either bound None for
+    open-ended; bounds are inclusive unless a third / fourth item marks the
+    min / max strict (as parse_filters() does for > and <).  Companies without a value for a filtered column drop out.
+    skipped: filled with {ticker: reason} for companies that could not be read.
+    """
+    tickers = db.list_companies() if tickers is None else tickers
+    with db.company_tables(tickers, SCREEN_READS) as (con, names, src, unread):
+        if skipped is not None:
+            skipped.update(unread)
+        if not names:
+            return
+        sql, params = _screen_sql(names, src, filters or {}, sort_by, descending, limit)
+        con.execute(sql, params)
+        while True:
+            rows = con.fetchmany(batch_size)
+            if not rows:
+                break
+            yield [dict(zip(SCREEN_COLUMNS, r)) for r in rows]
+
+
+def screen(
+    filters: Optional[dict] = None,
+    sort_by: str = "upside_pct",
+    descending: bool = True,
+    limit: Optional[int] = None,
+    tickers: Optional[list[str]] = None,
+) -> dict:
+    """
+    iter_screen() collected into columns: NUMERIC_COLUMNS as float arrays
+    (NaN when missing), plus "skipped": {ticker: reason} for unreadable companies.
+    """
+    skipped = {}
+    rows = [r for batch in iter_screen(filters, sort_by, descending, limit, tickers, skipped=skipped)
+            for r in batch]
+    cols = {c: [r[c] for r in rows] for c in SCREEN_COLUMNS}
+    for c in NUMERIC_COLUMNS:
+        cols[c] = np.array([np.nan if v is None else v for v in cols[c]], dtype=float)
+    cols["skipped"] = skipped
+    return cols
+
+
+_FILTER_TOKEN = re.compile(r"^(\w+)\s*(>=|<=|>|<)\s*(-?[\d.]+)$")
+
+
+def parse_filters(text: str) -> dict:
+    """
+    "upside_pct>10 pe_ratio<25 div_yield>=1" →
+    {column: (min, max, min_strict, max_strict)}: > and < exclude the bound.
+    """
+    filters = {}
+    for token in text.replace(",", " ").split():
+        m = _FILTER_TOKEN.match(token)
+        if not m:
+            raise ValueError(f"cannot parse filter {token!r} (expected e.g. upside_pct>10)")
+        col, op, value = m.group(1), m.group(2), float(m.group(3))
+        lo, hi, lo_strict, hi_strict = filters.get(col, (None, None, False, False))
+        if op.startswith(">"):
+            lo, lo_strict = value, op == ">"
+        else:
+            hi, hi_strict = value, op == "<"
+        filters[col] = (lo, hi, lo_strict, hi_strict)
+    return filters
@@ -0,0 +1,29 @@
+"""
+Shared fixtures.  The modules under test are top-level scripts, so the
+project directory goes on sys.path; database tests run in a temporary
+DB_DIR, so databases/ is never touched.
+
+    python -m pytest tests
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import db_manager as db     # noqa: E402
+
+
+@pytest.fixture
+def db_dir(tmp_path, monkeypatch):
+    """Per-ticker storage in an empty temporary directory."""
+    monkeypatch.setattr(db, "DB_DIR", tmp_path)
+    monkeypatch.setattr(db, "STORAGE_MODE", "per_ticker")
+    monkeypatch.setattr(db, "MARKET_DB_PATH", tmp_path / "market.duckdb")
+    monkeypatch.setattr(db, "_schema_versions", {})
+    monkeypatch.setattr(db, "_registered", set())
+    db.read_cache.clear()
+    yield tmp_path
+    db.pool.close_all()
+    db.read_cache.clear()
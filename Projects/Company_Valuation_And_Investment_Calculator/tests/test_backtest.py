@@ -0,0 +1,152 @@
+"""Backtest: no look-ahead past the reporting lag, incremental reruns, scoring."""
+import numpy as np
+import pytest
+
+import backtest as bt
+import db_manager as db
+import finance_calc as fc
+
+UNDER, OVER, FAIR = bt.UNDERVALUED, bt.OVERVALUED, fc.valuation_label(0.0)
+
+FINANCIALS = [
+    {"period": str(y), "revenue": 1e10 * 1.1 ** (y - 2019), "free_cash_flow": 1e9 * 1.08 ** (y - 2019),
+     "ebitda": 2e9, "total_debt": 3e9, "interest_exp": 1.5e8, "shares_out": 5e8, "cash": 1e9}
+    for y in range(2019, 2023)
+]
+
+
+def month_bars(start: str, months: int, price0: float = 40.0) -> list[dict]:
+    """Two bars a month: mid-month, and the last weekday (the month-end close)."""
+    bars = []
+    for i, m in enumerate(np.arange(np.datetime64(start, "M"), np.datetime64(start, "M") + months)):
+        last = (m + 1).astype("datetime64[D]") - 1
+        last -= max(0, last.astype(object).weekday() - 4)
+        price = price0 * (1 + 0.02 * np.sin(i))
+        bars.append({"t": f"{m}-15", "c": price - 1})
+        bars.append({"t": str(last), "c": price})
+    return bars
+
+
+@pytest.fixture
+def company(db_dir):
+    db.init_company_db("AAA")
+    db.upsert_financials("AAA", FINANCIALS)
+    db.upsert_price_history("AAA", month_bars("2020-01", 48))
+    return "AAA"
+
+
+def same_points(a: dict, b: dict) -> None:
+    assert list(a["asof"]) == list(b["asof"]) and list(a["period"]) == list(b["period"])
+    np.testing.assert_allclose(a["intrinsic_value"], b["intrinsic_value"], rtol=1e-12)
+
+
+def test_statements_are_used_only_after_the_lag():
+    rows = [{"period": "2022", "free_cash_flow": 1.0, "shares_out": 10.0},
+            {"period": "2023-Q1", "free_cash_flow": 2.0, "shares_out": 10.0}]
+    asof = np.array(["2023-03-30", "2023-03-31", "2023-06-28", "2023-06-29"], dtype="datetime64[D]")
+    pit = bt.point_in_time_columns(asof, np.ones(4), rows, lag_days=90)
+    # 2022 ends 2022-12-31 → public 2023-03-31; 2023-Q1 ends 03-31 → public 06-29
+    assert list(pit["valid"]) == [False, True, True, True]
+    assert list(pit["period"]) == [None, "2022", "2022", "2023-Q1"]
+    assert list(pit["cols"]["base_fcf"][1:]) == [1.0, 1.0, 2.0]
+
+
+def test_backtest_never_looks_past_the_lag(company):
+    for lag in (30, 90, 200):
+        points = bt.run_backtest(["AAA"], years=None, lag_days=lag, persist=False)["points"]
+        assert len(points["asof"])
+        ends = np.array([bt._period_end(p) for p in points["period"]])
+        assert (ends + np.timedelta64(lag, "D") <= points["asof"]).all()
+        # ... and it is the newest period published by then
+        for asof, period in zip(points["asof"], points["period"]):
+            published = [r["period"] for r in FINANCIALS
+                         if bt._period_end(r["period"]) + np.timedelta64(lag, "D") <= asof]
+            assert period == published[-1]
+
+
+def test_incremental_reruns_reuse_stored_points(company):
+    first = bt.run_backtest(["AAA"], years=None)
+    n = len(first["points"]["asof"])
+    assert first["evaluated"] == n and first["reused"] == 0
+
+    again = bt.run_backtest(["AAA"], years=None)
+    assert again["evaluated"] == 0 and again["reused"] == n
+    same_points(again["points"], first["points"])
+
+    # A new month of prices: only the last stored month-end and the new one
+    db.upsert_price_history("AAA", month_bars("2024-01", 1, 45.0))
+    prices = bt.run_backtest(["AAA"], years=None)
+    assert prices["evaluated"] == 2 and prices["reused"] == n - 1
+    full = bt.run_backtest(["AAA"], years=None, incremental=False, persist=False)
+    assert full["evaluated"] == n + 1
+    same_points(prices["points"], full["points"])
+
+    # New fundamentals: everything is valued again, with no duplicate dates
+    db.upsert_financials("AAA", FINANCIALS + [dict(FINANCIALS[-1], period="2023-Q2")])
+    fundamentals = bt.run_backtest(["AAA"], years=None)
+    assert fundamentals["evaluated"] == n + 1 and fundamentals["reused"] == 0
+    assert len(set(fundamentals["points"]["asof"])) == n + 1
+    assert "2023-Q2" in set(fundamentals["points"]["period"])
+
+
+def test_params_get_their_own_stored_points(company):
+    bt.run_backtest(["AAA"], years=None)
+    other = bt.run_backtest(["AAA"], years=None, lag_days=30)
+    assert other["reused"] == 0 and other["evaluated"] > 0
+
+
+def test_company_without_statements(db_dir):
+    db.init_company_db("NOF")
+    db.upsert_price_history("NOF", month_bars("2023-01", 6))
+    result = bt.run_backtest(["NOF"])
+    assert result["no_points"] == ["NOF"] and result["evaluated"] == 0
+
+
+def points(rows: list[tuple]) -> dict:
+    """rows: (ticker, month, price, label)"""
+    t, m, p, lab = zip(*rows)
+    return {"ticker": np.array(t, dtype=object),
+            "asof": (np.array(m, dtype="datetime64[M]") + 1).astype("datetime64[D]") - 1,
+            "price": np.array(p, dtype=float),
+            "valuation_label": np.array(lab, dtype=object)}
+
+
+SAMPLE = points([
+    ("AAA", "2023-03", 12.0, FAIR),
+    ("BBB", "2023-01", 20.0, UNDER),
+    ("AAA", "2023-01", 10.0, UNDER),
+    ("AAA", "2023-04", 15.0, FAIR),
+    ("BBB", "2023-03", 30.0, OVER),          # no February for BBB
+    ("AAA", "2023-02", 11.0, OVER),
+])
+
+
+def test_forward_returns_match_ticker_and_month():
+    one = bt.forward_returns(SAMPLE, 1)
+    np.testing.assert_allclose(one, [15 / 12 - 1, np.nan, 0.1, np.nan, np.nan, 12 / 11 - 1])
+    two = bt.forward_returns(SAMPLE, 2)
+    np.testing.assert_allclose(two, [np.nan, 0.5, 0.2, np.nan, np.nan, 15 / 11 - 1])
+
+
+def test_hit_rates():
+    report = bt.hit_rates(SAMPLE, horizons=(1, 2))
+    one = report[1]
+    assert one["n"] == 3
+    assert one["undervalued"] == {"n": 1, "mean_return": pytest.approx(0.1), "hit_rate": 1.0}
+    assert one["overvalued"] == {"n": 1, "mean_return": pytest.approx(1 / 11), "hit_rate": 0.0}
+    assert one["fairly_valued"] == {"n": 1, "mean_return": pytest.approx(0.25)}
+    assert one["hit_rate"] == 0.5
+
+    two = report[2]
+    assert two["undervalued"]["n"] == 2 and two["undervalued"]["hit_rate"] == 1.0
+    assert two["hit_rate"] == pytest.approx(2 / 3)  # AAA Feb is OVERVALUED but rose
+
+    masked = bt.hit_rates(SAMPLE, horizons=(1,), mask=SAMPLE["ticker"] == "BBB")[1]
+    assert masked["n"] == 0 and masked["hit_rate"] is None
+
+
+def test_relative_hit_rates_subtract_the_month_mean():
+    report = bt.hit_rates(SAMPLE, horizons=(2,), relative=True)[2]
+    # January: AAA +20% and BBB +50% → relative -15% / +15%
+    assert report["undervalued"]["mean_return"] == pytest.approx(0.0)
+    assert report["hit_rate"] == pytest.approx(1 / 3)
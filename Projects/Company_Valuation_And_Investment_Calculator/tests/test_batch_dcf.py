@@ -0,0 +1,83 @@
+"""batch_dcf_valuation() against the scalar dcf_valuation() it vectorises."""
+import numpy as np
+import pytest
+
+import finance_calc as fc
+
+
+def scalar(base_fcf, wacc, growth, tg, net_debt, shares, cash):
+    return fc.dcf_valuation(float(base_fcf), float(wacc), list(map(float, growth)), float(tg),
+                            float(net_debt), float(shares), float(cash))["intrinsic_per_share"]
+
+
+def test_matches_scalar_per_ticker():
+    rng = np.random.default_rng(1)
+    n = 200
+    fcf = rng.uniform(-1e9, 5e9, n)
+    wacc = rng.uniform(0.04, 0.16, n)
+    growth = fc.growth_schedule(rng.uniform(-0.05, 0.4, n), 7)
+    tg = rng.uniform(0.0, 0.04, n)
+    net_debt = rng.uniform(0, 2e10, n)
+    shares = rng.uniform(0.5, 5e9, n)           # includes shares < 1 (clamped to 1)
+    cash = rng.uniform(0, 5e9, n)
+
+    batch = fc.batch_dcf_valuation(fcf, wacc, growth, tg, net_debt, shares, cash)
+    expected = [scalar(*args) for args in zip(fcf, wacc, growth, tg, net_debt, shares, cash)]
+    np.testing.assert_allclose(batch, expected, rtol=1e-12)
+
+
+def test_wacc_grid_broadcast():
+    rng = np.random.default_rng(2)
+    fcf, shares = rng.uniform(1e8, 1e9, 5), rng.uniform(1e7, 1e8, 5)
+    growth = fc.growth_schedule(rng.uniform(0.03, 0.3, 5), 5)
+    waccs = np.linspace(0.06, 0.16, 11)
+
+    grid = fc.batch_dcf_valuation(fcf[None, :], waccs[:, None], growth[None, :, :],
+                                  0.025, 0.0, shares[None, :], 0.0)
+    assert grid.shape == (11, 5)
+    for i, w in enumerate(waccs):
+        for j in range(5):
+            assert grid[i, j] == pytest.approx(scalar(fcf[j], w, growth[j], 0.025, 0, shares[j], 0),
+                                               rel=1e-12)
+
+
+@pytest.mark.parametrize("wacc, tg", [
+    (0.02, 0.025),      # WACC below terminal growth: no terminal value
+    (0.025, 0.025),     # WACC equal to terminal growth
+    (-1.0, 0.025),      # rate <= -1: every PV is 0
+    (-1.5, -2.0),
+    (0.0, -0.01),
+])
+def test_edge_cases_match_scalar(wacc, tg):
+    growth = fc.growth_schedule(0.1, 5)
+    args = (1e9, wacc, growth, tg, 2e8, 1e7, 5e7)
+    assert float(fc.batch_dcf_valuation(*args)) == pytest.approx(scalar(*args), rel=1e-12, abs=1e-9)
+
+
+def test_dcf_valuation_accepts_a_flat_curve():
+    growth = fc.growth_schedule(0.12, 5)
+    flat = fc.dcf_valuation(1e9, 0.09, growth, 0.025, 1e8, 1e7, 1e7)
+    curve = fc.dcf_valuation(1e9, fc.DiscountCurve.flat(0.09), growth, 0.025, 1e8, 1e7, 1e7)
+    assert curve["intrinsic_per_share"] == pytest.approx(flat["intrinsic_per_share"], rel=1e-12)
+    for a, b in zip(flat["projected_fcfs"], curve["projected_fcfs"]):
+        assert a["pv"] == pytest.approx(b["pv"], rel=1e-12)
+
+
+def test_requires_a_projection_year():
+    with pytest.raises(ValueError):
+        fc.batch_dcf_valuation(1e9, 0.09, np.empty((3, 0)))
+
+
+def test_tvm_future_value_uses_forward_rates():
+    fin = {"fcf_ttm": 2e9, "shares": 8e8, "total_equity": 6e10, "total_debt": 5e9,
+           "beta": 1.1, "rev_growth_5y": 0.12}
+    curve = fc.DiscountCurve([1, 3, 5], [0.05, 0.07, 0.08])
+    table = fc.run_full_valuation(fin, 75.0, discount_curve=curve)["tvm_table"]
+    for row in table:
+        # Held to year 5, then discounted back to today: PV of the same FCF
+        assert row["fv"] * curve.df(5) == pytest.approx(row["pv"], rel=1e-12)
+
+    flat = fc.run_full_valuation(fin, 75.0)
+    for row in flat["tvm_table"]:
+        assert row["fv"] == pytest.approx(row["fcf"] * (1 + flat["wacc"]) ** (5 - row["year"]),
+                                          rel=1e-12)
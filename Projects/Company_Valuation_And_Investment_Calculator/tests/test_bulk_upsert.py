@@ -0,0 +1,88 @@
+"""Set-based upserts (INSERT OR REPLACE … unnest) and dividend validation."""
+import datetime as dt
+import logging
+
+import duckdb
+import pytest
+
+import db_manager as db
+
+
+@pytest.fixture
+def company(db_dir):
+    db.init_company_db("AAA")
+    return "AAA"
+
+
+def test_bars_round_trip(company):
+    bars = [{"t": "2024-01-02T05:00:00Z", "o": 10.0, "h": 11.0, "l": 9.5, "c": 10.5, "v": 1000},
+            {"t": "2024-01-03T05:00:00Z", "o": 10.5, "h": 12.0, "l": 10.0, "c": 11.5, "v": 2000}]
+    assert db.upsert_price_history(company, bars) == 2
+    assert db.get_price_history(company) == [
+        {"date": "2024-01-02", "open": 10.0, "high": 11.0, "low": 9.5, "close": 10.5, "volume": 1000},
+        {"date": "2024-01-03", "open": 10.5, "high": 12.0, "low": 10.0, "close": 11.5, "volume": 2000},
+    ]
+
+
+def test_duplicate_keys_last_wins(company):
+    assert db.upsert_financials(company, [{"period": "2023", "revenue": 1.0},
+                                          {"period": "2024", "revenue": 2.0},
+                                          {"period": "2023", "revenue": 3.0}]) == 2
+    assert {r["period"]: r["revenue"] for r in db.get_financials_history(company)} == \
+        {"2023": 3.0, "2024": 2.0}
+
+    bars = [{"t": "2024-01-02", "c": 1.0}, {"t": "2024-01-02", "c": 2.0}]
+    assert db.upsert_price_history(company, bars) == 1
+    assert [b["close"] for b in db.get_price_history(company)] == [2.0]
+
+
+def test_upsert_replaces_stored_rows(company):
+    db.upsert_metrics(company, {"beta": 1.0, "peRatio": 12.0})
+    db.upsert_metrics(company, {"beta": 1.3, "name": "not numeric"})
+    assert db.get_all_metrics(company) == {"beta": 1.3, "peRatio": 12.0}
+
+
+def test_replace_all_drops_rows_not_resent(company):
+    db.upsert_peers(company, ["BBB", "CCC", "AAA", "BBB"])
+    assert sorted(db.get_peers_list(company)) == ["BBB", "CCC"]
+    db.upsert_peers(company, ["DDD"])
+    assert db.get_peers_list(company) == ["DDD"]
+
+
+def test_failed_statement_rolls_back(company):
+    db.upsert_metrics(company, {"beta": 1.0})
+    with pytest.raises(duckdb.Error):
+        db._bulk_upsert(company, "metrics", {"key": ["beta", "x"], "value": [2.0, "not a number"]},
+                        {"key": "VARCHAR", "value": "DOUBLE"}, replace_all=True)
+    assert db.get_all_metrics(company) == {"beta": 1.0}
+
+
+def test_empty_write_is_a_no_op(company):
+    assert db.upsert_metrics(company, {}) == 0
+    assert db.upsert_dividends(company, []) == 0
+    assert db.get_all_metrics(company) == {}
+
+
+def test_validate_dividends():
+    valid, rejected = db.validate_dividends([
+        {"exDate": "2024-02-09", "amount": 0.24, "currency": "USD"},
+        {"exDate": "2024-05-10T00:00:00", "amount": 1},
+        {"exDate": "not a date", "amount": 0.24},
+        {"amount": 0.24},
+        {"exDate": "2024-08-09", "amount": "0.24"},
+        {"exDate": "2024-08-09", "amount": float("nan")},
+        {"exDate": "2024-08-09", "amount": True},
+    ])
+    assert valid == [(dt.date(2024, 2, 9), 0.24, "USD"), (dt.date(2024, 5, 10), 1.0, "USD")]
+    assert len(rejected) == 5
+
+
+def test_dividends_keep_valid_rows_and_log_rejects(company, caplog):
+    divs = [{"exDate": "2024-02-09", "amount": 0.20},
+            {"exDate": "bad", "amount": 0.22},
+            {"exDate": "2024-02-09", "amount": 0.24, "currency": "EUR"}]
+    with caplog.at_level(logging.WARNING, logger="db_manager"):
+        assert db.upsert_dividends(company, divs) == 1
+    assert db.get_dividends_history(company) == [
+        {"ex_date": "2024-02-09", "amount": 0.24, "currency": "EUR"}]
+    assert "skipped 1 of 3" in caplog.text and "'bad'" in caplog.text
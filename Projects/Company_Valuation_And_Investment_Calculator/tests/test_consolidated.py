@@ -0,0 +1,99 @@
+"""migrate_to_consolidated() and the consolidated branch of the cross-company reads."""
+import duckdb
+import pytest
+
+import db_manager as db
+
+READS = {
+    "company_profile": db.TableRead(("name", "market_cap")),
+    "metrics":         db.TableRead(("key", "value"), where="key = 'beta'"),
+    "valuation":       db.TableRead(("run_id", "intrinsic_value"),
+                                    latest="computed_at DESC, run_id DESC"),
+}
+
+
+def valuation(intrinsic: float) -> dict:
+    return {"wacc": 0.09, "intrinsic_value": intrinsic, "market_price": 100.0,
+            "npv_project": 0.0, "irr_project": 0.1, "dcf_details": {}}
+
+
+def populate(ticker: str, beta: float, runs: int) -> list[str]:
+    db.init_company_db(ticker)
+    db.upsert_profile(ticker, {"name": ticker.title(), "marketCapitalization": beta * 1000})
+    db.upsert_metrics(ticker, {"beta": beta, "peRatio": 20.0})
+    db.upsert_price_history(ticker, [{"t": f"2024-01-0{d}", "c": float(d)} for d in range(2, 7)])
+    return [db.save_valuation(ticker, valuation(100.0 + i)) for i in range(runs)]
+
+
+def read_all(tickers):
+    with db.company_tables(tickers, READS) as (con, names, src, skipped):
+        out = {table: sorted(con.execute(sql).fetchall()) for table, sql in src.items()}
+    return names, skipped, out
+
+
+@pytest.fixture
+def two_files(db_dir):
+    runs = {"AAA": populate("AAA", 1.1, 2), "BBB": populate("BBB", 0.8, 1)}
+    db.pool.close_all()
+    return runs
+
+
+def market_counts() -> dict:
+    con = duckdb.connect(str(db.MARKET_DB_PATH), read_only=True)
+    try:
+        return {t: con.execute(f"SELECT count(*) FROM {t}").fetchone()[0] for t in db._TABLES}
+    finally:
+        con.close()
+
+
+def test_migration_copies_every_row_and_is_idempotent(two_files):
+    report = db.migrate_to_consolidated()
+    assert report["migrated"] == ["AAA", "BBB"] and report["skipped"] == []
+    expected = {"company_profile": 2, "metrics": 4, "price_history": 10, "valuation": 3}
+    assert {t: report["rows"][t] for t in expected} == expected
+    db.pool.close_all()
+    first = market_counts()
+    assert {t: first[t] for t in expected} == expected
+
+    again = db.migrate_to_consolidated()
+    assert again["migrated"] == ["AAA", "BBB"]
+    db.pool.close_all()
+    assert market_counts() == first
+    assert sorted(p.name for p in db.DB_DIR.glob("*.duckdb")) == \
+        ["AAA.duckdb", "BBB.duckdb", "market.duckdb"]
+
+
+def test_missing_file_is_skipped(two_files):
+    report = db.migrate_to_consolidated(["AAA", "ZZZ"])
+    assert report["migrated"] == ["AAA"] and report["skipped"] == ["ZZZ"]
+
+
+def test_consolidated_reads_match_per_ticker(two_files, monkeypatch):
+    per_ticker = read_all(["bbb", "AAA", "ZZZ"])
+    db.migrate_to_consolidated()
+
+    monkeypatch.setattr(db, "STORAGE_MODE", "consolidated")
+    db.read_cache.clear()
+    assert db.list_companies() == ["AAA", "BBB"]
+    names, skipped, out = read_all(["bbb", "AAA", "ZZZ"])
+    assert names == ["BBB", "AAA"] == per_ticker[0]
+    assert list(skipped) == ["ZZZ"]
+    assert out == per_ticker[2]
+    assert out["valuation"] == sorted([("AAA", two_files["AAA"][-1], 101.0),
+                                       ("BBB", two_files["BBB"][-1], 100.0)])
+    assert out["metrics"] == [("AAA", "beta", 1.1), ("BBB", "beta", 0.8)]
+
+    assert db.get_all_metrics("AAA") == {"beta": 1.1, "peRatio": 20.0}
+    assert db.get_latest_valuation("BBB")["run_id"] == two_files["BBB"][0]
+
+
+def test_consolidated_writes_after_migration(two_files, monkeypatch):
+    db.migrate_to_consolidated()
+    monkeypatch.setattr(db, "STORAGE_MODE", "consolidated")
+    db.read_cache.clear()
+    populate("CCC", 1.5, 1)
+    assert db.list_companies() == ["AAA", "BBB", "CCC"]
+    names, _, out = read_all(["AAA", "CCC"])
+    assert names == ["AAA", "CCC"]
+    assert out["metrics"] == [("AAA", "beta", 1.1), ("CCC", "beta", 1.5)]
+    assert not (db.DB_DIR / "CCC.duckdb").exists()
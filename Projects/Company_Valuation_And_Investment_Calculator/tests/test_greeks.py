@@ -0,0 +1,92 @@
+"""dcf_greeks() against central finite differences of dcf_valuation()."""
+import numpy as np
+import pytest
+
+import finance_calc as fc
+
+BASE = {
+    "base_fcf":        2.0e9,
+    "wacc":            0.09,
+    "growth":          [0.15, 0.13, 0.11, 0.09, 0.07],
+    "terminal_growth": 0.025,
+    "net_debt":        4.0e9,
+    "shares":          8.0e8,
+    "cash":            1.5e9,
+}
+
+
+def price(p: dict) -> float:
+    return fc.dcf_valuation(p["base_fcf"], p["wacc"], list(p["growth"]), p["terminal_growth"],
+                            p["net_debt"], p["shares"], p["cash"])["intrinsic_per_share"]
+
+
+def bumped(p: dict, key: str, h: float, index: int = None) -> float:
+    def at(sign):
+        q = dict(p, growth=list(p["growth"]))
+        if index is None:
+            q[key] = p[key] + sign * h
+        else:
+            q[key][index] = p[key][index] + sign * h
+        return price(q)
+    return (at(1) - at(-1)) / (2 * h)
+
+
+def greeks(p: dict, wacc=None) -> dict:
+    return fc.dcf_greeks(p["base_fcf"], p["wacc"] if wacc is None else wacc, p["growth"],
+                         p["terminal_growth"], p["net_debt"], p["shares"], p["cash"])
+
+
+@pytest.mark.parametrize("key, h", [
+    ("wacc", 1e-6), ("terminal_growth", 1e-6), ("base_fcf", 1e3),
+    ("net_debt", 1e3), ("cash", 1e3), ("shares", 1e2),
+])
+def test_scalar_inputs(key, h):
+    assert float(greeks(BASE)[key]) == pytest.approx(bumped(BASE, key, h), rel=1e-5)
+
+
+def test_growth_per_year():
+    g = greeks(BASE)["growth"]
+    assert g.shape == (5,)
+    for j in range(5):
+        assert g[j] == pytest.approx(bumped(BASE, "growth", 1e-6, j), rel=1e-5)
+
+
+def test_broadcast_matches_one_at_a_time():
+    waccs = np.array([0.07, 0.09, 0.12])
+    batch = greeks(BASE, wacc=waccs)
+    for i, w in enumerate(waccs):
+        one = greeks(dict(BASE, wacc=w))
+        for key, value in one.items():
+            np.testing.assert_allclose(batch[key][i], value, rtol=1e-12)
+
+
+def test_no_terminal_value_when_wacc_below_growth():
+    p = dict(BASE, wacc=0.02)
+    g = greeks(p)
+    assert float(g["terminal_growth"]) == 0.0
+    assert float(g["wacc"]) == pytest.approx(bumped(p, "wacc", 1e-6), rel=1e-5)
+
+
+def test_curve_shift_matches_parallel_bump():
+    tenors, zeros = [1, 3, 5], [0.05, 0.07, 0.08]
+
+    def curve_price(shift):
+        curve = fc.DiscountCurve(tenors, [z + shift for z in zeros])
+        return fc.dcf_valuation(BASE["base_fcf"], curve, BASE["growth"], BASE["terminal_growth"],
+                                BASE["net_debt"], BASE["shares"], BASE["cash"])["intrinsic_per_share"]
+
+    g = greeks(BASE, wacc=fc.DiscountCurve(tenors, zeros))
+    fd = (curve_price(1e-6) - curve_price(-1e-6)) / 2e-6
+    assert float(g["wacc"]) == pytest.approx(fd, rel=1e-5)
+
+
+def test_valuation_result_greeks():
+    fin = {"fcf_ttm": 2e9, "shares": 8e8, "total_equity": 6e10, "total_debt": 5e9,
+           "beta": 1.1, "cost_of_debt": 0.05, "rev_growth_5y": 0.12,
+           "net_debt": 4e9, "cash": 1e9}
+    eager = fc.run_full_valuation(fin, 75.0, greeks=True)
+    lazy = fc.run_full_valuation(fin, 75.0)
+    assert eager["greeks"] == lazy["greeks"]
+    assert eager["greeks"]["wacc"] == pytest.approx(
+        float(fc.dcf_greeks(lazy.base_fcf, lazy.discount_curve, lazy.growth, lazy.terminal_growth,
+                            lazy.net_debt, lazy.shares, lazy.cash)["wacc"]))
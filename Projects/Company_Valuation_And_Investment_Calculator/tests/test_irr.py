@@ -0,0 +1,50 @@
+"""compute_irr() / batch_irr(): roots of NPV, and batch agreeing with scalar."""
+import numpy as np
+import pytest
+
+import finance_calc as fc
+
+
+def npv_at(initial, flows, r):
+    return -initial + sum(cf / (1 + r) ** t for t, cf in enumerate(flows, start=1))
+
+
+def test_conventional_project_is_a_root():
+    irr = fc.compute_irr(1000.0, [300.0, 300.0, 300.0, 300.0, 300.0])
+    assert irr == pytest.approx(0.15238237, abs=1e-8)
+    assert npv_at(1000.0, [300.0] * 5, irr) == pytest.approx(0.0, abs=1e-8)
+
+
+def test_no_real_irr():
+    assert fc.compute_irr(1000.0, [-10.0, -10.0]) is None
+    assert np.isnan(fc.batch_irr(1000.0, [[-10.0, -10.0]])[0])
+
+
+def test_batch_matches_scalar():
+    rng = np.random.default_rng(3)
+    initial = rng.uniform(100, 2000, 300)
+    flows = rng.uniform(-50, 600, (300, 8))
+    flows[::7, -1] -= 3000                      # some rows with several sign changes
+
+    batch = fc.batch_irr(initial, flows)
+    for c0, cfs, got in zip(initial, flows, batch):
+        want = fc.compute_irr(c0, cfs)
+        if want is None:
+            assert np.isnan(got)
+        else:
+            assert got == pytest.approx(want, rel=1e-8, abs=1e-10)
+
+
+def test_batch_keeps_leading_shape():
+    flows = np.tile([400.0, 400.0, 400.0], (2, 3, 1))
+    out = fc.batch_irr(np.full((2, 3), 900.0), flows)
+    assert out.shape == (2, 3)
+    np.testing.assert_allclose(out, fc.compute_irr(900.0, [400.0] * 3), rtol=1e-10)
+
+
+def test_multiple_roots_pick_the_one_nearest_the_guess():
+    # -100, +230, -132: IRRs at 10% and 20%, and no sign change over the full bracket
+    roots = fc.irr_roots(100.0, [230.0, -132.0])
+    np.testing.assert_allclose(roots, [0.1, 0.2], atol=1e-10)
+    assert fc.compute_irr(100.0, [230.0, -132.0], guess=0.09) == pytest.approx(0.1, abs=1e-10)
+    assert fc.compute_irr(100.0, [230.0, -132.0], guess=0.25) == pytest.approx(0.2, abs=1e-10)
@@ -0,0 +1,85 @@
+"""run_monte_carlo_valuation(): reproducibility, the copula, and input guards."""
+import numpy as np
+import pytest
+
+import finance_calc as fc
+import monte_carlo as mc
+
+FIN = {"fcf_ttm": 2e9, "shares": 8e8, "total_equity": 6e10, "total_debt": 5e9,
+       "beta": 1.1, "cost_of_debt": 0.05, "rev_growth_5y": 0.12,
+       "net_debt": 4e9, "cash": 1e9}
+
+
+def run(**kwargs):
+    kwargs.setdefault("n_paths", 20_000)
+    kwargs.setdefault("chunk_size", 3_000)
+    return mc.run_monte_carlo_valuation(FIN, 75.0, seed=7, return_values=True, **kwargs)
+
+
+def captured_inputs(monkeypatch, **kwargs) -> dict:
+    """The sampled arrays batch_dcf_valuation() receives (in-process run)."""
+    seen = {"wacc": [], "growth": []}
+
+    def record(base_fcf, wacc, growth_rates, *args):
+        seen["wacc"].append(np.broadcast_to(wacc, growth_rates.shape[:-1]).copy())
+        seen["growth"].append(growth_rates[:, 0].copy())
+        return np.zeros(growth_rates.shape[:-1])
+
+    monkeypatch.setattr(fc, "batch_dcf_valuation", record)
+    run(**kwargs)
+    return {k: np.concatenate(v) for k, v in seen.items()}
+
+
+def test_same_seed_is_identical_across_workers():
+    in_process = run()
+    pooled = run(n_workers=2)
+    np.testing.assert_array_equal(in_process["values"], pooled["values"])
+    assert in_process["percentiles"] == pooled["percentiles"]
+    assert in_process["entropy"] == pooled["entropy"] == 7
+
+
+def test_entropy_reproduces_an_unseeded_run():
+    first = mc.run_monte_carlo_valuation(FIN, 75.0, n_paths=5_000, return_values=True)
+    again = mc.run_monte_carlo_valuation(FIN, 75.0, n_paths=5_000, seed=first["entropy"],
+                                         return_values=True)
+    np.testing.assert_array_equal(first["values"], again["values"])
+
+
+def test_correlation_is_honoured(monkeypatch):
+    distributions = {"wacc": ("normal", 0.10, 0.01), "growth": ("normal", 0.15, 0.02)}
+    seen = captured_inputs(monkeypatch, distributions=distributions,
+                           correlation={("wacc", "growth"): -0.6})
+    assert np.corrcoef(seen["wacc"], seen["growth"])[0, 1] == pytest.approx(-0.6, abs=0.02)
+
+    seen = captured_inputs(monkeypatch, distributions=distributions)
+    assert np.corrcoef(seen["wacc"], seen["growth"])[0, 1] == pytest.approx(0.0, abs=0.03)
+
+
+def test_sampled_wacc_is_clamped(monkeypatch):
+    seen = captured_inputs(monkeypatch, distributions={"wacc": ("normal", 0.15, 0.2)})
+    assert seen["wacc"].min() == fc.WACC_BOUNDS[0] and seen["wacc"].max() == fc.WACC_BOUNDS[1]
+
+
+def test_paths_without_a_terminal_value_are_rejected():
+    result = run(distributions={"wacc": ("fixed", 0.06),
+                                "terminal_growth": ("uniform", 0.04, 0.08)})
+    assert 0 < result["n_rejected"] < 20_000
+    assert result["n_paths"] + result["n_rejected"] == 20_000
+    assert not np.isnan(result["values"]).any()
+
+
+def test_degenerate_triangular_is_fixed():
+    result = run(distributions={"terminal_growth": ("triangular", 0.02, 0.02, 0.02)})
+    fixed = run(distributions={"terminal_growth": ("fixed", 0.02)})
+    np.testing.assert_array_equal(result["values"], fixed["values"])
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"chunk_size": 0},
+    {"chunk_size": -5},
+    {"distributions": {"terminal_growth": ("triangular", 0.02, 0.03, 0.01)}},
+    {"distributions": {"wacc": ("normal", 0.1, 0.01)}, "correlation": [[1.0, 0.5], [0.5, 1.0]]},
+])
+def test_invalid_arguments(kwargs):
+    with pytest.raises(ValueError):
+        run(**kwargs)
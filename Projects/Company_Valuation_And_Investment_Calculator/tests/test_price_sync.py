@@ -0,0 +1,121 @@
+"""sync_price_history(): backfill vs incremental, and nothing stored on a failed fetch."""
+from datetime import date, datetime, timedelta
+
+import pytest
+import requests
+
+import data_fetcher as df
+import db_manager as db
+import price_sync as ps
+import write_behind as wb
+
+
+def as_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+class FakeAlpaca:
+    """get_bars_range() stand-in: one bar per weekday in the range, close = 100 + day of month."""
+
+    def __init__(self, fail_from: date = None):
+        self.calls = []
+        self.fail_from = fail_from
+
+    def __call__(self, symbol, start, end=None):
+        start, end = as_date(start), as_date(end or date.today())
+        self.calls.append((symbol, start, end))
+        if self.fail_from is not None and end >= self.fail_from:
+            raise requests.HTTPError("429 Too Many Requests")
+        days = (start + timedelta(days=i) for i in range((end - start).days + 1))
+        return [{"t": f"{d}T05:00:00Z", "o": 1.0, "h": 2.0, "l": 0.5, "c": 100.0 + d.day, "v": 10}
+                for d in days if d.weekday() < 5]
+
+
+@pytest.fixture
+def alpaca(db_dir, monkeypatch):
+    fake = FakeAlpaca()
+    monkeypatch.setattr(df, "get_bars_range", fake)
+    return fake
+
+
+def stored(ticker: str) -> list[dict]:
+    return db.get_price_history(ticker, limit=None)
+
+
+def test_new_ticker_is_backfilled_in_windows(alpaca):
+    result = ps.sync_price_history("aaa", backfill_years=1, chunk_days=100, max_workers=2)
+    assert result["mode"] == "backfill" and "error" not in result
+    assert len(alpaca.calls) == 4                       # 365 days in 100-day windows
+    assert {c[0] for c in alpaca.calls} == {"AAA"}
+    bars = stored("AAA")
+    assert result["written"] == len(bars) > 200
+    assert bars[-1]["date"] <= str(date.today())
+    assert db.get_last_price_date("AAA") == date.fromisoformat(bars[-1]["date"])
+
+
+def test_stored_history_syncs_from_the_last_date(alpaca):
+    db.init_company_db("AAA")
+    last = date.today() - timedelta(days=10)
+    last -= timedelta(days=max(0, last.weekday() - 4))      # a trading day
+    db.upsert_price_history("AAA", [{"t": str(last - timedelta(days=1)), "c": 1.0},
+                                    {"t": str(last), "c": 2.0}])     # a mid-session bar
+    result = ps.sync_price_history("AAA")
+    assert result["mode"] == "incremental" and result["start"] == str(last)
+    assert alpaca.calls == [("AAA", last, date.today())]
+    closes = {b["date"]: b["close"] for b in stored("AAA")}
+    assert closes[str(last - timedelta(days=1))] == 1.0
+    assert closes[str(last)] == 100.0 + last.day            # the stored day is re-read
+    assert len(closes) == 1 + result["fetched"]
+
+
+def test_failed_backfill_stores_nothing(alpaca):
+    alpaca.fail_from = date.today() - timedelta(days=30)    # only the newest window fails
+    result = ps.sync_price_history("AAA", backfill_years=1, chunk_days=100)
+    assert result["mode"] == "backfill" and "429" in result["error"]
+    assert result["fetched"] == result["written"] == 0
+    assert stored("AAA") == [] and db.get_last_price_date("AAA") is None
+
+    alpaca.fail_from = None                                 # the retry backfills again
+    assert ps.sync_price_history("AAA", backfill_years=1, chunk_days=100)["mode"] == "backfill"
+    assert stored("AAA")
+
+
+def test_failed_incremental_keeps_the_resume_point(alpaca):
+    db.init_company_db("AAA")
+    last = date.today() - timedelta(days=5)
+    db.upsert_price_history("AAA", [{"t": str(last), "c": 2.0}])
+    alpaca.fail_from = last
+    result = ps.sync_price_history("AAA")
+    assert result["mode"] == "incremental" and result["error"]
+    assert [b["close"] for b in stored("AAA")] == [2.0]
+    assert db.get_last_price_date("AAA") == last
+
+
+def test_writer_queues_the_bars(alpaca):
+    writer = wb.WriteBehind(linger=0.005)
+    try:
+        result = ps.sync_price_history("AAA", backfill_years=0.1, writer=writer)
+        assert writer.flush("AAA", timeout=10)
+    finally:
+        writer.close()
+    assert result["written"] == result["fetched"] == len(stored("AAA")) > 0
+
+
+def test_watchlist_reports_each_ticker(alpaca, monkeypatch):
+    real = ps.sync_price_history
+
+    def sync(ticker, **kwargs):
+        if ticker == "BAD":
+            raise RuntimeError("unexpected")
+        return real(ticker, **kwargs)
+
+    monkeypatch.setattr(ps, "sync_price_history", sync)
+    results = ps.sync_watchlist(["aaa", "BAD"], backfill_years=0.1)
+    assert [r["ticker"] for r in results] == ["AAA", "BAD"]
+    assert results[0]["mode"] == "backfill" and results[0]["written"] > 0
+    assert results[1] == {"ticker": "BAD", "mode": "error", "error": "unexpected",
+                          "fetched": 0, "written": 0}
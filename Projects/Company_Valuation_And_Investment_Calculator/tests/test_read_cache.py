@@ -0,0 +1,105 @@
+"""ReadCache: hits, TTL expiry, and invalidation by the matching writes."""
+from types import SimpleNamespace
+
+import pytest
+
+import db_manager as db
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(t=1000.0)
+    monkeypatch.setattr(db, "time", SimpleNamespace(monotonic=lambda: now.t))
+    return now
+
+
+def counting_loader():
+    calls = []
+
+    def load(ticker):
+        calls.append(ticker)
+        return {"n": len(calls)}
+    return load, calls
+
+
+def test_entry_expires_after_its_ttl(clock):
+    cache = db.ReadCache(ttl={"metrics": 60.0})
+    load, calls = counting_loader()
+    assert cache.get("metrics", "AAA", load) == {"n": 1}
+    clock.t += 59.0
+    assert cache.get("metrics", "aaa", load) == {"n": 1}
+    clock.t += 2.0
+    assert cache.get("metrics", "AAA", load) == {"n": 2}
+    assert calls == ["AAA", "AAA"]
+    assert cache.stats()["by_table"]["metrics"] == {"hits": 1, "misses": 2}
+
+
+def test_zero_ttl_and_lru_bound():
+    load, calls = counting_loader()
+    uncached = db.ReadCache(ttl={"metrics": 0})
+    uncached.get("metrics", "AAA", load)
+    uncached.get("metrics", "AAA", load)
+    assert len(calls) == 2 and uncached.stats()["size"] == 0
+
+    small = db.ReadCache(maxsize=2, ttl={"metrics": 60.0})
+    for t in ("AAA", "BBB", "CCC"):
+        small.get("metrics", t, load)
+    assert small.stats()["size"] == 2 and small.stats()["evictions"] == 1
+    small.get("metrics", "AAA", load)           # evicted first: loaded again
+    assert calls[-1] == "AAA" and len(calls) == 6
+
+
+def test_invalidation_is_per_table_and_ticker():
+    cache = db.ReadCache(ttl={"metrics": 60.0, "peers": 60.0})
+    load, calls = counting_loader()
+    for table in ("metrics", "peers"):
+        for t in ("AAA", "BBB"):
+            cache.get(table, t, load)
+    cache.invalidate("metrics", "AAA")
+    cache.get("metrics", "AAA", load)
+    cache.get("metrics", "BBB", load)
+    cache.get("peers", "AAA", load)
+    assert len(calls) == 5
+    cache.invalidate("peers")
+    cache.get("peers", "AAA", load)
+    cache.get("peers", "BBB", load)
+    assert len(calls) == 7
+
+
+def test_load_racing_a_write_is_not_cached():
+    cache = db.ReadCache(ttl={"metrics": 60.0})
+
+    def load(ticker):
+        cache.invalidate("metrics", ticker)     # a write lands mid-read
+        return {"stale": True}
+    cache.get("metrics", "AAA", load)
+    assert cache.stats()["size"] == 0
+
+
+def test_writes_invalidate_reads(db_dir):
+    db.init_company_db("AAA")
+    db.upsert_metrics("AAA", {"beta": 1.0})
+    db.upsert_profile("AAA", {"name": "Triple A", "marketCapitalization": 10.0})
+    db.read_cache.hits.clear()
+    db.read_cache.misses.clear()
+
+    assert db.get_all_metrics("AAA") == {"beta": 1.0}
+    assert db.get_all_metrics("AAA") == {"beta": 1.0}
+    assert db.get_profile("AAA")["name"] == "Triple A"
+    assert db.get_profile("AAA")["name"] == "Triple A"
+    assert db.read_cache.stats()["by_table"] == {
+        "company_profile": {"hits": 1, "misses": 1}, "metrics": {"hits": 1, "misses": 1}}
+
+    db.upsert_metrics("AAA", {"beta": 1.4})
+    db.upsert_profile("AAA", {"name": "Renamed"})
+    assert db.get_all_metrics("AAA") == {"beta": 1.4}
+    assert db.get_profile("AAA")["name"] == "Renamed"
+    assert db.get_all_metrics("AAA") == {"beta": 1.4}      # hit again after the reload
+    assert db.read_cache.stats()["by_table"]["metrics"] == {"hits": 2, "misses": 2}
+
+
+def test_cached_value_is_a_copy(db_dir):
+    db.init_company_db("AAA")
+    db.upsert_metrics("AAA", {"beta": 1.0})
+    db.get_all_metrics("AAA")["beta"] = 99.0
+    assert db.get_all_metrics("AAA") == {"beta": 1.0}
@@ -0,0 +1,148 @@
+"""Upgrading databases written before schema versioning (and part-way through it)."""
+import json
+import shutil
+from pathlib import Path
+
+import duckdb
+import pytest
+
+import db_manager as db
+
+# Tables as the original db_manager created them: no schema_version, the
+# valuation log as a JSON blob, no cash on financials
+LEGACY_DDL = (
+    """CREATE TABLE company_profile (
+        ticker VARCHAR PRIMARY KEY, name VARCHAR, exchange VARCHAR, currency VARCHAR,
+        country VARCHAR, ipo_date VARCHAR, market_cap DOUBLE, shares_out DOUBLE,
+        sector VARCHAR, industry VARCHAR, logo VARCHAR,
+        fetched_at TIMESTAMP DEFAULT current_timestamp)""",
+    """CREATE TABLE price_history (
+        date DATE, open DOUBLE, high DOUBLE, low DOUBLE, close DOUBLE, volume BIGINT,
+        PRIMARY KEY (date))""",
+    """CREATE TABLE financials (
+        period VARCHAR PRIMARY KEY, revenue DOUBLE, net_income DOUBLE, ebitda DOUBLE,
+        free_cash_flow DOUBLE, total_debt DOUBLE, total_equity DOUBLE, interest_exp DOUBLE,
+        capex DOUBLE, op_cash_flow DOUBLE, shares_out DOUBLE,
+        fetched_at TIMESTAMP DEFAULT current_timestamp)""",
+    """CREATE TABLE metrics (
+        key VARCHAR PRIMARY KEY, value DOUBLE, fetched_at TIMESTAMP DEFAULT current_timestamp)""",
+    """CREATE TABLE valuation (
+        run_id VARCHAR PRIMARY KEY, wacc DOUBLE, intrinsic_value DOUBLE, market_price DOUBLE,
+        npv_project DOUBLE, irr_project DOUBLE, dcf_details VARCHAR,
+        computed_at TIMESTAMP DEFAULT current_timestamp)""",
+    """CREATE TABLE dividends (
+        ex_date DATE, amount DOUBLE, currency VARCHAR, PRIMARY KEY (ex_date))""",
+    """CREATE TABLE peers (
+        peer_ticker VARCHAR PRIMARY KEY, fetched_at TIMESTAMP DEFAULT current_timestamp)""",
+)
+
+LEGACY_DETAILS = {"enterprise_value": 1.2e11, "intrinsic_per_share": 150.0,
+                  "projected_fcfs": [{"year": 1, "fcf": 1e9, "pv": 9e8}]}
+
+
+@pytest.fixture
+def legacy_db(db_dir):
+    con = duckdb.connect(str(db_dir / "OLD.duckdb"))
+    for ddl in LEGACY_DDL:
+        con.execute(ddl)
+    con.execute("INSERT INTO valuation VALUES ('20240101_120000', 0.09, 150.0, 120.0, 1e6, 0.12, ?,"
+                " TIMESTAMP '2024-01-01 12:00:00')", [json.dumps(LEGACY_DETAILS)])
+    con.execute("INSERT INTO financials (period, revenue, free_cash_flow, shares_out)"
+                " VALUES ('2023', 5e10, 4e9, 8e8)")
+    con.execute("INSERT INTO metrics (key, value) VALUES ('beta', 1.1)")
+    con.close()
+    return "OLD"
+
+
+def schema_versions(ticker: str) -> list[int]:
+    con = duckdb.connect(str(db._db_path(ticker)))
+    try:
+        return [r[0] for r in con.execute("SELECT version FROM schema_version ORDER BY version").fetchall()]
+    finally:
+        con.close()
+
+
+def test_legacy_file_upgrades_once(legacy_db):
+    assert db.ensure_schema(legacy_db) == (0, db.SCHEMA_VERSION)
+    assert db.ensure_schema(legacy_db) == (db.SCHEMA_VERSION, db.SCHEMA_VERSION)
+    db.pool.close_all()
+    assert schema_versions(legacy_db) == [v for v, _, _ in db.MIGRATIONS]
+
+
+def test_readers_upgrade_a_legacy_file_first(legacy_db):
+    latest = db.get_latest_valuation(legacy_db)          # no ensure_schema() beforehand
+    assert latest["run_id"] == "20240101_120000"
+    assert latest["dcf_details"] == LEGACY_DETAILS
+    assert latest["upside_pct"] == pytest.approx(25.0)
+
+    history = db.get_valuation_history(legacy_db)
+    assert list(history["run_id"]) == ["20240101_120000"]
+    assert history["intrinsic_value"][0] == 150.0 and history["market_price"][0] == 120.0
+
+    (row,) = db.get_financials_history(legacy_db)
+    assert row["period"] == "2023" and row["cash"] in (None, 0.0)
+    assert db.get_all_metrics(legacy_db) == {"beta": 1.1}
+
+
+def test_new_runs_after_upgrade_use_typed_columns(legacy_db):
+    db.init_company_db(legacy_db)
+    run_id = db.save_valuation(legacy_db, {
+        "wacc": 0.08, "intrinsic_value": 160.0, "market_price": 125.0,
+        "npv_project": 0.0, "irr_project": 0.1,
+        "dcf_details": {"projected_fcfs": [{"year": 1, "fcf": 1e9, "pv": 9.2e8}],
+                        "terminal_value": 2e11, "pv_terminal_value": 1.3e11, "sum_pv_fcfs": 4e9,
+                        "enterprise_value": 1.34e11, "equity_value": 1.3e11,
+                        "intrinsic_per_share": 160.0, "shares": 8e8, "net_debt": 4e9},
+    })
+    latest = db.get_latest_valuation(legacy_db)
+    assert latest["run_id"] == run_id
+    assert latest["dcf_details"]["enterprise_value"] == pytest.approx(1.34e11)
+    assert latest["dcf_details"]["projected_fcfs"] == [{"year": 1, "fcf": 1e9, "pv": 9.2e8}]
+    assert len(db.get_valuation_history(legacy_db)["run_id"]) == 2
+
+
+def test_partially_migrated_file_resumes(db_dir, monkeypatch):
+    migrations, version = db.MIGRATIONS, db.SCHEMA_VERSION
+    monkeypatch.setattr(db, "MIGRATIONS", migrations[:1])
+    monkeypatch.setattr(db, "SCHEMA_VERSION", 1)
+    assert db.ensure_schema("MID") == (0, 1)
+    db.pool.close_all()
+
+    # A later release: the remaining steps run, and only those
+    monkeypatch.setattr(db, "MIGRATIONS", migrations)
+    monkeypatch.setattr(db, "SCHEMA_VERSION", version)
+    monkeypatch.setattr(db, "_schema_versions", {})
+    assert db.ensure_schema("MID") == (1, db.SCHEMA_VERSION)
+    db.upsert_financials("MID", [{"period": "2024", "revenue": 1.0, "cash": 2.0}])
+    assert db.get_financials_history("MID")[0]["cash"] == 2.0
+
+
+def test_failed_migration_rolls_back(db_dir, monkeypatch):
+    def broken(con, consolidated):
+        con.execute("CREATE TABLE half_done (x INTEGER)")
+        raise RuntimeError("migration failed")
+
+    monkeypatch.setattr(db, "MIGRATIONS", db.MIGRATIONS + ((99, "broken", broken),))
+    monkeypatch.setattr(db, "SCHEMA_VERSION", 99)
+    with pytest.raises(RuntimeError):
+        db.ensure_schema("BRK")
+    db.pool.close_all()
+
+    con = duckdb.connect(str(db._db_path("BRK")))
+    try:
+        tables = {r[0] for r in con.execute("SHOW TABLES").fetchall()}
+        versions = [r[0] for r in con.execute("SELECT version FROM schema_version").fetchall()]
+    finally:
+        con.close()
+    assert "half_done" not in tables
+    assert 99 not in versions and max(versions) == db.MIGRATIONS[-2][0]
+
+
+def test_shipped_example_database_upgrades(db_dir):
+    source = Path(db.__file__).parent / "databases" / "ORCL.duckdb"
+    if not source.exists():
+        pytest.skip("example database not present")
+    shutil.copy(source, db_dir / "ORCL.duckdb")
+    before, after = db.ensure_schema("ORCL")
+    assert after == db.SCHEMA_VERSION and before < after
+    assert db.get_latest_valuation("ORCL")["run_id"]
@@ -0,0 +1,103 @@
+"""WriteBehind: coalescing, and failures surfacing through flush()."""
+import duckdb
+import pytest
+
+import db_manager as db
+import write_behind as wb
+
+
+@pytest.fixture
+def writer(db_dir):
+    w = wb.WriteBehind(linger=0.005)
+    yield w
+    w.close()
+
+
+def test_coalesces_and_flushes(writer):
+    db.init_company_db("AAA")
+    writer.submit("aaa", "metrics", {"beta": 1.0, "peRatio": 10.0})
+    writer.submit("AAA", "metrics", {"beta": 1.2})
+    assert writer.flush("AAA", timeout=10)
+    assert db.get_all_metrics("AAA") == {"beta": 1.2, "peRatio": 10.0}
+    assert writer.stats()["pending"] == 0
+
+
+def test_unknown_table_is_rejected(writer):
+    with pytest.raises(ValueError):
+        writer.submit("AAA", "valuation", {})
+
+
+def test_failed_write_is_raised_once_for_that_ticker(writer, monkeypatch):
+    db.init_company_db("GOOD")
+    db.init_company_db("BAD")
+
+    def upsert_peers(ticker, peers, con=None):
+        if ticker == "BAD":
+            raise duckdb.ConversionException("bad payload")
+        return db.upsert_peers(ticker, peers, con=con)
+
+    monkeypatch.setitem(wb.WRITERS, "peers", (upsert_peers, "replace"))
+    writer.submit("GOOD", "peers", ["X", "Y"])
+    writer.submit("BAD", "peers", ["Z"])
+
+    with pytest.raises(duckdb.ConversionException):
+        writer.flush("BAD", timeout=10)
+    assert writer.flush("BAD", timeout=10)          # reported once, then cleared
+    assert writer.flush("GOOD", timeout=10)
+    assert db.get_peers_list("GOOD") == ["X", "Y"]
+    assert db.get_peers_list("BAD") == []
+
+
+def test_failed_file_rolls_back_all_its_jobs(writer, monkeypatch):
+    db.init_company_db("AAA")
+
+    def upsert_peers(ticker, peers, con=None):
+        raise RuntimeError("peers failed")
+
+    monkeypatch.setitem(wb.WRITERS, "peers", (upsert_peers, "replace"))
+    writer.submit("AAA", "metrics", {"beta": 1.5})
+    writer.submit("AAA", "peers", ["X"])
+    with pytest.raises(RuntimeError):
+        writer.flush(timeout=10)
+    assert db.get_all_metrics("AAA") == {}          # same transaction as the failed job
+
+
+def test_connect_failure_does_not_hang_flush(writer, monkeypatch):
+    def refuse(ticker):
+        raise duckdb.IOException("database is locked")
+
+    monkeypatch.setattr(db, "get_connection", refuse)
+    writer.submit("AAA", "metrics", {"beta": 1.0})
+    with pytest.raises(duckdb.IOException):
+        writer.flush(timeout=10)
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_writer_thread_restarts_after_dying(writer):
+    db.init_company_db("AAA")
+    writer.submit("AAA", "metrics", {"beta": 1.0})
+    assert writer.flush(timeout=10)
+
+    def die(batch):
+        raise SystemExit                    # not an Exception: kills the thread
+    writer._write = die
+    writer.submit("AAA", "metrics", {"beta": 2.0})
+    writer._thread.join(timeout=10)
+    assert not writer._thread.is_alive()
+
+    del writer._write
+    writer.submit("AAA", "metrics", {"beta": 3.0})
+    assert writer.flush(timeout=10)
+    assert db.get_all_metrics("AAA")["beta"] == 3.0
+
+
+def test_flush_times_out_instead_of_blocking(writer, monkeypatch):
+    monkeypatch.setattr(writer, "_run", lambda: None)       # a writer that never commits
+    writer.submit("AAA", "metrics", {"beta": 1.0})
+    assert writer.flush(timeout=0.05) is False
+
+
+def test_closed_queue_refuses_submits(writer):
+    writer.close()
+    with pytest.raises(RuntimeError):
+        writer.submit("AAA", "metrics", {"beta": 1.0})
@@ -0,0 +1,147 @@
+"""
+Memoised run_full_valuation(): results keyed by a stable fingerprint of the
+inputs, LRU-bounded in memory and optionally persisted to disk.
+"""
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+import finance_calc as fc
+
+# Part of every fingerprint: bump it whenever run_full_valuation()'s results
+# or the pickled ValuationResult layout change, so entries cached on disk by
+# an older version are never returned.
+CACHE_VERSION = 1
+
+
+def _json_default(obj):
+    if isinstance(obj, fc.DiscountCurve):
+        return {"tenors": obj.tenors.tolist(), "zero_rates": obj.zero_rates.tolist()}
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    # str() would give different objects with the same repr the same key
+    raise TypeError(f"cannot fingerprint {type(obj).__name__} valuation input")
+
+
+def fingerprint(fin: dict, market_price: float, ticker: Optional[str] = None, **params) -> str:
+    """
+    SHA-256 of the canonical JSON of CACHE_VERSION, the ticker and every
+    run_full_valuation() input.
+    """
+    payload = {"version": CACHE_VERSION, "ticker": ticker and ticker.upper(), "fin": fin,
+               "market_price": market_price, "params": params}
+    blob = json.dumps(payload, sort_keys=True, default=_json_default)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class ValuationCache:
+    """
+    Thread-safe LRU cache of valuation results.
+    cache_dir: also pickle results to <cache_dir>/<fingerprint>.pkl so they
+    survive restarts (disk entries are not evicted, only the in-memory LRU).
+    Cached results are shared — treat them as read-only.
+    """
+
+    def __init__(self, maxsize: int = 256, cache_dir: Optional[str] = None):
+        self.maxsize = maxsize
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _disk_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pkl"
+
+    def lookup(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        if self.cache_dir and self._disk_path(key).exists():
+            try:
+                with open(self._disk_path(key), "rb") as f:
+                    result = pickle.load(f)
+            except Exception:
+                return None
+            self._remember(key, result)
+            return result
+        return None
+
+    def store(self, key: str, result) -> None:
+        self._remember(key, result)
+        if self.cache_dir:
+            tmp = self._disk_path(key).with_suffix(".tmp")
+            with open(tmp, "wb") as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._disk_path(key))
+
+    def _remember(self, key: str, result) -> None:
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, fin: dict, market_price: float, ticker: Optional[str] = None,
+                       **params) -> tuple:
+        """
+        Returns (result, hit).  hit=True means the same ticker and inputs were
+        valued before — not that the result is in the database (a save may
+        have failed, or the database been reset since); check that with
+        matches_stored() before skipping a save.
+        """
+        key = fingerprint(fin, market_price, ticker, **params)
+        result = self.lookup(key)
+        with self._lock:
+            if result is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if result is not None:
+            return result, True
+        result = fc.run_full_valuation(fin, market_price, **params)
+        self.store(key, result)
+        return result, False
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self.cache_dir:
+            for f in self.cache_dir.glob("*.pkl"):
+                f.unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "size": len(self._entries), "maxsize": self.maxsize}
+
+
+def matches_stored(stored: dict, result, market_price: float) -> bool:
+    """True if `stored` (db_manager.get_latest_valuation()) is this result at this price."""
+    return bool(stored) and all(
+        stored.get(k) == v for k, v in (
+            ("market_price",    market_price),
+            ("intrinsic_value", result["intrinsic_value"]),
+            ("wacc",            result["wacc"]),
+        )
+    )
+
+
+default_cache = ValuationCache(cache_dir=os.getenv("VALUATION_CACHE_DIR") or None)
+
+
+def cached_run_full_valuation(fin: dict, market_price: float, ticker: Optional[str] = None, **params):
+    """run_full_valuation() through the module-level default_cache."""
+    return default_cache.get_or_compute(fin, market_price, ticker, **params)[0]
@@ -0,0 +1,186 @@
+"""
+Write-behind persistence: any thread submits upserts and carries on; one
+background writer coalesces them per (ticker, table) and commits each
+database's share of a batch in a single transaction.  flush() is the read
+barrier — call it before reading back what was just submitted.
+"""
+import atexit
+import threading
+import time
+from typing import Optional
+
+import db_manager as db
+
+# Seconds an interactive caller should wait on flush() before reporting a stall
+FLUSH_TIMEOUT = 30.0
+
+# table → (db_manager writer taking con=, how two pending payloads combine)
+WRITERS = {
+    "company_profile": (db.upsert_profile,       "replace"),
+    "metrics":         (db.upsert_metrics,       "merge"),
+    "price_history":   (db.upsert_price_history, "append"),
+    "financials":      (db.upsert_financials,    "append"),
+    "dividends":       (db.upsert_dividends,     "append"),
+    "peers":           (db.upsert_peers,         "replace"),
+}
+
+
+def _coalesce(mode: str, old, new):
+    """
+    replace: the newer payload wins (profile, peer list)
+    merge:   dict update, newer keys win (metrics)
+    append:  rows concatenated; the upsert keeps the last row per key
+    """
+    if mode == "merge":
+        return {**old, **new}
+    if mode == "append":
+        return list(old) + list(new)
+    return new
+
+
+class WriteBehind:
+    """
+    Single background writer shared by all company databases.
+
+    submit() queues a payload for db_manager's upsert of `table` and returns
+    at once.  Pending payloads for the same (ticker, table) are coalesced, so
+    a burst of writes costs one statement.  Every `linger` seconds the writer
+    takes everything pending and commits it — one transaction per database
+    file (one in total with consolidated storage).
+    """
+
+    def __init__(self, linger: float = 0.02):
+        self.linger = linger
+        self._cv = threading.Condition()
+        self._pending: dict[tuple[str, str], object] = {}
+        self._submitted = 0                 # sequence number of the last submit
+        self._committed = 0                 # every submit <= this has been written
+        self._last_seq: dict[str, int] = {}
+        self._errors: dict[str, Exception] = {}
+        self._thread = None
+        self._closed = False
+        self.batches = 0
+        self.jobs = 0
+        self.coalesced = 0
+
+    # ── Producers ──────────────────────────────────────────────────────────
+
+    def submit(self, ticker: str, table: str, payload) -> int:
+        """Queue `payload` for WRITERS[table]; returns its sequence number."""
+        if table not in WRITERS:
+            raise ValueError(f"no write-behind writer for table {table!r}; choose from {tuple(WRITERS)}")
+        ticker = ticker.upper()
+        with self._cv:
+            if self._closed:
+                raise RuntimeError("write-behind queue is closed")
+            key = (ticker, table)
+            if key in self._pending:
+                self._pending[key] = _coalesce(WRITERS[table][1], self._pending[key], payload)
+                self.coalesced += 1
+            else:
+                self._pending[key] = payload
+            self._submitted += 1
+            self.jobs += 1
+            self._last_seq[ticker] = self._submitted
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._thread.start()
+            self._cv.notify_all()
+            return self._submitted
+
+    def flush(self, ticker: Optional[str] = None, timeout: Optional[float] = None) -> bool:
+        """
+        Block until everything submitted so far (for `ticker`, or for all
+        tickers) is committed.  Re-raises a failed write of that ticker.
+        Returns False on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cv:
+            target = self._submitted if ticker is None else self._last_seq.get(ticker.upper(), 0)
+            while self._committed < target:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cv.wait(remaining)
+            errors = (self._errors.pop(ticker.upper(), None),) if ticker else tuple(self._errors.values())
+            if ticker is None:
+                self._errors.clear()
+        for err in errors:
+            if err is not None:
+                raise err
+        return True
+
+    def close(self) -> None:
+        """Write everything still pending and stop the writer thread."""
+        with self._cv:
+            self._closed = True
+            self._cv.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+
+    def stats(self) -> dict:
+        with self._cv:
+            return {"pending": len(self._pending), "jobs": self.jobs,
+                    "coalesced": self.coalesced, "batches": self.batches}
+
+    # ── Writer thread ──────────────────────────────────────────────────────
+
+    def _run(self) -> None:
+        while True:
+            with self._cv:
+                while not self._pending and not self._closed:
+                    self._cv.wait()
+                if not self._pending and self._closed:
+                    return
+            time.sleep(self.linger)         # let a burst of submits coalesce
+            with self._cv:
+                batch, self._pending = self._pending, {}
+                upto = self._submitted
+            try:
+                self._write(batch)
+            except Exception as e:          # never leave flush() waiting on a dead writer
+                self._fail({ticker for ticker, _ in batch}, e)
+            finally:
+                with self._cv:
+                    self._committed = upto
+                    self.batches += 1
+                    self._cv.notify_all()
+
+    def _fail(self, tickers, error: Exception) -> None:
+        with self._cv:
+            for ticker in tickers:
+                self._errors[ticker] = error
+
+    def _write(self, batch: dict) -> None:
+        """
+        One transaction per database file; a failure (connecting included)
+        rolls back that file's jobs only and is re-raised by flush().
+        """
+        by_db: dict[str, list] = {}
+        for (ticker, table), payload in batch.items():
+            path = str(db.MARKET_DB_PATH) if db._consolidated() else str(db._db_path(ticker))
+            by_db.setdefault(path, []).append((ticker, table, payload))
+        for jobs in by_db.values():
+            con = None
+            try:
+                con = db.get_connection(jobs[0][0])
+                con.execute("BEGIN TRANSACTION")
+                for ticker, table, payload in jobs:
+                    WRITERS[table][0](ticker, payload, con=con)
+                con.execute("COMMIT")
+                for ticker, table, _ in jobs:
+                    db.read_cache.invalidate(table, ticker)
+            except Exception as e:
+                if con is not None:
+                    try:
+                        con.execute("ROLLBACK")
+                    except Exception:       # BEGIN itself failed; nothing to undo
+                        pass
+                self._fail({ticker for ticker, _, _ in jobs}, e)
+            finally:
+                if con is not None:
+                    con.close()
+
+
+default_writer = WriteBehind()
+atexit.register(default_writer.close)
@@ -0,0 +1,294 @@
+"""
+bench.py
+─────────────────────────────────────────────────────────────
+Offline, reproducible benchmarks for the numerical hot paths of
+  Projects/Company_Valuation_And_Investment_Calculator/finance_calc.py
+  QuantMathCourseWork/MiniProjects/LinearAlgebra/pca_engine.py
+
+Every input comes from a seeded synthetic generator (no API keys, no
+databases).  Results are written as JSON; --baseline compares against a
+previous run and exits non-zero when a case got slower than --threshold.
+
+  python benchmarks/bench.py --out bench.json
+  python benchmarks/bench.py --baseline bench.json --threshold 0.15
+  python benchmarks/bench.py --filter pca --repeat 3
+"""
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "Projects" / "Company_Valuation_And_Investment_Calculator"))
+sys.path.insert(0, str(ROOT / "QuantMathCourseWork" / "MiniProjects" / "LinearAlgebra"))
+
+import finance_calc as fc   # noqa: E402
+import pca_engine as pe     # noqa: E402
+
+SEED = 20240101
+PCA_SIZES = (20, 500, 3000)
+TRADING_DAYS = 252
+
+
+# ══════════════════════════════════════════════════════════
+#  Synthetic inputs
+# ══════════════════════════════════════════════════════════
+
+def synthetic_fin(rng: np.random.Generator) -> dict:
+    """A derive_financials_from_metrics()-shaped dict for a large-cap company."""
+    shares = rng.uniform(5e8, 5e9)
+    market_cap = shares * rng.uniform(20, 400)
+    total_debt = market_cap * rng.uniform(0.05, 0.6)
+    cash = market_cap * rng.uniform(0.01, 0.2)
+    return {
+        "shares":        shares,
+        "market_cap":    market_cap,
+        "price":         market_cap / shares,
+        "beta":          rng.uniform(0.6, 1.8),
+        "fcf_ttm":       market_cap * rng.uniform(0.02, 0.08),
+        "total_debt":    total_debt,
+        "total_equity":  market_cap,
+        "cost_of_debt":  rng.uniform(0.02, 0.08),
+        "cash":          cash,
+        "net_debt":      max(total_debt - cash, 0),
+        "rev_growth_5y": rng.uniform(0.02, 0.25),
+    }
+
+
+def irr_easy_flows(rng: np.random.Generator) -> tuple:
+    """Conventional project: one outflow, five positive inflows."""
+    return 1000.0, list(rng.uniform(200, 400, 5))
+
+
+def irr_pathological_flows(rng: np.random.Generator) -> tuple:
+    """
+    40-year flows with repeated sign changes and a near-flat NPV curve —
+    multiple candidate roots, so the solver's safeguards do real work.
+    """
+    t = np.arange(40)
+    flows = 100 * np.sin(t / 3.0) + rng.normal(0, 5, 40)
+    flows[-1] -= 900.0                       # large decommissioning cost
+    return 10.0, list(flows)
+
+
+def synthetic_prices(n_tickers: int, n_days: int = TRADING_DAYS, seed: int = SEED) -> pd.DataFrame:
+    """
+    Prices from a market + sector factor model (like data_pipeline's
+    synthetic fallback, but deterministic for any number of tickers).
+    """
+    rng = np.random.default_rng(seed + n_tickers)
+    n_sectors = 10
+    market = rng.normal(0.0003, 0.010, n_days)
+    sectors = rng.normal(0, 0.004, (n_sectors, n_days))
+    sector_of = rng.integers(0, n_sectors, n_tickers)
+    beta_m = rng.uniform(0.6, 1.4, n_tickers)
+    beta_s = rng.uniform(0.3, 0.9, n_tickers)
+    idio = rng.normal(0, 0.008, (n_tickers, n_days))
+    rets = beta_m[:, None] * market + beta_s[:, None] * sectors[sector_of] + idio
+    prices = 100.0 * np.cumprod(1 + rets, axis=1)
+    dates = pd.bdate_range("2023-01-02", periods=n_days)
+    return pd.DataFrame(prices.T, index=dates, columns=[f"T{i:04d}" for i in range(n_tickers)])
+
+
+# ══════════════════════════════════════════════════════════
+#  Compatibility — cases must also run against older trees
+#  (for --baseline runs), so newer APIs are used only if present
+# ══════════════════════════════════════════════════════════
+
+def growth_schedule(rev_growth: float, years: int) -> list:
+    """fc.growth_schedule(), or the declining schedule it replaced."""
+    if hasattr(fc, "growth_schedule"):
+        return fc.growth_schedule(rev_growth, years)
+    g = min(max(rev_growth, 0.03), 0.30)
+    return [g * max(1 - i * 0.1, 0.5) for i in range(years)]
+
+
+def force(result) -> list:
+    """Read every field of a lazily-built result so its full cost is timed."""
+    return [result[key] for key in getattr(result, "KEYS", ())]
+
+
+# ══════════════════════════════════════════════════════════
+#  Cases: name → setup() returning a zero-argument callable
+# ══════════════════════════════════════════════════════════
+
+def _case_irr(kind: str):
+    rng = np.random.default_rng(SEED)
+    initial, flows = irr_easy_flows(rng) if kind == "easy" else irr_pathological_flows(rng)
+    return lambda: fc.compute_irr(initial, flows)
+
+
+def _case_dcf(years: int):
+    rng = np.random.default_rng(SEED)
+    fin = synthetic_fin(rng)
+    growth = growth_schedule(fin["rev_growth_5y"], years)
+    return lambda: fc.dcf_valuation(fin["fcf_ttm"], 0.09, growth, 0.025,
+                                    fin["net_debt"], fin["shares"], fin["cash"])
+
+
+def _case_wacc_sensitivity():
+    rng = np.random.default_rng(SEED)
+    fin = synthetic_fin(rng)
+    growth = growth_schedule(fin["rev_growth_5y"], 5)
+    return lambda: fc.wacc_sensitivity(fin["fcf_ttm"], growth, 0.025,
+                                       fin["net_debt"], fin["shares"], fin["cash"])
+
+
+def _case_full_valuation():
+    rng = np.random.default_rng(SEED)
+    fin = synthetic_fin(rng)
+    return lambda: force(fc.run_full_valuation(fin, fin["price"]))
+
+
+def _case_pca(n: int):
+    prices = synthetic_prices(n)
+    return lambda: pe.compute_pca(prices, n_components=3)
+
+
+def _case_risk_decomposition(n: int):
+    result = pe.compute_pca(synthetic_prices(n), n_components=3)
+    weights = np.random.default_rng(SEED).dirichlet(np.ones(n))
+    return lambda: pe.portfolio_risk_decomposition(result, weights)
+
+
+CASES = {
+    "finance_calc.compute_irr.easy":          lambda: _case_irr("easy"),
+    "finance_calc.compute_irr.pathological":  lambda: _case_irr("pathological"),
+    "finance_calc.dcf_valuation.5y":          lambda: _case_dcf(5),
+    "finance_calc.dcf_valuation.10y":         lambda: _case_dcf(10),
+    "finance_calc.wacc_sensitivity":          _case_wacc_sensitivity,
+    "finance_calc.run_full_valuation":        _case_full_valuation,
+    **{f"pca_engine.compute_pca.N{n}": (lambda n=n: _case_pca(n)) for n in PCA_SIZES},
+    **{f"pca_engine.portfolio_risk_decomposition.N{n}": (lambda n=n: _case_risk_decomposition(n))
+       for n in PCA_SIZES},
+}
+
+
+# ══════════════════════════════════════════════════════════
+#  Timing
+# ══════════════════════════════════════════════════════════
+
+def time_case(fn, repeat: int = 7, min_time: float = 0.05) -> dict:
+    """
+    timeit-style: pick a loop count so one repeat takes >= min_time, then
+    report per-call seconds over `repeat` repeats (after one warm-up call).
+    """
+    fn()
+    loops = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time or loops >= 1_000_000:
+            break
+        loops *= 10 if elapsed < min_time / 10 else 2
+
+    samples = [elapsed / loops]
+    for _ in range(repeat - 1):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - t0) / loops)
+    return {
+        "median_s": statistics.median(samples),
+        "min_s":    min(samples),
+        "mean_s":   statistics.fmean(samples),
+        "stdev_s":  statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "repeats":  len(samples),
+        "loops":    loops,
+    }
+
+
+def run(filter_: str = "", repeat: int = 7, min_time: float = 0.05) -> dict:
+    results = {}
+    for name, setup in CASES.items():
+        if filter_ and filter_ not in name:
+            continue
+        results[name] = time_case(setup(), repeat, min_time)
+        print(f"  {name:<48} {_fmt(results[name]['median_s']):>10}", flush=True)
+    return {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python":    platform.python_version(),
+            "numpy":     np.__version__,
+            "pandas":    pd.__version__,
+            "machine":   platform.machine(),
+            "platform":  platform.platform(),
+            "seed":      SEED,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = 0.10) -> list[dict]:
+    """Median-to-median ratio per case; ratio > 1 + threshold is a regression."""
+    rows = []
+    for name, cur in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            rows.append({"case": name, "status": "new"})
+            continue
+        ratio = cur["median_s"] / base["median_s"] if base["median_s"] else float("inf")
+        status = "regression" if ratio > 1 + threshold else \
+                 "improvement" if ratio < 1 - threshold else "ok"
+        rows.append({"case": name, "baseline_s": base["median_s"],
+                     "current_s": cur["median_s"], "ratio": ratio, "status": status})
+    return rows
+
+
+def _fmt(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3f} {unit}"
+    return f"{seconds / 1e-9:.1f} ns"
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--out", help="write results JSON here")
+    ap.add_argument("--baseline", help="compare against this results JSON")
+    ap.add_argument("--threshold", type=float, default=0.10,
+                    help="allowed slowdown before a case counts as a regression (default 0.10 = 10%%)")
+    ap.add_argument("--filter", default="", help="only run cases whose name contains this")
+    ap.add_argument("--repeat", type=int, default=7)
+    ap.add_argument("--min-time", type=float, default=0.05, help="minimum seconds per repeat")
+    ap.add_argument("--list", action="store_true", help="list case names and exit")
+    args = ap.parse_args(argv)
+
+    if args.list:
+        print("\n".join(CASES))
+        return 0
+
+    print("Running benchmarks…")
+    current = run(args.filter, args.repeat, args.min_time)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        rows = compare(current, baseline, args.threshold)
+        current["comparison"] = {"baseline": args.baseline, "threshold": args.threshold, "cases": rows}
+        print(f"\nCompared with {args.baseline} (threshold {args.threshold:.0%}):")
+        for r in rows:
+            if r["status"] == "new":
+                print(f"  {r['case']:<48} {'new':>10}")
+            else:
+                print(f"  {r['case']:<48} {_fmt(r['baseline_s']):>10} → {_fmt(r['current_s']):>10}"
+                      f"  ×{r['ratio']:.2f}  {r['status']}")
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(current, indent=2))
+        print(f"\nResults written to {args.out}")
+
+    regressions = [r for r in current.get("comparison", {}).get("cases", []) if r["status"] == "regression"]
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())